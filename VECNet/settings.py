@@ -91,6 +91,11 @@ DATABASES = {
 
 CELERY_RESULT_BACKEND = "amqp"
 
+# Celery queue that ingestion tasks are routed to (optional; default = None, the default queue).  If it's set, a
+# worker must consume it or nothing is ingested.  Start the ingestion worker, with the number of replications it
+# ingests at the same time, with: python manage.py celery worker --app=autoscotty.tasks -Q ingestion -c 4
+INGESTION_QUEUE = None
+
 #DATABASE_ROUTERS = ['lib.DW_router.DW_router']
 DATABASE_ROUTERS = ['VECNet.CeleryRouter.AS_Router']
 
@@ -287,10 +292,17 @@ JOB_SERVICES_START_SIMGROUP_SCRIPT_PATH_EMOD_18 = "C:\\cluster_scripts\\tools-de
 
 # List of IP addresses of clients that are allowed to use the REST API of data services
 DATA_REST_API_CLIENTS = ('127.0.0.1')
+# URL prefix of the nginx internal location serving the root directory of the file scheme.  If set, the REST API
+# of data services lets nginx send the input files stored with the file scheme (X-Accel-Redirect).
+DATA_REST_API_X_ACCEL_REDIRECT = None
 
 FILE_SERVER = {
     'URI schemes': ('data', 'file', 'https'),
     'write scheme': 'data',
+    # Store identical file contents only once (optional; default = False).  It has no effect with the "data" write
+    # scheme, whose URIs are the contents themselves.  Run "manage.py purge_file_contents" periodically to delete the
+    # contents that are no longer referenced.
+    'content addressed': False,
     'file scheme': {
         'root directory': os.path.join(PROJECT_ROOT, 'data_services', 'tests', 'sim_file_server', 'output')
         # The path above is a real directory (the output directory for testing), so it'll pass validation.  This setting
@@ -373,8 +385,23 @@ DEBUG_TOOLBAR_CONFIG = {
 LOGIN_EXEMPT_URLS = ['ts_emod/', 'datawarehouse/', 'cifer/', 'data_services/api/', 'om_validate/' '500', '404', '403']
 
 OPENMALARIA_EXEC_DIR = PROJECT_ROOT + '/om_validate/bin/'
+# Maximum number of OpenMalaria --validate-only processes run at the same time by om_validate (per process)
+OM_VALIDATE_WORKERS = 4
 TS_OM_SCENARIOS_DIR = '/home/nreed/scenarios/'
 TS_OM_VALIDATE_URL = 'https://ci-qa.vecnet.org/om_validate/validate/'
+# Maximum size (in bytes) of the parsed simulation outputs cached by ts_om_viz (per process)
+TS_OM_VIZ_CACHE_SIZE = 64 * 1024 * 1024
+# Maximum size (in bytes) of the InsetChart.json channels cached by the results viewer (per process)
+CHANNEL_INDEX_CACHE_SIZE = 32 * 1024 * 1024
+
+# Number of cube queries of a data warehouse request run at the same time (per process)
+DATAWAREHOUSE_CUBES_WORKERS = 4
+# Maximum number of rows of cube results cached by the data warehouse (per process)
+DATAWAREHOUSE_RESULTS_CACHE_SIZE = 200000
+# Number of seconds the cube results are cached
+DATAWAREHOUSE_RESULTS_CACHE_TTL = 15 * 60
+# Number of seconds the climate data uploaded to the weather tool is kept
+TS_WEATHER_CLIMATE_DATA_MAX_AGE = 24 * 60 * 60
 
 CONFIG_CALIBRATION_URL = 'http://calib.dev.vecnet.org/json_post_receive_all/'
 
@@ -0,0 +1,53 @@
+import glob
+import os
+from django.core.management.base import BaseCommand, CommandError
+from optparse import make_option
+from autoscotty.tasks import ingest_batch
+from data_services.ingest import ids_from_filename
+
+
+class Command(BaseCommand):
+    """
+    Send a batch of replication zip files to the ingestion queue.  The replications are ingested concurrently by
+    the ingestion workers, and the status of each run is updated once, after the whole batch has been ingested.
+    """
+    args = 'ZIP_FILE_OR_DIRECTORY [ZIP_FILE_OR_DIRECTORY ...]'
+    help = 'Ingest a batch of replication zip files (directories are searched for *.zip files)'
+
+    option_list = BaseCommand.option_list + (
+        make_option('--model',
+                    action='store',
+                    type="string",
+                    dest='modeltype',
+                    default="EMOD",
+                    help='The simulation model type (e.g. EMOD).'),
+        make_option('--sync',
+                    action='store_true',
+                    dest='sync',
+                    default=False,
+                    help='Wait for the batch to be ingested.'),
+    )
+
+    def handle(self, *args, **options):
+        if not args:
+            raise CommandError("Usage: ingest_batch %s" % self.args)
+
+        jobs = list()
+        for arg in args:
+            if os.path.isdir(arg):
+                paths = sorted(glob.glob(os.path.join(arg, "*.zip")))
+            else:
+                paths = [arg]
+            for path in paths:
+                path = os.path.abspath(path)
+                execid, seriesid = ids_from_filename(path)
+                jobs.append((path, execid, seriesid))
+
+        if not jobs:
+            raise CommandError("No zip files found")
+
+        result = ingest_batch(jobs, options['modeltype'])
+        self.stdout.write("Sent %s replications to the ingestion queue\n" % len(jobs))
+        if options['sync']:
+            result.get()
+            self.stdout.write("Batch ingested\n")
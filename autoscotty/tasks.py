@@ -1,6 +1,8 @@
 import data_services
 import data_services.ingest
-from celery import Celery
+from data_services.models import DimExecution, DimRun
+from data_services.utils.run_data import summarize_finished_executions
+from celery import Celery, chord
 from celery.utils.log import get_task_logger
 from django.core.mail import send_mail
 from django.conf import settings
@@ -9,7 +11,36 @@ import traceback
 logger = get_task_logger(__name__)
 BROKER_URL = getattr(settings, "BROKER_URL", 'amqp://guest@localhost//')
 
+INGESTION_QUEUE = getattr(settings, "INGESTION_QUEUE", None)
+
 celery = Celery('tasks', backend='amqp', broker=BROKER_URL)
+# If INGESTION_QUEUE is set, ingestion tasks go to their own queue, so replications are unpacked, parsed and copied
+# into the warehouse by a dedicated worker instead of competing with other work.  A worker must then consume that
+# queue (-Q), otherwise nothing is ingested.  The number of processes of that worker is given on its command line
+# (-c), the concurrency of the other workers is left alone.
+if INGESTION_QUEUE:
+    celery.conf.update(
+        CELERY_ROUTES={
+            'autoscotty.tasks.ingest_files': {'queue': INGESTION_QUEUE},
+            'autoscotty.tasks.ingest_replication': {'queue': INGESTION_QUEUE},
+            'autoscotty.tasks.update_run_status': {'queue': INGESTION_QUEUE},
+        },
+    )
+
+
+def report_failure(path_to_file, model_type):
+    """
+    Print the current exception and email it to the admins.
+    """
+    stacktrace = traceback.format_exc()
+    print stacktrace
+    try:
+        send_mail('Ingestion Failure', "An %s ingestion failed. The path is %s\n%s" % (model_type, path_to_file,
+                                                                                     stacktrace),
+                  settings.SERVER_EMAIL,
+                  [r[1] for r in settings.ADMINS])
+    except Exception:
+        logger.exception("Can't send the ingestion failure email")
 
 
 @celery.task
@@ -29,10 +60,56 @@ def ingest_files(path_to_file, model_type, execid=None, seriesid=None):
     try:
         data_services.ingest.ingest_files(path_to_file, model_type, execid, seriesid)
     except:
-        stacktrace = traceback.format_exc()
-        #traceback.print_exc()
-        print stacktrace
-        #traceback.print_tb(stacktrace)
-        send_mail('Ingestion Failure', "An %s ingestion failed. The path is %s\n%s" % (model_type, path_to_file, stacktrace),
-                  settings.SERVER_EMAIL,
-                  [r[1] for r in settings.ADMINS])
+        report_failure(path_to_file, model_type)
+
+
+@celery.task
+def ingest_replication(path_to_file, model_type, execid=None, seriesid=None):
+    """
+    This is the celery task used by ingest_batch to ingest a single replication.  Unlike ingest_files it does not
+    update the status of the run, that is done once for the whole batch by update_run_status.
+    :param string path_to_file: A path to a zip_file containing the files to be ingested.
+    :param string model_type: A string indicating the simulation model type.
+    :return: The id of the run the replication belongs to, or None if it can't be found.  The task never fails,
+     so the chord's callback always runs, and the run of a failed replication is still updated.
+    """
+    logger.info("Filename: %s, execid: %s, seriesid: %s", path_to_file, execid, seriesid)
+    try:
+        return data_services.ingest.ingest_files(path_to_file, model_type, execid, seriesid, update_run_status=False)
+    except:
+        report_failure(path_to_file, model_type)
+    try:
+        return DimExecution.objects.filter(pk=execid).values_list('run_key', flat=True)[0] if execid else None
+    except:
+        logger.exception("Can't find the run of execution %s", execid)
+        return None
+
+
+@celery.task
+def update_run_status(run_ids):
+    """
+    This is the celery task that updates the status of the runs a batch of replications was ingested into.  Each
+    run is only updated once, no matter how many of its replications were in the batch.  The executions that were
+    finished by the batch and are not summarized yet (because their last replication failed) are summarized.
+    :param list run_ids: The results of the ingest_replication tasks of the batch.
+    :return: Null
+    """
+    for run_id in set(run_id for run_id in run_ids if run_id is not None):
+        run = DimRun.objects.get(pk=run_id)
+        run.set_status()
+        summarize_finished_executions(run)
+
+
+def ingest_batch(jobs, model_type):
+    """
+    This method sends a batch of replications (typically all the replications of a sweep that finished on the
+    cluster, or a single replication uploaded by the cluster) to the ingestion queue.  The replications are ingested
+    concurrently by the ingestion workers, and the status of the runs involved is updated once all of them are done,
+    even if they failed.
+    :param list jobs: A list of (path_to_file, execid, seriesid) tuples.
+    :param string model_type: A string indicating the simulation model type.
+    :return: The AsyncResult of the update_run_status task
+    """
+    return chord(
+        ingest_replication.s(path_to_file, model_type, execid, seriesid) for path_to_file, execid, seriesid in jobs
+    )(update_run_status.s())
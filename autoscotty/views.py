@@ -1,4 +1,3 @@
-import os
 import traceback
 from django.conf import settings
 from django.core.mail import send_mail
@@ -8,8 +7,9 @@ from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from django.views.generic import FormView
 from autoscotty.forms import UploadZipForm, ReportErrorForm
-from autoscotty.tasks import ingest_files
+from autoscotty.tasks import ingest_batch
 from data_services.file_system_storage import save_to_system
+from data_services.ingest import ids_from_filename
 from data_services.ingesters import EMOD_ingester
 from data_services.models import DimReplication
 
@@ -55,24 +55,13 @@ class UploadZip(FormView):
             sync = False
         # ingest the files using Dataingestion apps and celery and save them to the system
 
-        filename = os.path.basename(path)
-        ids = filename.split("-")
-        if len(ids) == 3:
-            # Filename is in format manifest-execid-seriesid.zip
-            # For example, manifest-54321-000.zip
-            # (\w+)-(\d+)-(\d+).zip
-            dummy, execid, seriesid  = ids
-            # remove .zip
-            seriesid, dummy = seriesid.split(".")
-        else:
-            # Old EMOD format
-            seriesid = None
-            execid = None
-            #raise TypeError("wrong filename format")
+        # Filename is in format manifest-execid-seriesid.zip, or in the old EMOD format
+        execid, seriesid = ids_from_filename(path)
 
         if not hasattr(settings, "AUTOSCOTTY_DONT_USE_CELERY"):
             try:
-                result = ingest_files.delay(path, model_type, execid = execid, seriesid = seriesid)
+                # The status of the run is updated once the replication is ingested, even if it fails
+                result = ingest_batch([(path, execid, seriesid)], model_type)
             except Exception as e:
                 stacktrace = traceback.format_exc()
                 #traceback.print_exc()
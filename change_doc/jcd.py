@@ -4,7 +4,6 @@ This package contains the information for the JSON Change Document (JCD).
 
 import json
 import itertools
-from copy import deepcopy
 
 
 def frange(start, stop, step):
@@ -398,44 +397,86 @@ class JCD(object):
     def expand(self):
         """
         This expand all factorables into individual JCDs
+
+        The whole expansion is held in memory.  For large factorial runs, use iter_expand to get the executions one
+        at a time, or num_executions if only their number is needed.
+        """
+        (rl_jcd, num_executions, executions) = self.iter_expand()
+        return rl_jcd, num_executions, list(executions)
+
+    def num_executions(self):
         """
-        num_iter = 0
-        jcd_list = list()
+        This returns the number of executions the JCD expands into.
 
+        The number is the product of the number of values of each factorable, so nothing is expanded.
+        """
         tlc = self.get_top_level_changes()
         if len(tlc) == len(self.change_list):
-            return self, 1, []
+            return 1
 
-        #ll_change_list = deepcopy(self.change_list)
-        ll_change_list = list()
+        num_executions = 1
+        for ndx, values in self.get_factorables():
+            num_executions *= len(values)
+        return num_executions
 
-        for change in self.change_list:
-            if change not in tlc:
-                ll_change_list.append(change)
+    def iter_expand(self):
+        """
+        This is the lazy version of expand.  It returns the run level JCD, the number of executions and an iterator
+        that yields the JCD of each execution on demand.
 
+        The execution JCDs share the Change objects that are the same across executions (as well as the Change built
+        for each sweep value or arm), rather than each one holding a deep copy.  They must be treated as read-only.
 
-        ll_jcd = JCD.from_changes(ll_change_list)
+        :returns: Tuple of (run_level_jcd, num_executions, iterator of execution JCDs)
+        """
+        tlc = self.get_top_level_changes()
+        if len(tlc) == len(self.change_list):
+            return self, 1, iter([])
+
+        ll_jcd = JCD.from_changes(self.change_list[len(tlc):])
         new_tljcd = JCD.from_changes(tlc)
 
         factorables = ll_jcd.get_factorables()
 
-        ndx_list = [f[0] for f in factorables]
-        iterlist = [f[1] for f in factorables]
+        num_executions = 1
+        for ndx, values in factorables:
+            num_executions *= len(values)
+
+        return new_tljcd, num_executions, self._iter_executions(ll_jcd, factorables)
+
+    @staticmethod
+    def _iter_executions(ll_jcd, factorables):
+        """
+        This generates the execution JCDs of a factorial expansion (see iter_expand)
 
-        iterations = itertools.product(*iterlist)
+        :param ll_jcd: JCD with the changes after the top level changes
+        :param factorables: Factorables of ll_jcd, as returned by get_factorables
+        """
+        ll_jcdict = ll_jcd.jcdict
 
-        for iteration in iterations:
-            num_iter += 1
-            new_jcd = deepcopy(ll_jcd)
-            new_jcd.jcd_objects = list()
-            for ndx, value in enumerate(iteration):
+        # The Change replacing a factorable is built once per value.  None leaves the factorable's change in place.
+        ndx_list = list()
+        iterlist = list()
+        for ndx, values in factorables:
+            changes = list()
+            for value in values:
                 if isinstance(value, dict):                 # This was a change for sweeps
-                    new_jcd.change_list[ndx_list[ndx]] = Change.atomic(dicts=value)
+                    changes.append(Change.atomic(dicts=value))
                 elif isinstance(value, (str, unicode)):     # This was an arm expansion
-                    new_jcd.change_list[ndx_list[ndx]] = Change.node(value, ll_jcd.jcdict[value]['Changes'])
-            jcd_list.append(new_jcd)
-
-        return new_tljcd, num_iter, jcd_list
+                    changes.append(Change.node(value, ll_jcdict[value]['Changes']))
+                else:
+                    changes.append(None)
+            ndx_list.append(ndx)
+            iterlist.append(changes)
+
+        for iteration in itertools.product(*iterlist):
+            change_list = list(ll_jcd.change_list)
+            for ndx, change in zip(ndx_list, iteration):
+                if change is not None:
+                    change_list[ndx] = change
+            new_jcd = JCD()
+            new_jcd.change_list = change_list
+            yield new_jcd
 
 
 class Change(object):
@@ -5,7 +5,7 @@ This package contains the unittests and functional tests for the JSON Change Doc
 import json
 from unittest import TestCase
 from copy import deepcopy
-from change_doc.jcd import JCD
+from change_doc.jcd import JCD, Change
 
 
 class jcdTests(TestCase):
@@ -93,4 +93,73 @@ class jcdTests(TestCase):
             ValueError,
             JCD._get_factorables,
             self.bad_jcd
-        )
\ No newline at end of file
+        )
+
+
+class jcdExpansionTests(TestCase):
+    """
+    This will test the factorial expansion of JCDs (expand, iter_expand and num_executions)
+    """
+
+    def setUp(self):
+        """
+        Here we build a JCD with a top level change, two sweeps (3 and 4 values), a change between them and an arm
+        (2 values), so it expands into 24 executions.
+        """
+        self.jcd = JCD.from_changes([
+            Change.atomic(xpath='parameters/a', value=1),
+            Change.sweep('sweep1', xpath='parameters/b', l_vals=[1, 2, 3]),
+            Change.atomic(xpath='parameters/c', value=2),
+            Change.sweep('sweep2', xpath='parameters/d', start=1, stop=4, step=1),
+            Change.arm(['mosquito1', 'mosquito2'], [[{'parameters/e': 1}], [{'parameters/e': 2}]])
+        ])
+
+    def testnumexecutions(self):
+        """
+        This will test that num_executions matches the expansion
+        """
+        self.assertEqual(self.jcd.num_executions(), 24)
+        self.assertEqual(len(self.jcd.expand()[2]), 24)
+
+        no_factorables = JCD.from_changes([Change.atomic(xpath='parameters/a', value=1)])
+        self.assertEqual(no_factorables.num_executions(), 1)
+
+        #------ Large runs are counted without being expanded
+        large = JCD.from_changes([
+            Change.sweep('sweep%d' % i, xpath='parameters/p%d' % i, l_vals=range(10)) for i in range(6)
+        ])
+        self.assertEqual(large.num_executions(), 10 ** 6)
+
+    def testiterexpand(self):
+        """
+        This will test that iter_expand yields every execution in sweep order (the first factorable varies slowest),
+        sharing their unchanged changes
+        """
+        (rl_jcd, num_executions, executions) = self.jcd.iter_expand()
+        self.assertEqual(num_executions, 24)
+        self.assertEqual(json.loads(rl_jcd.json), {"Changes": [{"parameters/a": 1}]})
+
+        expected = []
+        for b in [1.0, 2.0, 3.0]:
+            for d in [1, 2, 3, 4]:
+                for (arm, e) in [("mosquito1", 1), ("mosquito2", 2)]:
+                    expected.append({
+                        "Changes": [{"parameters/b": b}, {"parameters/c": 2}, {"parameters/d": d}, "+" + arm],
+                        arm: {"Changes": [{"parameters/e": e}]}
+                    })
+
+        executions = list(executions)
+        self.assertEqual([json.loads(doc.json) for doc in executions], expected)
+        self.assertEqual(
+            json.loads(executions[-1].json),
+            {
+                "Changes": [{"parameters/b": 3.0}, {"parameters/c": 2}, {"parameters/d": 4}, "+mosquito2"],
+                "mosquito2": {"Changes": [{"parameters/e": 2}]}
+            }
+        )
+        self.assertEqual(
+            [json.loads(doc.json) for doc in self.jcd.expand()[2]],
+            expected,
+            msg="expand and iter_expand disagree"
+        )
+        self.assertIs(executions[0].change_list[1], executions[-1].change_list[1])
@@ -18,6 +18,7 @@ from django.core.exceptions import ObjectDoesNotExist, PermissionDenied
 from django.db.models import Q, Sum
 from django.db import connections
 
+from change_doc import JCD
 from data_services.utils.run_data import RunData
 from datawarehouse.models import FactWeather
 from data_services.models import DimLocation, DimRun, DimExecution, GisBaseTable, DimUser, \
@@ -673,7 +674,8 @@ Solomon Islands,Solomon Islands,NA,NA,x059c738z""")
 
     def fetch_data(self, execution_id=-1, exec_dict=None, run_id=-1, channel_id=-1, as_chart=False, destination='',
                    with_ts=False, channel_name='', channel_type='', as_object=False, as_highstock=False,
-                   group_by=False):
+                   group_by=False, max_points=None, x_min=None, x_max=None, downsampling='lttb',
+                   as_statistics=False):
         """
         This fetch data method now is an interface for the RunData class.  This will allow the adapter
         to fetch data based on an execution id, channel id, channel name, execution dictionary, etc.  Given
@@ -703,6 +705,17 @@ Solomon Islands,Solomon Islands,NA,NA,x059c738z""")
         :type as_object: bool
         :param group_by: Flag that determines whether to group the data returned by the call into yearly segments
         :type group_by: bool
+        :param max_points: (Optional) Number of points to keep in each series of a highstock chart
+        :type max_points: int
+        :param x_min: (Optional) First date of the highstock chart, in milliseconds from the epoch
+        :type x_min: float
+        :param x_max: (Optional) Last date of the highstock chart, in milliseconds from the epoch
+        :type x_max: float
+        :param downsampling: Method used to downsample the series of a highstock chart, 'lttb' or 'min_max'
+        :type downsampling: str
+        :param as_statistics: (Defaults False) Return the distribution of the data across replications (quartiles,
+                              whiskers, outliers and confidence interval of the mean) instead of the data itself
+        :type as_statistics: bool
         """
         arguments = dict()
         if execution_id != -1:
@@ -725,8 +738,11 @@ Solomon Islands,Solomon Islands,NA,NA,x059c738z""")
 
         data_obj = RunData(**arguments)
 
-        if as_chart or as_highstock:
-            return data_obj.as_chart(as_highstock=as_highstock)
+        if as_statistics:
+            return data_obj.as_statistics()
+        elif as_chart or as_highstock:
+            return data_obj.as_chart(as_highstock=as_highstock, max_points=max_points, x_min=x_min, x_max=x_max,
+                                     downsampling=downsampling)
         elif as_object:
             return data_obj.as_object()
         else:
@@ -922,7 +938,7 @@ Solomon Islands,Solomon Islands,NA,NA,x059c738z""")
         return db_note.id
 
     @classmethod
-    def expand_run(cls, run, reps_per_exec):
+    def expand_run(cls, run, reps_per_exec, with_replications=False):
         """
         This will expand the given run into executions.  An execution is a particular configuration of
         a set of inputs to be used by the models.  This will take the JSON Change Document (JCD) from the
@@ -935,39 +951,27 @@ Solomon Islands,Solomon Islands,NA,NA,x059c738z""")
         changes after the first factorable type is defined must be applied in order, and therefore belong
         to the execution.
 
+        The executions, and their replications if with_replications is set, are created with bulk inserts in a
+        single transaction (see DimRun.create_executions).
+
         This will return the number of executions, and the list of executions
 
         :param run: DimRun object that needs to be expanded
         :param reps_per_exec: Number of replications for generated executions
+        :param with_replications: Flag indicating that the replications should be created too
         :returns: Number of executions, List of saved Executions
         """
         if not hasattr(run, 'jcd'):
             raise ValueError("Run object does not have JCD")
 
         jcd = run.jcd
-        exec_list = list()
 
-        (rl_jcd, num_executions, jcd_list) = jcd.expand()
+        (rl_jcd, num_executions, jcd_list) = jcd.iter_expand()
 
         if num_executions == 1:
-            new_execution = DimExecution(
-                run_key=run,
-                name=run.name,
-                replications=reps_per_exec
-            )
-            new_execution.save()
-            exec_list.append(new_execution)
-            return num_executions, exec_list
-
-        for doc in jcd_list:
-            new_execution = DimExecution(
-                run_key=run,
-                name=cls.name_from_sweeps(doc.change_list),
-                replications=reps_per_exec,
-                jcd=doc
-            )
-            new_execution.save()
-            exec_list.append(new_execution)
+            jcd_list = [JCD()]
+
+        exec_list = run.create_executions(jcd_list, reps_per_exec, with_replications=with_replications)
 
         return num_executions, exec_list
 
@@ -0,0 +1,174 @@
+"""
+Columnar index of the channels of an EMOD InsetChart.json output file.
+
+When an InsetChart.json output file is stored, its channels are also written to an index file on the file server: an
+8-byte length, a json header mapping each channel's title to its offset and number of values, and then the values of
+all the channels as little-endian doubles.  Charting a channel then reads the header and that channel's values
+instead of decoding the whole InsetChart.json, and the channels read recently are kept in memory by each process.
+
+With the "data" write scheme the index is not stored, since its URI would hold the whole index: it's built in memory
+from the InsetChart.json when its channels are read, and only the channels read recently are kept.
+
+The index is identified by a key in the caches: the URI of a stored index, or the checksum of the InsetChart.json.
+"""
+
+from array import array
+from collections import OrderedDict
+import io
+import json
+import struct
+import sys
+
+from django.conf import settings
+
+from data_services.ingesters.emod_json import read_channels
+from data_services.sim_file_server.conf import get_active_server
+from lib.lru_cache import LRUCache
+
+#: Name of the output files that are indexed
+INSET_CHART = 'InsetChart.json'
+
+#: Maximum size (in bytes) of the channel values cached by each process
+CHANNEL_INDEX_CACHE_SIZE = getattr(settings, "CHANNEL_INDEX_CACHE_SIZE", 32 * 1024 * 1024)
+
+_header_size = struct.Struct('<Q')
+
+_headers = LRUCache(1000)
+_channels = LRUCache(CHANNEL_INDEX_CACHE_SIZE, sizeof=lambda values: 100 + len(values) * values.itemsize)
+
+
+def is_index_stored():
+    """
+    Are the indexes stored on the file server?  They are not with the "data" write scheme.
+    """
+    return settings.FILE_SERVER.get('write scheme') != 'data'
+
+
+def build_channel_index(contents):
+    """
+    Build the index of an InsetChart.json.  Channels with sub channels are left out.
+
+    :param contents: The contents of the InsetChart.json, or a file-like object to read them from
+    :type contents: str or file
+    :returns str: The contents of the index
+    """
+    if isinstance(contents, str):
+        contents = io.BytesIO(contents)
+    header = OrderedDict()
+    chunks = []
+    offset = 0
+    for title, values in read_channels(contents)[1].iteritems():
+        if isinstance(values, list):
+            continue
+        if sys.byteorder != 'little':
+            values.byteswap()
+        header[title] = [offset, len(values)]
+        chunks.append(values.tostring())
+        offset += len(values)
+    header = json.dumps(header)
+    return _header_size.pack(len(header)) + header + "".join(chunks)
+
+
+def stored_index(uri):
+    """
+    :param uri: URI of the index on the file server
+    :returns: Tuple of (key, function opening the index) of a stored index
+    """
+    return uri, lambda: get_active_server().open_for_reading(uri)
+
+
+def built_index(checksum, open_inset_chart):
+    """
+    :param checksum: Checksum of the InsetChart.json
+    :param open_inset_chart: Function opening the InsetChart.json
+    :returns: Tuple of (key, function opening the index) of an index built in memory when it's read
+    """
+    def open_index():
+        with open_inset_chart() as f:
+            return io.BytesIO(build_channel_index(f))
+    return checksum, open_index
+
+
+def get_channel_titles(index):
+    """
+    :param index: Tuple of (key, function opening the index), see stored_index and built_index
+    :returns: List of the channel titles
+    """
+    key, open_index = index
+    header = _headers.get(key)
+    if header is None:
+        with open_index() as f:
+            header = _read_header(f)
+        _headers.put(key, header)
+    return list(header.keys())
+
+
+def get_channel(index, title):
+    """
+    Read the values of a channel.
+
+    :param index: Tuple of (key, function opening the index), see stored_index and built_index
+    :param title: Title of the channel
+    :returns: array('d') of the values.  It's shared with other callers and must not be modified.
+    :raises KeyError: if there is no such channel
+    """
+    key, open_index = index
+    values = _channels.get((key, title))
+    if values is None:
+        header = _headers.get(key)
+        if header is not None and title not in header:
+            raise KeyError(title)
+        with open_index() as f:
+            position = 0
+            if header is None:
+                header = _read_header(f)
+                _headers.put(key, header)
+                position = _header_size.size + header.size
+            offset, count = header[title]
+            _skip(f, _header_size.size + header.size + offset * 8, position)
+            values = array('d')
+            values.fromstring(_read(f, count * 8))
+        if sys.byteorder != 'little':
+            values.byteswap()
+        _channels.put((key, title), values)
+    return values
+
+
+class _Header(OrderedDict):
+    """
+    Header of an index: OrderedDict mapping the channel titles to (offset, number of values), and the size of the
+    header in the index.
+    """
+    size = 0
+
+
+def _read_header(file_obj):
+    (size,) = _header_size.unpack(_read(file_obj, _header_size.size))
+    header = json.loads(_read(file_obj, size), object_pairs_hook=_Header)
+    header.size = size
+    return header
+
+
+def _read(file_obj, size):
+    data = file_obj.read(size)
+    while len(data) < size:
+        chunk = file_obj.read(size - len(data))
+        if not chunk:
+            raise ValueError('The channel index is truncated')
+        data += chunk
+    return data
+
+
+def _skip(file_obj, position, current=0):
+    """
+    Move forward to a position of a file.  Files that can't seek (e.g. on a WebDAV server) are read up to the
+    position.
+
+    :param current: The current position
+    """
+    try:
+        file_obj.seek(position)
+    except (AttributeError, IOError):
+        position -= current
+        while position > 0:
+            position -= len(_read(file_obj, min(position, 64 * 1024)))
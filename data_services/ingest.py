@@ -1,3 +1,4 @@
+import os
 from data_services.ingesters.EMOD_ingest import EMOD_ingester
 
 MODELS = {
@@ -6,13 +7,34 @@ MODELS = {
 }   #:
 
 
-def ingest_files(zip_file, model_type, execid = None, seriesid = None):
+def ids_from_filename(path):
+    """
+    This method parses the execution and series ids out of the name of a zip file sent back by the cluster.  Files
+    are named manifest-execid-seriesid.zip (for example manifest-54321-000.zip).  Old style EMOD files named
+    file_name-replication_number.zip carry no execution or series id, in which case (None, None) is returned and the
+    ingester gets the replication from the file name itself.
+
+    :param string path: Path to the zip file
+    :return: A tuple (execid, seriesid)
+    """
+    ids = os.path.basename(path).split("-")
+    if len(ids) == 3:
+        dummy, execid, seriesid = ids
+        # remove .zip
+        seriesid, dummy = seriesid.split(".")
+        return execid, seriesid
+    return None, None
+
+
+def ingest_files(zip_file, model_type, execid = None, seriesid = None, update_run_status=True):
     """
     This method accepts a path to a zip file and a model type and calls the appropriate ingester. It is responsible for
     determining which ingester to use, in order to abstract such functionality from the tools.
     :param File zip_file: A path to a file. The path should point to a zip file.
     :param string model_type: A string indicating the simulation model type.
-    :return: None
+    :param bool update_run_status: If False, only the status of the replication is updated and the caller is
+     responsible for calling set_status on the run (for instance once per batch of replications).
+    :return: The id of the run the replication belongs to
     """
     # get the appropriate ingester using the model_type
     # if execution happens in ingest() or process_metadoc(), just propagate it to caller
@@ -20,6 +42,6 @@ def ingest_files(zip_file, model_type, execid = None, seriesid = None):
         raise NotImplementedError("OM Ingestion is no longer supported")
     else:
         tmp_ingester = MODELS[model_type](zip_file, execid=execid, seriesid=seriesid)
-        tmp_ingester.ingest()
+        tmp_ingester.ingest(update_run_status=update_run_status)
 
-    return None
+    return tmp_ingester.run.id
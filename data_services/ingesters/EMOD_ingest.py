@@ -13,13 +13,17 @@ import json
 import os
 import psycopg2
 import datetime
+from array import array
 from io import BytesIO
 from struct import pack
 from django.db import connections, transaction
 from django.core.exceptions import ObjectDoesNotExist
 from data_services.ingesters.base_ingester import Base_ingester
+from data_services.ingesters.emod_json import read_channels
+from data_services.ingesters.channel_registry import ChannelRegistry
 from data_services.models import DimReplication, DimChannel, BaseFactData, DimExecution, SimulationInputFile
-from data_services.utils import encode_binary, commit_to_warehouse
+from data_services.utils.run_data import is_execution_finished, summarize_execution
+from data_services.utils import encode_binary_batch, commit_to_warehouse, stream_to_warehouse, FACT_COLUMNS
 import pdb
 import os
 from vecnet.emod.output import convert_to_csv
@@ -201,51 +205,69 @@ class EMOD_ingester(Base_ingester):
             msg=msg
         )
 
-    def ingest(self):
+    def ingest(self, stream=True, database_ids=True, update_run_status=True):
         """ This ingest method will step through all of the files in the file list and
         add the data contained within them to the database.  This method is also the
         "main" for this ingester, and contains byte conversion and the like
 
+        By default the COPY payload is streamed to the database channel by channel (see copy_chunks), so only one
+        parsed file and one encoded channel are held in memory at a time.  If stream is False the whole replication
+        is encoded into a single BytesIO before being sent.
+
+        When streaming, ids are assigned by the database by default, so several ingesters can load replications
+        at the same time.  If database_ids is False, ids are written explicitly starting at self.next_id and the
+        id sequence is reset afterwards, which is only safe when a single ingester runs at a time.  The non
+        streaming mode always writes explicit ids.
+
+        :param stream: Stream the COPY payload instead of building it in memory
+        :type stream: bool
+        :param database_ids: Let the database assign the ids of the new rows (streaming only)
+        :type database_ids: bool
+        :param update_run_status: Recompute the status of the run once the replication is ingested.  Batch
+                                  ingestion turns this off and updates the run once for the whole batch.
+        :type update_run_status: bool
         :returns: Nothing
         """
         t1 = datetime.datetime.now()
         # Preprocess
         # self.preProcess()
 
-        # Ready the byte container and add the Postgres Header
-
-        cpy = BytesIO()
-        cpy.write(pack('!11sii', b'PGCOPY\n\377\r\n\0', 0, 0))
-
-        for file_type in self.Channel_dict.keys():
+        if stream:
             try:
-                parser = self.parse_file(str(file_type))
-                self.next_id = parser(str(file_type), cpy, self.next_id)
-                # self.parse_file(str(file_type), cpy, self.next_id)
+                if database_ids:
+                    stream_to_warehouse(
+                        self.copy_chunks(database_ids=True),
+                        connections['default'].settings_dict,
+                        'base_fact_data',
+                        columns=FACT_COLUMNS
+                    )
+                else:
+                    stream_to_warehouse(
+                        self.copy_chunks(),
+                        connections['default'].settings_dict,
+                        'base_fact_data',
+                        lambda: self.next_id
+                    )
             except KeyError as detail:
                 self.set_status(-1, "Key error, a key of %s was not found" % detail)
                 return
+        else:
+            # Ready the byte container and add the Postgres Header
+            cpy = BytesIO()
+            cpy.write(pack('!11sii', b'PGCOPY\n\377\r\n\0', 0, 0))
 
-        # Close the file as per postgresql docs
-        cpy.write(pack('!h', -1))
-
-        commit_to_warehouse(cpy, connections['default'].settings_dict, 'base_fact_data', self.next_id)
-        #cpy.seek(0)
-        #conn_dict = connections['default'].settings_dict
-        #conn = psycopg2.connect(
-        #    host=conn_dict['HOST'],
-        #    port=conn_dict['PORT'],
-        #    user=conn_dict['USER'],
-        #    password=conn_dict['PASSWORD'],
-        #    database=conn_dict['NAME'])
-        #data_cursor = conn.cursor()
-        #data_cursor.copy_expert('COPY base_fact_data FROM STDIN WITH BINARY', cpy)
-        #data_cursor.close()
-        #conn.commit()
-        #conn.close()
-
-        # Reset the sequence counter to the appropriate value
-        #cursor.execute('ALTER SEQUENCE base_fact_data_id_seq RESET %s' % next_id)
+            for file_type in self.Channel_dict.keys():
+                try:
+                    parser = self.parse_file(str(file_type))
+                    self.next_id = parser(str(file_type), cpy, self.next_id)
+                except KeyError as detail:
+                    self.set_status(-1, "Key error, a key of %s was not found" % detail)
+                    return
+
+            # Close the file as per postgresql docs
+            cpy.write(pack('!h', -1))
+
+            commit_to_warehouse(cpy, connections['default'].settings_dict, 'base_fact_data', self.next_id)
 
         # Re-add all constraints
         # TODO: Also include re-adding indexes if they were deleted or creating new ones.
@@ -261,12 +283,41 @@ class EMOD_ingester(Base_ingester):
 
         # Replication and run status update
         self.set_status(0)
-        self.run.set_status()
 
-        # print self.run.status
-        self.run.save()
+        # Precompute the statistics of the execution once its last replication is in
+        execution = self.replication.execution_key
+        if is_execution_finished(execution):
+            summarize_execution(execution)
+
+        if update_run_status:
+            self.run.set_status()
+
+            # print self.run.status
+            self.run.save()
         return
 
+    def copy_chunks(self, database_ids=False):
+        """
+        This generator yields the binary COPY payload for the replication one channel at a time, starting with the
+        PGCOPY header and ending with the file trailer.  Files are only opened when the previous file has been fully
+        consumed, and self.next_id is advanced as channels are produced.
+
+        :param database_ids: Leave the id column out of the rows, they must then be copied into FACT_COLUMNS
+        :type database_ids: bool
+        """
+        yield pack('!11sii', b'PGCOPY\n\377\r\n\0', 0, 0)
+
+        for file_type in self.Channel_dict.keys():
+            for channel, data in self.iter_channels(str(file_type)):
+                if database_ids:
+                    yield self.encode_channel(data, channel, None)
+                else:
+                    yield self.encode_channel(data, channel, self.next_id)
+                    self.next_id += len(data)
+
+        # Close the file as per postgresql docs
+        yield pack('!h', -1)
+
     def parse_file(self, file_type):
         """
         This method is responsible for choosing which method to use on which file. This is being used as a replacement
@@ -285,6 +336,18 @@ class EMOD_ingester(Base_ingester):
             'VectorSpeciesReport': self.parse_vector_species
         }.get(file_type, self.parse_generic_file)
 
+    def iter_channels(self, file_type):
+        """
+        This method is the generator counterpart of parse_file.  It yields a (channel, data) tuple for every channel
+        of the given file that still needs to be ingested.
+
+        :param file_type: Type of file (ex BRF, ICF, etc)
+        :type file_type: str
+        """
+        return{
+            'VectorSpeciesReport': self.iter_vector_species
+        }.get(file_type, self.iter_generic_file)(file_type)
+
     def parse_generic_file(self, file_type, pg_io, pg_index):
         """
         This method is responsible for parsing the DemographicsSummary, BinnedReport, and InsetChart files for
@@ -297,29 +360,37 @@ class EMOD_ingester(Base_ingester):
         :param pg_io: BytesIO object to fill with data from a particular channel
         :type pg_io: BytesIO
         """
+        for chan, data in self.iter_generic_file(file_type):
+            pg_index = self.transform_data(data, chan, pg_io, pg_index)
+        return pg_index
+
+    def iter_generic_file(self, file_type):
+        """
+        This generator yields the (channel, data) tuples of the DemographicsSummary, BinnedReport, and InsetChart
+        files for the EMOD model.  It does not parse the VectorSpeciesReport file.
+
+        :param file_type: Type of file (ex BRF, ICF, etc)
+        :type file_type: str
+        """
         filename = self.FileList[file_type]
 
-        file_json = json.loads(open(filename, 'r').read())
-        channel_list = self.Channel_dict[file_type]
+        # To ensure that a single channel is never ingested more than once
+        channel_list = [chan for chan in self.Channel_dict[file_type] if chan not in self.alreadyIngested]
+        meaning, channels = read_channels(filename, set(chan.title for chan in channel_list))
         for chan in channel_list:
-            # To ensure that a single channel is never ingested more than once
-            if chan in self.alreadyIngested:
-                continue
             try:
                 if chan.type is not None:
-                    type_ndx = file_json['Header']['Subchannel_Metadata']['MeaningPerAxis'][0].index(chan.type)
-                    data = file_json['Channels'][chan.title]['Data'][type_ndx]
+                    type_ndx = meaning.index(chan.type)
+                    data = channels[chan.title][type_ndx]
                 else:
-                    data = file_json['Channels'][chan.title]['Data']
-
-                pg_index = self.transform_data(data, chan, pg_io, pg_index)
+                    data = channels[chan.title]
             except KeyError:
                 title = chan.title
                 if chan.type is not None:
                     title += ' - ' + chan.type
                 self.set_status(-1, 'Channel %s not found in output file; Ingestion Failed' % title)
                 raise KeyError('Channel %s not found in output file; Ingestion Failed' % title)
-        return pg_index
+            yield chan, data
 
     def parse_vector_species(self, file_type, pg_io, pg_index):
         """
@@ -334,39 +405,38 @@ class EMOD_ingester(Base_ingester):
         :param pg_io: BytesIO object to fill with data from a particular channel
         :type pg_io: BytesIO
         """
+        for channel, spec_data in self.iter_vector_species(file_type):
+            pg_index = self.transform_data(spec_data, channel, pg_io, pg_index)
+        return pg_index
+
+    def iter_vector_species(self, file_type):
+        """
+        This generator yields the (channel, data) tuples of the VectorSpecies file.  Channels are created and added
+        to the run if necessary, all at once through a ChannelRegistry.
+
+        :param file_type: Type of file (ex BRF, ICF, etc)
+        :type file_type: str
+        """
         filename = self.FileList[file_type]
 
-        file_obj = open(filename, 'r')
-        file_json = json.loads(file_obj.read())
-        file_obj.close()
+        species_list, channels = read_channels(filename)
 
-        species_list = file_json['Header']['Subchannel_Metadata']['MeaningPerAxis'][0]
-        channels = file_json['Channels'].keys()
+        # Resolve every (channel, species) pair of the file at once
+        registry = ChannelRegistry.for_run(self.run, 'VectorSpeciesReport')
+        resolved = registry.resolve(
+            (chan, species_list[spec_ndx]) for chan, data_lists in channels.iteritems()
+            for spec_ndx in range(len(data_lists))
+        )
 
-        for chan_ndx, chan in enumerate(channels):
-            try:
-                data_lists = file_json['Channels'][channels[chan_ndx]]['Data']
-                for spec_ndx, spec_data in enumerate(data_lists):
-                    channel = DimChannel.objects.get_or_create(
-                        title=chan,
-                        type=species_list[spec_ndx],
-                        file_name='VectorSpeciesReport'
-                    )
-                    channel = channel[0]
-                    # To ensure that a single channel is never ingested more than once
-                    if channel in self.alreadyIngested:
-                        continue
-                    self.run.dimchannel_set.add(channel)
-                    pg_index = self.transform_data(spec_data, channel, pg_io, pg_index)
-            except KeyError:
-                title = chan.title
-                if chan.type is not None:
-                    title += ' - ' + chan.type
-                self.set_status(-1, 'Channel %s not found in output file; Ingestion Failed' % title)
-                raise KeyError('Channel %s not found in output file; Ingestion Failed' % title)
+        for chan, data_lists in channels.iteritems():
+            for spec_ndx, spec_data in enumerate(data_lists):
+                channel = resolved[(chan, species_list[spec_ndx])]
+                # To ensure that a single channel is never ingested more than once
+                if channel in self.alreadyIngested:
+                    continue
+                yield channel, spec_data
 
         self.run.save()
-        return pg_index
 
 
     def preProcess(self):
@@ -437,7 +507,7 @@ class EMOD_ingester(Base_ingester):
         this, but the OM ingester could easily be refactored for this.
 
         :param data: list of data where the index of any given row is its timestep
-        :type data: list
+        :type data: list or array
         :param channel: Channel that the data should be associated with
         :type channel: DimChannel
         :param pg_io: BytesIO to which to add data
@@ -445,7 +515,7 @@ class EMOD_ingester(Base_ingester):
         :param pg_index: Index for which the data should be inserted at
         :type pg_index: int
         """
-        if not isinstance(data, list):
+        if not isinstance(data, (list, array)):
             raise ValueError('Data must be a list of numbers, received %s', type(data))
         if not isinstance(channel, DimChannel):
             raise ValueError('Channel must be an instance of DimChannel, received %s' % type(channel))
@@ -454,29 +524,28 @@ class EMOD_ingester(Base_ingester):
         if not isinstance(pg_index, int):
             raise ValueError('pg_index must be an integer, received %s' % type(pg_index))
 
-        for ts, datum in enumerate(data):
-            pg_io.write(
-                encode_binary(
-                    pg_id=pg_index,
-                    timestep=ts,
-                    value=datum,
-                    channel_key=channel.id,
-                    run_key=self.run.id,
-                    replication_key=self.replication.id)
-            )
-            pg_index += 1
+        pg_io.write(self.encode_channel(data, channel, pg_index))
+        pg_index += len(data)
 
         return pg_index
 
+    def encode_channel(self, data, channel, pg_index):
+        """
+        Encode the data of a single channel of this replication into PGCOPY binary rows, starting at id pg_index.
+        If pg_index is None the id column is left out of the rows.
 
-
-
-
-
-
-
-
-
-
-
-
+        :param data: list of data where the index of any given row is its timestep
+        :type data: list or array
+        :param channel: Channel that the data should be associated with
+        :type channel: DimChannel
+        :param pg_index: Index for which the data should be inserted at, or None
+        :type pg_index: int
+        :returns: bytearray
+        """
+        return encode_binary_batch(
+            pg_id=pg_index,
+            data=data,
+            channel_key=channel.id,
+            run_key=self.run.id,
+            replication_key=self.replication.id
+        )
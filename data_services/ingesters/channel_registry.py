@@ -0,0 +1,129 @@
+########################################################################################################################
+# VECNet CI - Prototype
+# Date: 05/02/2013
+# Institution: University of Notre Dame
+# Primary Authors:
+#   Lawrence Selvy <Lawrence.Selvy.1@nd.edu>
+########################################################################################################################
+
+from collections import OrderedDict
+
+from django.db import connection, transaction
+
+from data_services.models import DimChannel
+
+#: Key of the advisory lock serializing the creation of channels and their links to runs between ingesters
+#: (two int4 keys, which don't overlap the single bigint keys of other advisory locks)
+CHANNEL_LOCK_KEY = (0x4348414e, 0)
+
+
+class ChannelRegistry(object):
+    """
+    This class resolves (title, type) pairs of a given output file into DimChannel rows for a run, creating the
+    channels that do not exist yet and linking them to the run.
+
+    All the channels needed by a file are resolved with one select, missing channels are created with one bulk insert
+    (plus one select to fetch their ids, as bulk_create does not return them), and links to the run are made with one
+    bulk insert into the dim_channel_runs table.  Registries are cached per process and per run (see for_run), so
+    further replications of the same run do not hit the database at all once their channels are known.
+
+    Ingesters run in parallel, and DimChannel has no unique constraint, so channels are created and linked while
+    holding an advisory lock (CHANNEL_LOCK_KEY), after checking again which ones exist.
+    """
+
+    #: Registries cached in this process, keyed by (run id, file name)
+    _registries = OrderedDict()
+
+    #: Maximum number of registries kept in the cache, the least recently used registry is dropped first
+    MAX_CACHED = 64
+
+    def __init__(self, run, file_name):
+        """
+        :param run: Run the channels should be linked to
+        :type run: DimRun
+        :param file_name: Name of the output file the channels come from (ex VectorSpeciesReport)
+        :type file_name: str
+        """
+        self.run = run
+        self.file_name = file_name
+        #: DimChannel instances keyed by (title, type)
+        self.channels = dict()
+        #: Ids of the channels that are known to be linked to the run
+        self.linked = set()
+
+    @classmethod
+    def for_run(cls, run, file_name):
+        """
+        Return the cached registry for the given run and file, creating it if necessary.
+
+        :param run: Run the channels should be linked to
+        :type run: DimRun
+        :param file_name: Name of the output file the channels come from (ex VectorSpeciesReport)
+        :type file_name: str
+        :returns: ChannelRegistry
+        """
+        key = (run.id, file_name)
+        registry = cls._registries.pop(key, None)
+        if registry is None:
+            registry = cls(run, file_name)
+        cls._registries[key] = registry
+        while len(cls._registries) > cls.MAX_CACHED:
+            cls._registries.popitem(last=False)
+        return registry
+
+    def resolve(self, keys):
+        """
+        Resolve (title, type) pairs into DimChannel instances.  Channels that do not exist are created and every
+        channel returned is linked to the run.
+
+        :param keys: (title, type) pairs to resolve
+        :type keys: list
+        :returns: dictionary mapping (title, type) to DimChannel
+        """
+        keys = list(keys)
+        missing = [key for key in keys if key not in self.channels]
+        if missing:
+            self._fetch(missing)
+            missing = [key for key in missing if key not in self.channels]
+        if missing or set(self.channels[key].id for key in keys) - self.linked:
+            with transaction.commit_on_success():
+                cursor = connection.cursor()
+                cursor.execute("select pg_advisory_xact_lock(%s, %s)", CHANNEL_LOCK_KEY)
+                if missing:
+                    # Another ingester may have created them since they were fetched
+                    self._fetch(missing)
+                    missing = [key for key in missing if key not in self.channels]
+                if missing:
+                    DimChannel.objects.bulk_create([
+                        DimChannel(title=title, type=type, file_name=self.file_name) for title, type in set(missing)
+                    ])
+                    self._fetch(missing)
+                self._link([self.channels[key] for key in keys])
+                transaction.set_dirty()
+
+        return dict((key, self.channels[key]) for key in keys)
+
+    def _fetch(self, keys):
+        """
+        Load the channels of this file with the given titles into self.channels with a single query.  If a
+        (title, type) pair has several rows, the oldest one wins.
+        """
+        titles = set(title for title, type in keys)
+        channels = DimChannel.objects.filter(file_name=self.file_name, title__in=titles).order_by('-id')
+        for channel in channels:
+            self.channels[(channel.title, channel.type)] = channel
+
+    def _link(self, channels):
+        """
+        Link the given channels to the run with a single bulk insert, skipping links that already exist.  It must be
+        called while holding the lock on the channels (see resolve).
+        """
+        ids = set(channel.id for channel in channels) - self.linked
+        if not ids:
+            return
+        through = DimChannel.runs.through
+        existing = set(
+            through.objects.filter(dimrun_id=self.run.id, dimchannel_id__in=ids).values_list('dimchannel_id', flat=True)
+        )
+        through.objects.bulk_create([through(dimrun_id=self.run.id, dimchannel_id=pk) for pk in ids - existing])
+        self.linked.update(ids)
@@ -0,0 +1,129 @@
+########################################################################################################################
+# VECNet CI - Prototype
+# Date: 05/02/2013
+# Institution: University of Notre Dame
+# Primary Authors:
+#   Lawrence Selvy <Lawrence.Selvy.1@nd.edu>
+########################################################################################################################
+
+"""
+Incremental reader for the JSON output files written by EMOD (InsetChart, BinnedReport, DemographicsSummary and
+VectorSpeciesReport).
+
+These files all have the same layout::
+
+    {"Header": {..., "Subchannel_Metadata": {"MeaningPerAxis": [[...], ...]}},
+     "Channels": {"<title>": {"Units": ..., "Data": [...] or [[...], [...]]}, ...}}
+
+read_channels walks the file with an event based parser (ijson) so only the Data arrays of the requested channels
+are ever materialized, and those are stored as array('d') rather than lists of python floats.  If ijson is not
+installed the whole file is decoded with the json module and the requested channels are converted afterwards.
+"""
+
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
+import json
+
+try:
+    import ijson.backends.yajl2 as ijson
+except ImportError:
+    try:
+        import ijson
+    except ImportError:
+        ijson = None
+
+
+def read_channels(filename, titles=None):
+    """
+    Read the Data arrays of the given channels from an EMOD output file.
+
+    One dimensional channels are returned as an array('d').  Channels with sub channels (BinnedReport and
+    VectorSpeciesReport) are returned as a list of array('d'), one per entry of the first axis of MeaningPerAxis.
+
+    :param filename: Path to the EMOD output file, or a file-like object open for reading (it's not closed)
+    :type filename: str or file
+    :param titles: Titles of the channels to read.  If None, every channel in the file is read.
+    :type titles: set
+    :returns: A tuple containing the first axis of MeaningPerAxis (empty list if the file has none) and an
+              OrderedDict mapping channel titles to their data, in file order.  Requested titles that are not in the
+              file are absent from the dictionary.
+    """
+    if ijson is None:
+        return _read_channels_json(filename, titles)
+
+    meaning = list()
+    channels = OrderedDict()
+
+    meaning_prefix = 'Header.Subchannel_Metadata.MeaningPerAxis'
+    meaning_axis = 0
+
+    title = None
+    data_prefix = None
+    rows = None
+    row = None
+
+    with _open(filename) as file_obj:
+        for prefix, event, value in ijson.parse(file_obj):
+            if data_prefix is not None:
+                # Inside the Data array of a wanted channel
+                if event == 'number':
+                    row.append(float(value))
+                elif event == 'start_array':
+                    row = array('d')
+                    rows.append(row)
+                elif event == 'end_array' and prefix == data_prefix:
+                    channels[title] = rows if rows else row
+                    data_prefix = None
+                    rows = row = None
+            elif event == 'map_key' and prefix == 'Channels':
+                title = value
+            elif event == 'start_array' and prefix.startswith('Channels.') and prefix == 'Channels.%s.Data' % title:
+                if titles is None or title in titles:
+                    data_prefix = prefix
+                    rows = list()
+                    row = array('d')
+            elif prefix.startswith(meaning_prefix):
+                if event == 'start_array' and prefix == meaning_prefix + '.item':
+                    meaning_axis += 1
+                elif event == 'string' and meaning_axis == 1:
+                    meaning.append(value)
+
+    return meaning, channels
+
+
+def _read_channels_json(filename, titles=None):
+    """
+    Fallback for read_channels when ijson is not available.  Same parameters and return value as read_channels.
+    """
+    with _open(filename) as file_obj:
+        file_json = json.load(file_obj)
+
+    try:
+        meaning = file_json['Header']['Subchannel_Metadata']['MeaningPerAxis'][0]
+    except (KeyError, IndexError):
+        meaning = list()
+
+    channels = OrderedDict()
+    for title, channel in file_json.get('Channels', dict()).iteritems():
+        if titles is not None and title not in titles:
+            continue
+        data = channel['Data']
+        if data and isinstance(data[0], list):
+            channels[title] = [array('d', row) for row in data]
+        else:
+            channels[title] = array('d', data)
+
+    return meaning, channels
+
+
+@contextmanager
+def _open(filename):
+    """
+    Open a file given its path.  A file-like object is used as is.
+    """
+    if hasattr(filename, 'read'):
+        yield filename
+    else:
+        with open(filename, 'rb') as file_obj:
+            yield file_obj
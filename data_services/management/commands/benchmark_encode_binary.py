@@ -0,0 +1,60 @@
+from io import BytesIO
+from optparse import make_option
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from data_services.utils import encode_binary, encode_binary_batch
+
+
+class Command(BaseCommand):
+    help = '''Compare the per row and the batch PGCOPY encoders used by the EMOD ingester
+
+The data encoded mimics an EMOD InsetChart: a number of channels, each containing one value per day.'''
+
+    option_list = BaseCommand.option_list + (
+        make_option('--channels',
+                    type='int',
+                    dest='channels',
+                    default=40,
+                    help='Number of channels to encode (default: 40)'),
+        make_option('--timesteps',
+                    type='int',
+                    dest='timesteps',
+                    default=7300,
+                    help='Number of timesteps in each channel (default: 7300, 20 years of daily output)'),
+    )
+
+    def handle(self, *args, **options):
+        channels = options['channels']
+        timesteps = options['timesteps']
+        data = [[random.random() * 1000 for ts in range(timesteps)] for channel in range(channels)]
+
+        pg_io = BytesIO()
+        tstart = time.time()
+        pg_id = 1
+        for channel_key, channel_data in enumerate(data):
+            for ts, value in enumerate(channel_data):
+                pg_io.write(encode_binary(pg_id, ts, value, channel_key, 1, 1))
+                pg_id += 1
+        per_row = time.time() - tstart
+        per_row_bytes = pg_io.getvalue()
+
+        pg_io = BytesIO()
+        tstart = time.time()
+        pg_id = 1
+        for channel_key, channel_data in enumerate(data):
+            pg_io.write(encode_binary_batch(pg_id, channel_data, channel_key, 1, 1))
+            pg_id += len(channel_data)
+        batch = time.time() - tstart
+
+        if pg_io.getvalue() != per_row_bytes:
+            self.stderr.write("ERROR: batch encoding differs from per row encoding\n")
+
+        rows = channels * timesteps
+        self.stdout.write("Encoded %s rows (%s channels x %s timesteps)\n" % (rows, channels, timesteps))
+        self.stdout.write("encode_binary:       %f sec\n" % per_row)
+        self.stdout.write("encode_binary_batch: %f sec\n" % batch)
+        if batch > 0:
+            self.stdout.write("speedup: %.1fx\n" % (per_row / batch))
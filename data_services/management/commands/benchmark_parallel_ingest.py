@@ -0,0 +1,105 @@
+from multiprocessing import Pool
+from optparse import make_option
+from struct import pack
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+
+from data_services.models import DimRun, DimExecution, DimReplication
+from data_services.utils import encode_binary_batch, stream_to_warehouse, FACT_COLUMNS
+
+
+def load_replication(args):
+    """
+    Stream one synthetic replication into base_fact_data, letting the database assign the ids.  This runs in a
+    worker process, so it only receives plain values.
+    """
+    settings, run_id, replication_id, channel_ids, timesteps = args
+
+    def chunks():
+        yield pack('!11sii', b'PGCOPY\n\377\r\n\0', 0, 0)
+        for channel_id in channel_ids:
+            data = [random.random() * 1000 for ts in range(timesteps)]
+            yield encode_binary_batch(None, data, channel_id, run_id, replication_id)
+        yield pack('!h', -1)
+
+    stream_to_warehouse(chunks(), settings, 'base_fact_data', columns=FACT_COLUMNS)
+    return replication_id
+
+
+class Command(BaseCommand):
+    args = 'RUN_ID'
+    help = '''Measure the throughput of loading replications into base_fact_data with several ingestion processes
+
+Synthetic replications are created in a new execution of the given run (which must be an ingested run, so that its
+fact_data_run_<id> partition and channels exist), loaded with 1, 2, ... processes, and removed afterwards.'''
+
+    option_list = BaseCommand.option_list + (
+        make_option('--workers',
+                    dest='workers',
+                    default='1,2,4',
+                    help='Comma separated numbers of worker processes to try (default: 1,2,4)'),
+        make_option('--replications',
+                    type='int',
+                    dest='replications',
+                    default=16,
+                    help='Number of replications loaded for each number of workers (default: 16)'),
+        make_option('--channels',
+                    type='int',
+                    dest='channels',
+                    default=20,
+                    help='Number of channels in each replication (default: 20)'),
+        make_option('--timesteps',
+                    type='int',
+                    dest='timesteps',
+                    default=7300,
+                    help='Number of timesteps in each channel (default: 7300, 20 years of daily output)'),
+    )
+
+    def handle(self, *args, **options):
+        if len(args) != 1:
+            raise CommandError("Usage: benchmark_parallel_ingest RUN_ID")
+        try:
+            run = DimRun.objects.get(pk=int(args[0]))
+        except (ValueError, DimRun.DoesNotExist):
+            raise CommandError("No run with id %s" % args[0])
+
+        channel_ids = list(run.dimchannel_set.values_list('id', flat=True)[:options['channels']])
+        if not channel_ids:
+            raise CommandError("Run %s has no channels" % run.id)
+        workers_list = [int(workers) for workers in options['workers'].split(',')]
+        settings = connections['default'].settings_dict
+        timesteps = options['timesteps']
+
+        execution = DimExecution.objects.create(run_key=run, name='Ingestion benchmark', replications=0)
+        try:
+            for workers in workers_list:
+                replication_ids = list()
+                for series_id in range(options['replications']):
+                    replication = DimReplication.objects.create(execution_key=execution, seed_used=0,
+                                                                series_id=series_id)
+                    replication_ids.append(replication.id)
+                # Connections can not be shared with the worker processes
+                connection.close()
+
+                pool = Pool(workers)
+                tstart = time.time()
+                pool.map(load_replication,
+                         [(settings, run.id, replication_id, channel_ids, timesteps)
+                          for replication_id in replication_ids])
+                elapsed = time.time() - tstart
+                pool.close()
+                pool.join()
+
+                rows = len(replication_ids) * len(channel_ids) * timesteps
+                self.stdout.write("%s worker(s): %s replications, %s rows in %f sec (%.0f rows/sec)\n"
+                                  % (workers, len(replication_ids), rows, elapsed, rows / elapsed))
+        finally:
+            cursor = connection.cursor()
+            cursor.execute("delete from base_fact_data where replication_key in "
+                           "(select id from dim_replication where execution_key = %s)", [execution.id])
+            transaction.commit_unless_managed()
+            execution.dimreplication_set.all().delete()
+            execution.delete()
@@ -0,0 +1,214 @@
+from copy import deepcopy
+from optparse import make_option
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from change_doc import JCD
+from change_doc.jcd import Change
+from vcimanifest import EMODManifestFile
+from vcimanifest import emod_manifest
+from vcimanifest.manifest import Slug
+
+
+def copying_merger(dict1, dict2):
+    """
+    The merger used before the merge tools shared structure with the template (it deep copies dict1 at every level).
+    It is the baseline of the benchmark.
+    """
+    merge_dict = dict()
+    cpy_dict = deepcopy(dict1)
+    for key, value in dict2.iteritems():
+        if value == {}:
+            cpy_dict[key] = {}
+        elif isinstance(value, dict):
+            if key in cpy_dict:
+                cpy_dict[key] = copying_merger(cpy_dict[key], value)
+            else:
+                try:
+                    ndx = int(key)
+                    if isinstance(value, dict) and isinstance(cpy_dict[ndx], dict):
+                        cpy_dict[ndx] = copying_merger(cpy_dict[ndx], value)
+                    else:
+                        cpy_dict.insert(ndx, value)
+                except ValueError:
+                    cpy_dict[key] = value
+        elif isinstance(value, list):
+            if value == []:
+                cpy_dict[key] = []
+            elif key in cpy_dict:
+                cpy_dict[key].extend(value)
+            else:
+                cpy_dict[key] = value
+        else:
+            merge_dict.update({key: value})
+    if isinstance(cpy_dict, list):
+        return cpy_dict
+    cpy_dict.update(merge_dict)
+    return cpy_dict
+
+
+def copying_xpath_to_dict(dict1, truncate=False):
+    """
+    Baseline version of merge_tools.xpath_to_dict
+    """
+    trun_dict = {
+        list: [],
+        dict: {},
+        str: "",
+        unicode: "",
+        int: None,
+        float: None
+    }
+    new_dict = dict()
+    for key, value in dict1.iteritems():
+        if key == 'mode': continue
+        sub_dict = dict()
+        keys = key.split('/')
+        if truncate:
+            sub_dict.update({keys[-1]: trun_dict[type(value)]})
+        else:
+            sub_dict.update({keys[-1]: value})
+        for path in reversed(key.split('/')[:-1]):
+            sub_dict = {path: sub_dict}
+        new_dict = copying_merger(new_dict, sub_dict)
+    return new_dict
+
+
+def copying_merge_list(dict1, changeObj, mode=None):
+    """
+    Baseline version of merge_tools.merge_list
+    """
+    cpy_dict = deepcopy(dict1)
+    changeList = changeObj['Changes']
+    for change in changeList:
+        if isinstance(change, dict):
+            if mode == 'TRUNCATE':
+                trunc_dict = copying_xpath_to_dict(change, truncate=True)
+                cpy_dict = copying_merger(cpy_dict, trunc_dict)
+            change_dict = copying_xpath_to_dict(change)
+            cpy_dict = copying_merger(cpy_dict, change_dict)
+        elif isinstance(change, (str, unicode)):
+            mode_dict = {
+                '+': None,
+                '-': 'TRUNCATE',
+                '~': 'MERGE'
+            }
+            mode = mode_dict.get(change[0], None)
+            name = change.strip('+-~')
+            cpy_dict = copying_merge_list(cpy_dict, changeObj[name], mode=mode)
+    return cpy_dict
+
+
+class Command(BaseCommand):
+    help = '''Compare the time taken to split the executions of an EMOD manifest with the structure sharing merge tools
+and with the deep copying merge tools they replaced
+
+The run has 3 sweeps (their sizes multiply to the number of executions).  The templates are either the given
+config.json and campaign.json files, or synthetic ones of the given size.'''
+
+    option_list = BaseCommand.option_list + (
+        make_option('--executions',
+                    type='int',
+                    dest='executions',
+                    default=1000,
+                    help='Number of executions, must be a cube (default: 1000)'),
+        make_option('--config',
+                    dest='config',
+                    default=None,
+                    help='config.json file to use as template'),
+        make_option('--campaign',
+                    dest='campaign',
+                    default=None,
+                    help='campaign.json file to use as template'),
+        make_option('--parameters',
+                    type='int',
+                    dest='parameters',
+                    default=500,
+                    help='Number of parameters in the synthetic config.json (default: 500)'),
+        make_option('--events',
+                    type='int',
+                    dest='events',
+                    default=200,
+                    help='Number of events in the synthetic campaign.json (default: 200)'),
+    )
+
+    def handle(self, *args, **options):
+        values = int(round(options['executions'] ** (1.0 / 3)))
+        if values ** 3 != options['executions']:
+            raise CommandError("--executions must be a cube (ex 1000 = 10 x 10 x 10)")
+
+        manifest = EMODManifestFile()
+        manifest.add_template(['config.json', 'campaign.json'], [
+            self.read_template(options['config'], self.synthetic_config(options['parameters'])),
+            self.read_template(options['campaign'], self.synthetic_campaign(options['events']))
+        ])
+
+        jcd = JCD.from_changes([
+            Change.atomic(xpath='config.json/parameters/Simulation_Duration', value=7300),
+            Change.sweep('sweep1', xpath='config.json/parameters/Base_Infectivity', l_vals=range(values)),
+            Change.sweep('sweep2', xpath='config.json/parameters/Vector_Species_Params/arabiensis/Anthropophily',
+                         l_vals=range(values)),
+            Change.sweep('sweep3', xpath='campaign.json/Events/0/Start_Day', l_vals=range(values)),
+        ])
+        (rl_jcd, num_executions, executions) = jcd.iter_expand()
+        manifest.add_run(Slug(id=1, jcd=rl_jcd))
+        for ndx, execution_jcd in enumerate(executions):
+            manifest.add_execution(Slug(id=ndx, name='execution %s' % ndx, replications=1, jcd=execution_jcd))
+
+        tstart = time.time()
+        shared = list(manifest.split_executions())
+        sharing = time.time() - tstart
+
+        merge_list = emod_manifest.merge_list
+        emod_manifest.merge_list = copying_merge_list
+        try:
+            tstart = time.time()
+            copied = list(manifest.split_executions())
+            copying = time.time() - tstart
+        finally:
+            emod_manifest.merge_list = merge_list
+
+        # Compare the decoded files, as the order of the keys in the json depends on how the dictionaries were built
+        if any([(execution[:2], json.loads(execution[2]), json.loads(execution[3])) !=
+                (copy[:2], json.loads(copy[2]), json.loads(copy[3])) for execution, copy in zip(shared, copied)]):
+            self.stderr.write("ERROR: the executions split with the two merge tools differ\n")
+
+        self.stdout.write("Split %s executions\n" % num_executions)
+        self.stdout.write("deep copying merge:      %f sec\n" % copying)
+        self.stdout.write("structure sharing merge: %f sec\n" % sharing)
+        if sharing > 0:
+            self.stdout.write("speedup: %.1fx\n" % (copying / sharing))
+
+    @staticmethod
+    def read_template(path, default):
+        if path is None:
+            return json.dumps(default)
+        with open(path) as template_file:
+            return template_file.read()
+
+    @staticmethod
+    def synthetic_config(parameters):
+        config = {
+            "parameters": dict(("Parameter_%s" % ndx, ndx * 0.5) for ndx in range(parameters))
+        }
+        config["parameters"]["Vector_Species_Params"] = {
+            "arabiensis": dict(("Parameter_%s" % ndx, ndx) for ndx in range(20))
+        }
+        return config
+
+    @staticmethod
+    def synthetic_campaign(events):
+        return {
+            "Events": [
+                {
+                    "Start_Day": ndx,
+                    "Event_Coordinator_Config": {
+                        "Demographic_Coverage": 0.5,
+                        "Intervention_Config": {"class": "SimpleBednet", "Cost_To_Consumer": 5, "Durability": 365}
+                    }
+                } for ndx in range(events)
+            ],
+            "Use_Defaults": 1
+        }
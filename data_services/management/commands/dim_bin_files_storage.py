@@ -0,0 +1,38 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+from ...models import DimBinFiles
+
+
+class Command(BaseCommand):
+    help = '''Store the content of the files in dim_bin_files uncompressed
+
+DimBinFiles.iter_content reads the content in chunks with substring().  PostgreSQL has to decompress a compressed
+value from its start to read a chunk, so reading a large file takes time quadratic in its size.  With the EXTERNAL
+storage, values are stored uncompressed (out of line) and each chunk is read directly.
+
+The storage is set when syncdb creates the table (see data_services/sql/dimbinfiles.sql).  This command sets it on
+existing databases.  It only applies to the values stored afterwards, use --rewrite to store the existing values
+again.'''
+
+    option_list = BaseCommand.option_list + (
+        make_option('--rewrite',
+                    action='store_true',
+                    dest='rewrite',
+                    default=False,
+                    help='Store the existing content again, uncompressed'),
+    )
+
+    def handle(self, *args, **options):
+        table = DimBinFiles._meta.db_table
+        cursor = connections['default'].cursor()
+        with transaction.commit_on_success():
+            cursor.execute('ALTER TABLE %s ALTER COLUMN content SET STORAGE EXTERNAL' % table)
+            if options['rewrite']:
+                # The concatenation creates new values, which are stored with the new storage
+                cursor.execute("UPDATE %s SET content = content || ''::bytea WHERE content IS NOT NULL" % table)
+                self.stdout.write("Rewrote the content of %s files\n" % cursor.rowcount)
+            transaction.set_dirty()
+        self.stdout.write("The content of %s is stored uncompressed\n" % table)
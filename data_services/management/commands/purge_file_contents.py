@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from ...models import SimulationFileContent
+
+
+class Command(BaseCommand):
+    help = '''Delete the shared simulation file contents that are no longer referenced by any simulation file
+
+The contents are stored once in content-addressed mode (see the "content addressed" setting of FILE_SERVER), and
+their rows in simulation_file_content are kept with a reference count of 0 when the last file using them is
+deleted or replaced.  Run this command periodically (e.g. from cron) to delete those rows and their files on the
+file server.'''
+
+    def handle(self, *args, **options):
+        count = SimulationFileContent.objects.purge()
+        self.stdout.write("Deleted %s unreferenced file contents\n" % count)
@@ -11,9 +11,6 @@ import hashlib
 import json
 import logging
 import StringIO
-import tempfile
-from wsgiref.util import FileWrapper
-import zipfile
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
 from django.core.urlresolvers import reverse
@@ -21,17 +18,19 @@ from django.utils import timezone
 
 from change_doc import JCD, Change
 from django.contrib.gis.db import models
-from django.db import connections
-from django.db.models import Sum, Q
+from django.db import connections, transaction
+from django.db.models import Sum, Q, F
+from django.db.models.signals import post_delete
 from djorm_pgbytea.fields import ByteaField
 from jsonfield import JSONField
 from vcimanifest.json_merging.merge_tools import merge_list
 from vecnet.simulation import sim_model, sim_status
 
 from . import model_specific
-from .sim_file_server.conf import get_active_server
+from .sim_file_server.conf import get_active_server, is_content_addressed
 from .utils.jcdfield import JCDField
-from lib.django_utils import make_choices_tuple
+from lib.django_utils import bulk_save, make_choices_tuple
+from lib.zip_stream import ZipStream
 from dateutil.parser import parse
 
 logger = logging.getLogger('prod_logger')
@@ -362,6 +361,39 @@ class DimBinFiles(models.Model):
         self.fp = None
         delattr(self, "mode")
 
+    @classmethod
+    def with_size(cls):
+        """
+        Get a queryset of the files without their content, annotated with the size of the content ("size" attribute).
+        The size is taken from the header of the stored value, so the content is not read.
+        """
+        return cls.objects.defer('content').extra(select={'size': 'octet_length(content)'})
+
+    @classmethod
+    def iter_content(cls, pk, first=0, length=None, chunk_size=1024 * 1024):
+        """
+        Read the content of a file from the database in chunks, so it's never all in memory.  The content must be
+        stored uncompressed (see the dim_bin_files_storage command), otherwise each chunk is read by decompressing the
+        content from its start.
+
+        :param pk: The file's primary key
+        :param int first: Position of the first byte to read
+        :param length: Number of bytes to read (None = up to the end of the content)
+        :returns: Iterator over the chunks (str)
+        """
+        cursor = connections['default'].cursor()
+        query = 'SELECT substring(content FROM %%s FOR %%s) FROM %s WHERE id = %%s' % cls._meta.db_table
+        position = first
+        while length is None or position < first + length:
+            size = chunk_size if length is None else min(chunk_size, first + length - position)
+            cursor.execute(query, [position + 1, size, pk])  # substring positions start at 1
+            row = cursor.fetchone()
+            if row is None or not row[0]:
+                break
+            chunk = str(row[0])
+            position += len(chunk)
+            yield chunk
+
     class Meta:
         db_table = 'dim_bin_files'
         unique_together = ("file_name", "file_type", "file_hash")
@@ -379,36 +411,53 @@ class SimulationGroup(models.Model):
     def __str__(self):
         return "%s" % self.id
 
-    def create_om_zip_file(self, name):
-        # s = StringIO.StringIO()
-
-        temp = tempfile.TemporaryFile()
-        with zipfile.ZipFile(temp, 'w') as sim_file:
-            for sim in Simulation.objects.filter(group=self):
-                assert sim.model == sim_model.OPEN_MALARIA
+    def om_zip_file_stream(self, batch_size=100):
+        """
+        Generate a zip file with the scenario, output.txt and ctsout.txt of each simulation of an OpenMalaria group.
+        The files' records are fetched for batch_size simulations at a time, and the contents of each batch are read
+        from the file server together, so memory use doesn't grow with the number of simulations.
 
-                try:
-                    input_file = sim.input_files.get(name="scenario.xml")
-                    file_name = input_file.metadata.get("filename", "scenario%s.xml" % input_file.id)
-                    sim_file.writestr(file_name, input_file.get_contents())
-                except ObjectDoesNotExist:
-                    raise RuntimeError("Scenario.xml does not exist in simulation #%s" % sim.id)
-                try:
-                    output_file = sim.simulationoutputfile_set.get(name="output.txt")
-                    sim_file.writestr(file_name.replace(".xml", "_output.txt"), output_file.get_contents())
-                except ObjectDoesNotExist:
-                    pass
-                try:
-                    continuous_file = sim.simulationoutputfile_set.get(name="ctsout.txt")
-                    sim_file.writestr(file_name.replace(".xml", "_ctsout.txt"), continuous_file.get_contents())
-                except ObjectDoesNotExist:
-                    pass
+        :returns: Generator of the chunks of the zip file
+        :raises RuntimeError: if a simulation of the group has no scenario.xml
+        """
+        assert not Simulation.objects.filter(group=self).exclude(model=sim_model.OPEN_MALARIA).exists()
+        without_scenario = Simulation.objects.filter(group=self).exclude(input_files__name="scenario.xml")[:1]
+        if without_scenario:
+            raise RuntimeError("Scenario.xml does not exist in simulation #%s" % without_scenario[0].id)
 
-        wrapper = FileWrapper(temp)
-        temp_len = temp.tell()
-        temp.seek(0)
+        sim_ids = list(Simulation.objects.filter(group=self).order_by('id').values_list('id', flat=True))
+        return self._om_zip_file_chunks(sim_ids, batch_size)
 
-        return wrapper, temp_len
+    @staticmethod
+    def _om_zip_file_chunks(sim_ids, batch_size):
+        zip_stream = ZipStream()
+        file_server = get_active_server()
+        for ndx in range(0, len(sim_ids), batch_size):
+            batch = sim_ids[ndx:ndx + batch_size]
+
+            scenarios = dict()
+            for link in SimulationInputFile.simulations.through.objects.filter(
+                    simulation__in=batch, simulationinputfile__name="scenario.xml").select_related('simulationinputfile'):
+                scenarios[link.simulation_id] = link.simulationinputfile
+            outputs = dict()
+            for output_file in SimulationOutputFile.objects.filter(simulation__in=batch,
+                                                                   name__in=["output.txt", "ctsout.txt"]):
+                outputs[(output_file.simulation_id, output_file.name)] = output_file
+
+            files = list()
+            for sim_id in batch:
+                input_file = scenarios[sim_id]
+                file_name = input_file.metadata.get("filename", "scenario%s.xml" % input_file.id)
+                files.append((file_name, input_file))
+                for name, suffix in (("output.txt", "_output.txt"), ("ctsout.txt", "_ctsout.txt")):
+                    if (sim_id, name) in outputs:
+                        files.append((file_name.replace(".xml", suffix), outputs[(sim_id, name)]))
+
+            contents_list = file_server.read_files([sim_file.uri for file_name, sim_file in files])
+            for (file_name, sim_file), contents in zip(files, contents_list):
+                yield zip_stream.add(file_name, contents)
+
+        yield zip_stream.close()
 
 
 class DimBaseline(models.Model):
@@ -534,7 +583,7 @@ class DimRun(models.Model):
         """
         This returns the total number of replications being sent to the cluster for calculation
 
-        This will use the jcd expand method to calculate the number of executions.  The number of
+        This will use the jcd num_executions method to calculate the number of executions.  The number of
         replications, therefore, is the number of executions multiplied by the number of replications
         per execution.
 
@@ -550,13 +599,11 @@ class DimRun(models.Model):
             # old-style (non-manifest) numjobs
             raise NotImplemented("hstore-based runs are depricated")
 
-        (rl_jcd, num_executions, jcd_list) = self.jcd.expand()
-
-        return num_executions * reps_per_exec
+        return self.jcd.num_executions() * reps_per_exec
 
-    def expand_executions(self, reps_per_exec, rl_jcd_only=False):
+    def expand_executions(self, reps_per_exec, rl_jcd_only=False, with_replications=False):
         """
-        This will expand the executions for this run.  It will do so by looping over the entire jcd.expand
+        This will expand the executions for this run.  It will do so by looping over the jcd.iter_expand
         result and then create a run level jcd, and a list of executions.  This will then need
         to be iterated over if it is to be used with a manifest file.
 
@@ -569,10 +616,15 @@ class DimRun(models.Model):
         need a way to get at the run level jcd.  As such, we add a flag to this method that will allow for only
         the run level jcd to be generated and returned.
 
+        The executions (and their replications if with_replications is set) are created with bulk inserts in a
+        single transaction, see create_executions.
+
         :param reps_per_exec: Replications per execution desired
         :type reps_per_exec: int
         :param rl_jcd_only: Flag indicating the the run level JCD needs to be returned
         :type rl_jcd_only: bool
+        :param with_replications: Flag indicating that the replications of the executions should be created too
+        :type with_replications: bool
         :returns: Tuple of (run_level_jcd, [executions])
         :raises: ValueError
         """
@@ -582,35 +634,51 @@ class DimRun(models.Model):
 
         jcd = self.jcd
 
-        (rl_jcd, num_executions, jcd_list) = jcd.expand()
+        (rl_jcd, num_executions, jcd_list) = jcd.iter_expand()
 
         if rl_jcd_only:
             return rl_jcd, []
 
-        if len(self.dimexecution_set.all()) > 0:
+        if self.dimexecution_set.exists():
             raise ValueError("Run %s has already been expanded" % self.id)
 
-        execution_list = list()
         if num_executions == 1:
-            new_execution = DimExecution(
+            jcd_list = [JCD()]
+
+        execution_list = self.create_executions(jcd_list, reps_per_exec, with_replications=with_replications)
+        return rl_jcd, execution_list
+
+    @transaction.commit_on_success
+    def create_executions(self, jcd_list, reps_per_exec, with_replications=False):
+        """
+        This creates executions of this run from the JCDs of an expansion (see JCD.iter_expand), using one bulk
+        insert for the executions and, if with_replications is set, one for all their replications, in a single
+        transaction.  If there is a single JCD, the execution is named after the run, otherwise after its sweeps.
+
+        :param jcd_list: Execution JCDs (any iterable)
+        :param reps_per_exec: Replications per execution
+        :type reps_per_exec: int
+        :param with_replications: Flag indicating that the replications should be created too
+        :type with_replications: bool
+        :returns: List of the saved executions, with their ids set
+        """
+        execution_list = [
+            DimExecution(
                 run_key=self,
-                name=self.name,
+                name=self.name_from_sweeps(doc.change_list),
                 replications=reps_per_exec,
-                jcd=JCD()
-            )
-            new_execution.save()
-            return rl_jcd, [new_execution]
-        else:
-            for doc in jcd_list:
-                new_execution = DimExecution(
-                    run_key=self,
-                    name=self.name_from_sweeps(doc.change_list),
-                    replications=reps_per_exec,
-                    jcd=doc
-                )
-                new_execution.save()
-                execution_list.append(new_execution)
-            return rl_jcd, execution_list
+                jcd=doc
+            ) for doc in jcd_list
+        ]
+        if len(execution_list) == 1:
+            execution_list[0].name = self.name
+
+        bulk_save(execution_list, self.dimexecution_set.all())
+
+        if with_replications:
+            DimExecution.create_replications(execution_list, reps_per_exec)
+
+        return execution_list
 
     @classmethod
     def name_from_sweeps(cls, iterations):
@@ -911,17 +979,27 @@ class DimExecution(models.Model):
         :param reps_per_exec: Number of replications per DimExecution
         :returns: List of replications
         """
-        series_id = 0
-        rep_list = list()
-        for rep in range(0, reps_per_exec):
-            replication = DimReplication(
+        return self.create_replications([self], reps_per_exec)
+
+    @classmethod
+    def create_replications(cls, executions, reps_per_exec):
+        """
+        This creates reps_per_exec replications (series 0 to reps_per_exec - 1) for each of the given saved
+        executions, with a single bulk insert.
+
+        :param executions: Saved executions
+        :type executions: list of DimExecution
+        :param reps_per_exec: Number of replications per DimExecution
+        :returns: List of replications, with their ids set
+        """
+        rep_list = [
+            DimReplication(
                 seed_used=0,
                 series_id=series_id,
-                execution_key=self
-            )
-            replication.save()
-            series_id += 1
-            rep_list.append(replication)
+                execution_key=execution
+            ) for execution in executions for series_id in range(0, reps_per_exec)
+        ]
+        bulk_save(rep_list, DimReplication.objects.filter(execution_key__in=[execution.id for execution in executions]))
 
         return rep_list
 
@@ -1010,6 +1088,28 @@ class FactData(models.Model):
         db_table = 'fact_data'
 
 
+class FactDataSummary(models.Model):
+    """
+    Precomputed statistics of a channel across the replications of an execution.  Rows with is_yearly False hold
+    the statistics of each timestep, rows with is_yearly True hold the statistics of the yearly sums of each
+    replication, in which case timestep is the index of the year.  The table is filled by
+    data_services.utils.run_data.summarize_execution when the last replication of an execution has been ingested,
+    and is read by RunData instead of aggregating the fact data on every request.
+    """
+    execution_key = models.ForeignKey(DimExecution, db_column='execution_key')
+    channel_key = models.ForeignKey(DimChannel, db_column='channel_key')
+    timestep = models.IntegerField()
+    is_yearly = models.BooleanField(default=False)
+    mean = models.FloatField()
+    min = models.FloatField()
+    max = models.FloatField()
+    stddev = models.FloatField(null=True)
+
+    class Meta:
+        db_table = 'fact_data_summary'
+        unique_together = (('execution_key', 'channel_key', 'is_yearly', 'timestep'),)
+
+
 class GisBaseTable(models.Model):
 
     class Meta:
@@ -1108,6 +1208,8 @@ class SimulationFile(models.Model):
     class MetadataKeys:
         CHECKSUM = 'checksum'  # For verifying downloads of the file and accidental corruption on file server
         CHECKSUM_ALGORITHM = 'checksum_alg'
+        SIZE = 'size'  # In bytes; missing if the contents were stored from a file-like object
+        CHANNEL_INDEX = 'channel_index'  # URI of the index of an InsetChart.json's channels (see channel_index)
 
     class ChecksumAlgorithms:
         MD5 = 'MD5'
@@ -1147,29 +1249,84 @@ class SimulationFile(models.Model):
 
     def _set_contents(self, contents, is_binary=True):
         file_server = get_active_server()
-        (self.uri, md5_hash) = file_server.store_file(contents)
+        old_checksum, old_uri = (self.checksum, self.uri) if self.uri else (None, None)
+        if is_content_addressed() and isinstance(contents, str):
+            md5_hash = hashlib.md5(contents).hexdigest()
+            self.uri = SimulationFileContent.objects.acquire(md5_hash, lambda: file_server.store_file(contents)[0])
+        else:
+            (self.uri, md5_hash) = file_server.store_file(contents)
+            if is_content_addressed():
+                self.uri = SimulationFileContent.objects.add_reference(md5_hash, self.uri)
+        if is_content_addressed() and old_checksum is not None:
+            SimulationFileContent.objects.release(old_checksum, old_uri)
         self.metadata = {
             self.MetadataKeys.CHECKSUM: md5_hash,
             self.MetadataKeys.CHECKSUM_ALGORITHM: 'MD5',
         }
+        if isinstance(contents, str):
+            self.metadata[self.MetadataKeys.SIZE] = len(contents)
         self.save()
 
+    @property
+    def checksum(self):
+        """
+        The MD5 hash of the file's contents, or None if the contents have not been set.
+        """
+        if not self.metadata:
+            return None
+        return self.metadata.get(self.MetadataKeys.CHECKSUM)
+
+    def get_size(self):
+        """
+        Get the size of the file's contents in bytes.  If it's not in the metadata (files stored before the size was
+        recorded, or stored from a file-like object), the contents are read once and the size is added to the
+        metadata.
+        """
+        size = self.metadata.get(self.MetadataKeys.SIZE) if self.metadata else None
+        if size is None:
+            size = 0
+            with self.open_for_reading() as f:
+                while True:
+                    chunk = f.read(64 * 1024)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+            if not self.metadata:
+                self.metadata = dict()
+            self.metadata[self.MetadataKeys.SIZE] = size
+            self.save()
+        return size
+
     def copy(self):
+        # The index of an InsetChart's channels is deleted with its file, so it's not shared with the new file
+        metadata = dict(self.metadata or {})
+        metadata.pop(self.MetadataKeys.CHANNEL_INDEX, None)
+
+        if not isinstance(self, (SimulationInputFile, SimulationOutputFile)):
+            raise Exception("SimulationFile is not of type SimulationInputFile nor SimulationOutputFile")
+
+        # The contents are shared with the new file rather than read and stored again, if they are counted (files
+        # stored before content addressing was turned on are not)
+        if (is_content_addressed() and self.checksum is not None
+                and SimulationFileContent.objects.share(self.checksum, self.uri)):
+            kwargs = dict(name=self.name, metadata=metadata, uri=self.uri)
+            if isinstance(self, SimulationInputFile):
+                kwargs['created_by'] = self.created_by
+            return type(self).objects.create(**kwargs)
+
         if isinstance(self, SimulationInputFile):
             new_simulation_file = SimulationInputFile.objects.create_file(
                 contents=self.get_contents(),
                 name=self.name,
-                metadata=self.metadata,
+                metadata=metadata,
                 created_by=self.created_by
             )
-        elif isinstance(self, SimulationOutputFile):
+        else:
             new_simulation_file = SimulationOutputFile.objects.create_file(
                 contents=self.get_contents(),
                 name=self.name,
-                metadata=self.metadata,
+                metadata=metadata,
             )
-        else:
-            raise Exception("SimulationFile is not of type SimulationInputFile nor SimulationOutputFile")
 
         return new_simulation_file
 
@@ -1177,6 +1334,109 @@ class SimulationFile(models.Model):
         return "%s - %s" % (self.id, self.name)
 
 
+class SimulationFileContentManager(models.Manager):
+    """
+    Custom model manager for the contents shared by simulation files in content-addressed mode.
+
+    The references are counted on the contents stored at the URI of their row.  Files with the same contents stored
+    elsewhere (e.g. before content addressing was turned on) are not counted, and don't release a reference when
+    they are deleted.
+    """
+
+    def acquire(self, md5_hash, store):
+        """
+        Get the URI of the contents with the given MD5 hash, storing the contents on the file server only if they
+        are not there yet, and add a reference to them.
+
+        :param str md5_hash: MD5 hash of the contents.
+        :param store: Callable that stores the contents on the file server and returns their URI.
+        :returns str: URI of the contents on the file server.
+        """
+        if self.filter(md5=md5_hash).update(ref_count=F('ref_count') + 1):
+            return self.filter(md5=md5_hash).values_list('uri', flat=True)[0]
+        return self.add_reference(md5_hash, store())
+
+    def add_reference(self, md5_hash, uri):
+        """
+        Add a reference to contents just stored on the file server.  If contents with the same MD5 hash are already
+        known (e.g. stored by a concurrent acquire), the reference is added to them and the contents just stored are
+        deleted; otherwise they are recorded as stored at the given URI.
+
+        :param str uri: URI of the contents just stored
+        :returns str: URI of the contents on the file server.
+        """
+        content, created = self.get_or_create(md5=md5_hash, defaults={'uri': uri, 'ref_count': 1})
+        if not created:
+            self.filter(pk=content.pk).update(ref_count=F('ref_count') + 1)
+            if content.uri != uri:
+                try:
+                    get_active_server().delete_file(uri)
+                except Exception:
+                    logger.exception("Couldn't delete duplicate file contents %s", uri)
+        return content.uri
+
+    def share(self, md5_hash, uri):
+        """
+        Add a reference to the contents with the given MD5 hash if they are stored at the given URI.
+
+        :returns bool: True if the reference was added
+        """
+        return self.filter(md5=md5_hash, uri=uri).update(ref_count=F('ref_count') + 1) > 0
+
+    def release(self, md5_hash, uri):
+        """
+        Remove a reference to the contents with the given MD5 hash if they are stored at the given URI.  Contents
+        without references are deleted later by purge.
+        """
+        self.filter(md5=md5_hash, uri=uri, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+
+    def purge(self):
+        """
+        Delete the contents that are no longer referenced, and their files on the file server.  A row is only deleted
+        if it's still unreferenced once it's locked, so contents acquired again in the meantime are kept.  The files
+        are deleted after the rows are committed, so a rollback never leaves a row pointing to a deleted file.
+
+        Rows of "data" scheme contents are deleted too: they are copies of the contents kept in the simulation files'
+        own URIs (see is_content_addressed), and deleting them doesn't touch the simulation files.
+
+        :returns int: Number of contents deleted
+        """
+        cursor = connections['default'].cursor()
+        with transaction.commit_on_success():
+            cursor.execute("delete from simulation_file_content where ref_count <= 0 or uri like 'data:%%' "
+                           "returning uri")
+            uris = [row[0] for row in cursor.fetchall()]
+            transaction.set_dirty()
+        cursor.close()
+
+        file_server = get_active_server()
+        for uri in uris:
+            try:
+                file_server.delete_file(uri)
+            except Exception:
+                logger.exception("Couldn't delete unreferenced file contents %s", uri)
+        return len(uris)
+
+
+class SimulationFileContent(models.Model):
+    """
+    Contents stored on the file server in content-addressed mode, shared by every simulation file with the same MD5
+    hash.  ref_count is the number of simulation files referencing the contents; once it drops to 0 the stored
+    contents are no longer used.
+    """
+    md5 = models.CharField(max_length=32, unique=True)
+    uri = models.TextField()
+    ref_count = models.IntegerField(default=0)
+
+    objects = SimulationFileContentManager()
+
+    class Meta:
+        db_table = 'simulation_file_content'
+
+    def __str__(self):
+        return "%s (%s references)" % (self.md5, self.ref_count)
+
+
 class SimulationFileModelManager(models.Manager):
     """
     Custom model manager for the data models representing simulation files.
@@ -1234,6 +1494,110 @@ class SimulationOutputFile(SimulationFile):
 
     objects = SimulationFileModelManager()
 
+    def _set_contents(self, contents, is_binary=True):
+        old_index_uri = self.channel_index_uri
+        super(SimulationOutputFile, self)._set_contents(contents, is_binary)
+        if old_index_uri is not None:
+            delete_channel_index(old_index_uri)
+        # Imported here because data_services.ingesters imports the models
+        from .channel_index import INSET_CHART, is_index_stored
+        if self.name == INSET_CHART and is_index_stored():
+            try:
+                self.index_channels(contents if isinstance(contents, str) else None)
+            except Exception:
+                # The index is built again when the channels are read
+                logger.exception("Couldn't index the channels of output file %s", self.id)
+
+    @property
+    def channel_index_uri(self):
+        """
+        The URI of the stored index of an InsetChart.json's channels, or None if it's not indexed.
+        """
+        if not self.metadata:
+            return None
+        return self.metadata.get(self.MetadataKeys.CHANNEL_INDEX)
+
+    def index_channels(self, contents=None):
+        """
+        Store the columnar index of the channels of an InsetChart.json on the file server, and record its URI in the
+        metadata.
+
+        :param str contents: The file's contents, if they are at hand (otherwise they are read from the file server)
+        :returns str: URI of the index
+        """
+        from .channel_index import build_channel_index
+        if contents is None:
+            with self.open_for_reading() as f:
+                index = build_channel_index(f)
+        else:
+            index = build_channel_index(contents)
+        uri = get_active_server().store_file(index)[0]
+        if not self.metadata:
+            self.metadata = dict()
+        self.metadata[self.MetadataKeys.CHANNEL_INDEX] = uri
+        self.save()
+        return uri
+
+    def get_channel_titles(self):
+        """
+        Get the titles of the channels of an InsetChart.json.  The file is indexed if it wasn't yet.
+        """
+        from .channel_index import get_channel_titles
+        return get_channel_titles(self._get_channel_index())
+
+    def get_channel(self, title):
+        """
+        Get the values of a channel of an InsetChart.json.  Only the channel is read from the file server (see
+        data_services.channel_index), and the file is indexed if it wasn't yet.
+
+        :returns: List of the values
+        :raises KeyError: if there is no such channel
+        """
+        from .channel_index import get_channel
+        return get_channel(self._get_channel_index(), title).tolist()
+
+    def _get_channel_index(self):
+        """
+        :returns: Tuple of (key, function opening the index), as expected by data_services.channel_index
+        """
+        from .channel_index import built_index, is_index_stored, stored_index
+        uri = self.channel_index_uri
+        if uri is None and is_index_stored():
+            uri = self.index_channels()
+        if uri is not None:
+            return stored_index(uri)
+        return built_index(self.checksum, self.open_for_reading)
+
+
+def delete_channel_index(uri):
+    """
+    Delete the stored index of an InsetChart.json's channels.
+    """
+    try:
+        get_active_server().delete_file(uri)
+    except Exception:
+        logger.exception("Couldn't delete the channel index %s", uri)
+
+
+def release_simulation_file_content(sender, instance, **kwargs):
+    """
+    Remove the reference a deleted simulation file held on its contents.
+    """
+    if is_content_addressed() and instance.checksum is not None:
+        SimulationFileContent.objects.release(instance.checksum, instance.uri)
+
+
+def delete_simulation_output_file_index(sender, instance, **kwargs):
+    """
+    Delete the stored index of a deleted output file's channels.
+    """
+    if instance.channel_index_uri is not None:
+        delete_channel_index(instance.channel_index_uri)
+
+post_delete.connect(release_simulation_file_content, sender=SimulationInputFile)
+post_delete.connect(release_simulation_file_content, sender=SimulationOutputFile)
+post_delete.connect(delete_simulation_output_file_index, sender=SimulationOutputFile)
+
 
 class RunMetaData():
     class Intervention:
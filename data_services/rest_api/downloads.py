@@ -0,0 +1,127 @@
+"""
+Responses for file downloads: the contents are streamed in chunks, a single byte range can be requested with a Range
+header, and a client that already has the file (same ETag, i.e. the file's MD5 hash) gets a 304 Not Modified.
+"""
+
+import io
+import re
+
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+
+CHUNK_SIZE = 64 * 1024
+
+_range_regex = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_range(header, size):
+    """
+    Parse the Range header of a request.
+
+    :param header: The header's value (None if the request has none)
+    :param int size: Size of the file
+    :returns: Tuple of (first byte, last byte), or None if the whole file is sent (no header, or a header with
+              several ranges or an unknown unit)
+    :raises ValueError: if the range is not satisfiable
+    """
+    if header is None:
+        return None
+    match = _range_regex.match(header.strip())
+    if match is None:
+        return None
+    first, last = match.group(1), match.group(2)
+    if first:
+        first = int(first)
+        if last and int(last) < first:
+            #  Invalid range, ignored
+            return None
+        last = min(int(last), size - 1) if last else size - 1
+    elif last:
+        #  Suffix range: the last N bytes
+        first = max(size - int(last), 0)
+        last = size - 1
+    else:
+        return None
+    if first > last or first >= size:
+        raise ValueError('Range not satisfiable: %s' % header)
+    return first, last
+
+
+def etag_matches(request, etag):
+    """
+    Does the If-None-Match header of a request match the ETag of a file?
+    """
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header or not etag:
+        return False
+    tags = [tag.strip() for tag in header.split(',')]
+    return '*' in tags or any(tag.lstrip('W/') == quote_etag(etag) for tag in tags)
+
+
+def quote_etag(etag):
+    return '"%s"' % etag
+
+
+def download_response(request, size, etag, read_range, content_type='application/octet-stream'):
+    """
+    Create the response to a download request.
+
+    :param int size: Size of the file
+    :param etag: ETag of the file (its MD5 hash), or None
+    :param read_range: Function (first byte, length) returning an iterator over the chunks of these bytes of the file
+    """
+    if etag_matches(request, etag):
+        response = HttpResponseNotModified()
+        response['ETag'] = quote_etag(etag)
+        return response
+
+    byte_range = None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range is None or (etag and if_range.strip() == quote_etag(etag)):
+        try:
+            byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = 'bytes */%d' % size
+            return response
+
+    if byte_range is None:
+        response = StreamingHttpResponse(read_range(0, size), content_type=content_type)
+        response['Content-Length'] = size
+    else:
+        first, last = byte_range
+        response = StreamingHttpResponse(read_range(first, last - first + 1), content_type=content_type, status=206)
+        response['Content-Length'] = last - first + 1
+        response['Content-Range'] = 'bytes %d-%d/%d' % (first, last, size)
+    response['Accept-Ranges'] = 'bytes'
+    if etag:
+        response['ETag'] = quote_etag(etag)
+    return response
+
+
+def file_chunks(file_obj, first, length):
+    """
+    Read bytes of a file-like object in chunks, and close it.
+
+    :param int first: Position of the first byte
+    :param int length: Number of bytes
+    """
+    try:
+        if first:
+            try:
+                file_obj.seek(first)
+            except (AttributeError, IOError, io.UnsupportedOperation):
+                #  Not seekable (e.g. a response from the WebDAV server), skip the bytes before the range
+                skipped = 0
+                while skipped < first:
+                    chunk = file_obj.read(min(CHUNK_SIZE, first - skipped))
+                    if not chunk:
+                        return
+                    skipped += len(chunk)
+        while length > 0:
+            chunk = file_obj.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file_obj.close()
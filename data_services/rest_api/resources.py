@@ -1,8 +1,10 @@
 import json
+import zlib
 
+from django.conf import settings
 from django.conf.urls import url
-from django.core.files.base import ContentFile
-from django.http import HttpResponse, StreamingHttpResponse
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotAllowed, HttpResponseNotFound, HttpResponseNotModified
 from tastypie import fields
 from tastypie.exceptions import BadRequest, ImmediateHttpResponse
 from tastypie.resources import ModelResource
@@ -10,14 +12,17 @@ from tastypie.utils import trailing_slash
 from vecnet.simulation import sim_status
 
 from .authorization import IpAddressBasedAuthorization
+from .downloads import download_response, etag_matches, file_chunks, quote_etag
+from .uploads import GunzipReader, PartialUpload, delete_abandoned_uploads, parse_content_range
 from ..models import DimBinFiles, Simulation, SimulationInputFile, SimulationOutputFile
+from ..sim_file_server.util import custom_urlparse
 
 
 class DimBinFileResource(ModelResource):
     size = fields.IntegerField(readonly=True)
 
     class Meta:
-        queryset = DimBinFiles.objects.all()
+        queryset = DimBinFiles.with_size()
         resource_name = 'dim_bin_files'
         excludes = ['content']
         detail_allowed_methods = ['get']
@@ -33,13 +38,8 @@ class DimBinFileResource(ModelResource):
         return file_version.isoformat()
 
     def dehydrate_size(self, bundle):
-        return len(bundle.obj.content)
+        return bundle.obj.size
 
-    # The two methods below are based on this SO answer:  http://stackoverflow.com/a/9454336/1258514
-    # with these modifications:
-    #   1) The code was updated to use prepend_urls (override_urls is deprecated).
-    #   2) The download method in the answer uses FileWrapper which was introduced in Django 1.7, so I had to use
-    #      ContentFile instead since we're usig Django 1.5
     def prepend_urls(self):
         return [
             url(r"^(?P<resource_name>%s)/(?P<pk>\w[\w/-]*)/download%s$" % (self._meta.resource_name, trailing_slash()),
@@ -49,27 +49,17 @@ class DimBinFileResource(ModelResource):
 
     def download_file(self, request, **kwargs):
         """
-        Send a file through TastyPie without loading the whole file into memory at once.
+        Send a file through TastyPie, reading its content from the database in chunks.  The response supports Range
+        requests and If-None-Match with the file's hash as ETag.
         """
         if not IpAddressBasedAuthorization.is_authorized(request):
             return HttpResponse(status=401)
 
-        input_file_django_obj = self._meta.queryset.get(pk=kwargs['pk'])
-        wrapped_content = ContentFile(input_file_django_obj.content)
-        # TODO The use of ContentFile above causes this warning:
-        #   .../virtualenvs/vecnet/lib/python2.7/site-packages/django/core/files/base.py:106:
-        #       UnicodeWarning: Unicode equal comparison failed to convert both arguments to Unicode - interpreting them
-        #       as being unequal
-        #
-        # The line in question isin the File.__iter__ method:
-        #   if line[-1] in ('\n', '\r'):
-        #
-        # That line assumes the file contents are text, not binary.  This has been corrected in Django 1.7b1:
-        #   https://github.com/django/django/commit/3841feee86cae65165f120db7a5d80ffc76dd520
-
-        response = StreamingHttpResponse(wrapped_content, content_type='application/octet-stream')
-        response['Content-Length'] = len(input_file_django_obj.content)
-        return response
+        dim_bin_file = self._meta.queryset.get(pk=kwargs['pk'])
+        if dim_bin_file.size is None:
+            return HttpResponseNotFound()
+        return download_response(request, dim_bin_file.size, dim_bin_file.file_hash,
+                                 lambda first, length: DimBinFiles.iter_content(dim_bin_file.pk, first, length))
 
 
 class InputFileResource(ModelResource):
@@ -96,11 +86,6 @@ class InputFileResource(ModelResource):
         """
         return dict(bundle.obj.metadata)
 
-    # The two methods below are based on this SO answer:  http://stackoverflow.com/a/9454336/1258514
-    # with these modifications:
-    #   1) The code was updated to use prepend_urls (override_urls is deprecated).
-    #   2) The download method in the answer uses FileWrapper which was introduced in Django 1.7, so I had to use
-    #      ContentFile instead since we're using Django 1.5
     def prepend_urls(self):
         return [
             url(r"^(?P<resource_name>%s)/(?P<pk>\w[\w/-]*)/download%s$" % (self._meta.resource_name, trailing_slash()),
@@ -110,28 +95,31 @@ class InputFileResource(ModelResource):
 
     def download_file(self, request, **kwargs):
         """
-        Send a file through TastyPie without loading the whole file into memory at once.
+        Send a file through TastyPie, streaming it from the file server in chunks.  The response supports Range
+        requests and If-None-Match with the file's checksum as ETag.  Files stored with the file scheme are sent by
+        the web server when the DATA_REST_API_X_ACCEL_REDIRECT setting is set.
         """
         if not IpAddressBasedAuthorization.is_authorized(request):
             return HttpResponse(status=401)
 
-        input_file_django_obj = self._meta.queryset.get(pk=kwargs['pk'])
-        file_contents = input_file_django_obj.get_contents()
-        wrapped_content = ContentFile(file_contents)
-        # TODO The use of ContentFile above causes this warning:
-        #   .../virtualenvs/vecnet/lib/python2.7/site-packages/django/core/files/base.py:106:
-        #       UnicodeWarning: Unicode equal comparison failed to convert both arguments to Unicode - interpreting them
-        #       as being unequal
-        #
-        # The line in question isin the File.__iter__ method:
-        #   if line[-1] in ('\n', '\r'):
-        #
-        # That line assumes the file contents are text, not binary.  This has been corrected in Django 1.7b1:
-        #   https://github.com/django/django/commit/3841feee86cae65165f120db7a5d80ffc76dd520
-
-        response = StreamingHttpResponse(wrapped_content, content_type='application/octet-stream')
-        response['Content-Length'] = len(file_contents)
-        return response
+        input_file = self._meta.queryset.get(pk=kwargs['pk'])
+        checksum = input_file.checksum
+
+        accel_redirect = getattr(settings, 'DATA_REST_API_X_ACCEL_REDIRECT', None)
+        parsed_uri = custom_urlparse(input_file.uri)
+        if accel_redirect and parsed_uri.scheme == 'file':
+            if etag_matches(request, checksum):
+                response = HttpResponseNotModified()
+            else:
+                # nginx sends the file (and handles Range requests) from its internal location
+                response = HttpResponse(content_type='application/octet-stream')
+                response['X-Accel-Redirect'] = accel_redirect + parsed_uri.path.lstrip('/')
+            if checksum:
+                response['ETag'] = quote_etag(checksum)
+            return response
+
+        return download_response(request, input_file.get_size(), checksum,
+                                 lambda first, length: file_chunks(input_file.open_for_reading(), first, length))
 
 
 class OutputFileResource(ModelResource):
@@ -148,8 +136,10 @@ class OutputFileResource(ModelResource):
         Errors that can occur with this resource.
         """
         FILES_NOT_OBJECT = 'The value for output_files is not a JSON object'
+        INVALID_GZIP = 'File contents are not valid gzip data'
         INVALID_ID = 'Invalid value for id_on_client'
         INVALID_JSON = 'Invalid JSON in request body'
+        INVALID_RANGE = 'Invalid Content-Range header'
         LINE_NOT_STRING = 'Line in file contents is not a string'
         NO_ID_ON_CLIENT = 'Missing "id_on_client" name in JSON object'
         NO_OUTPUT_FILES = 'Missing "output_files" name in JSON object'
@@ -167,6 +157,14 @@ class OutputFileResource(ModelResource):
             update_status(simulation, sim_status.OUTPUT_ERROR)
         return ImmediateHttpResponse(self.error_response(request, error_info))
 
+    def prepend_urls(self):
+        return [
+            url(r"^(?P<resource_name>%s)/(?P<id_on_client>\d+)/(?P<file_name>[\w.-]+)%s$"
+                % (self._meta.resource_name, trailing_slash()),
+                self.wrap_view('upload_file'),
+                name="output_file_upload"),
+        ]
+
     def post_list(self, request, **kwargs):
         """
         Expected payload:
@@ -178,7 +176,12 @@ class OutputFileResource(ModelResource):
                     "filename 2" : "contents...",
                 }
             }
+
+        The files can also be sent as a multipart/form-data body (see post_multipart).
         """
+        if request.META.get('CONTENT_TYPE', '').startswith('multipart/form-data'):
+            return self.post_multipart(request)
+
         try:
             payload = self.deserialize(request, request.body)
         except BadRequest:
@@ -190,14 +193,7 @@ class OutputFileResource(ModelResource):
         # Get the specified simulation
         if 'id_on_client' not in payload:
             raise self.make_error_response(request, self.Errors.NO_ID_ON_CLIENT)
-        try:
-            id_on_client = int(payload['id_on_client'])
-        except ValueError:
-            raise self.make_error_response(request, self.Errors.INVALID_ID)
-        try:
-            simulation = Simulation.objects.get(pk=id_on_client)
-        except Simulation.DoesNotExist:
-            raise self.make_error_response(request, self.Errors.INVALID_ID)
+        simulation = self.get_simulation(request, payload['id_on_client'])
 
         # Check the list of output file names
         update_status(simulation, sim_status.STAGING_OUTPUT)
@@ -208,12 +204,7 @@ class OutputFileResource(ModelResource):
         if not isinstance(output_files, dict):
             raise self.make_error_response(request, self.Errors.FILES_NOT_OBJECT,
                                            simulation=simulation)
-        valid_names = get_output_file_names(simulation)
-        unknown_names = filter(lambda x: x not in valid_names, output_files.keys())
-        if unknown_names:
-            raise self.make_error_response(request, self.Errors.UNKNOWN_NAMES,
-                                           'Unknown names: ' + ', '.join(unknown_names),
-                                           simulation=simulation)
+        self.check_file_names(request, simulation, output_files.keys())
 
         # Store the output files
         for name, contents in output_files.iteritems():
@@ -228,9 +219,127 @@ class OutputFileResource(ModelResource):
                 raise self.make_error_response(request, self.Errors.NOT_STR_OR_ARRAY,
                                                'contents type = %s' % type(contents),
                                                simulation=simulation)
-            sim_output_file = SimulationOutputFile.objects.create_file(contents, name=name, simulation=simulation)
+            self.store_file(request, simulation, name, contents, is_gzipped=False)
         update_status(simulation, sim_status.SCRIPT_DONE)
 
+    def post_multipart(self, request):
+        """
+        Store the output files sent as a multipart/form-data body: an "id_on_client" field, and one file per output
+        file, whose field name is the output file's name.  A file is gzip-compressed if its content type is
+        application/gzip (or application/x-gzip) or its file name ends with ".gz".  Django keeps large uploaded files
+        on the disk, and they are streamed to the file server.
+        """
+        if 'id_on_client' not in request.POST:
+            raise self.make_error_response(request, self.Errors.NO_ID_ON_CLIENT)
+        simulation = self.get_simulation(request, request.POST['id_on_client'])
+        update_status(simulation, sim_status.STAGING_OUTPUT)
+        self.check_file_names(request, simulation, request.FILES.keys())
+
+        for name, uploaded_file in request.FILES.iteritems():
+            is_gzipped = (uploaded_file.content_type in ('application/gzip', 'application/x-gzip')
+                          or uploaded_file.name.endswith('.gz'))
+            self.store_file(request, simulation, name, uploaded_file, is_gzipped)
+        update_status(simulation, sim_status.SCRIPT_DONE)
+
+    def upload_file(self, request, **kwargs):
+        """
+        Upload a single output file as the body of a PUT request (the simulation's status is not changed to done;
+        POST the remaining files, if any, to the list endpoint when all the files are uploaded).  The body is
+        gzip-compressed if the request has the header "Content-Encoding: gzip".
+
+        A large file can be sent in several requests, each with a part of the (compressed) file and a Content-Range
+        header, e.g. "bytes 0-1048575/5000000".  The parts are kept until the last byte is received.  A GET request
+        returns the number of bytes received so far, so an interrupted upload can be resumed from there.
+
+        Responses: 201 when the file is stored, 202 when a part is received but the file is incomplete, 416 if a part
+        doesn't follow the bytes received so far.  The responses to parts have a "Range" header with the bytes
+        received ("bytes=0-<last byte>").  Partial uploads abandoned for OUTPUT_FILE_UPLOAD_MAX_AGE seconds are
+        deleted when another upload starts.
+
+        Uploading a file again, e.g. when a request is retried, replaces the file stored before.
+        """
+        if not IpAddressBasedAuthorization.is_authorized(request):
+            return HttpResponse(status=401)
+        if request.method not in ('GET', 'HEAD', 'PUT'):
+            return HttpResponseNotAllowed(['GET', 'HEAD', 'PUT'])
+
+        simulation = self.get_simulation(request, kwargs['id_on_client'])
+        name = kwargs['file_name']
+        if request.method in ('GET', 'HEAD'):
+            if name not in get_output_file_names(simulation):
+                return HttpResponseNotFound()
+            return self.upload_status_response(PartialUpload(simulation.id, name).size, status=200)
+
+        update_status(simulation, sim_status.STAGING_OUTPUT)
+        self.check_file_names(request, simulation, [name])
+        partial_upload = PartialUpload(simulation.id, name)
+        is_gzipped = request.META.get('HTTP_CONTENT_ENCODING', '').strip() == 'gzip'
+
+        content_range = request.META.get('HTTP_CONTENT_RANGE')
+        if content_range is None:
+            partial_upload.delete()
+            self.store_file(request, simulation, name, request, is_gzipped)
+            return HttpResponse(status=201)
+
+        try:
+            first, last, total = parse_content_range(content_range)
+        except ValueError as e:
+            raise self.make_error_response(request, self.Errors.INVALID_RANGE, e)
+        if first == 0:
+            delete_abandoned_uploads()
+        try:
+            received = partial_upload.write(first, request)
+        except ValueError:
+            return self.upload_status_response(partial_upload.size, status=416)
+        if total is None or received < total:
+            return self.upload_status_response(received, status=202)
+
+        try:
+            with partial_upload.open() as contents:
+                self.store_file(request, simulation, name, contents, is_gzipped)
+        finally:
+            partial_upload.delete()
+        return HttpResponse(status=201)
+
+    @staticmethod
+    def upload_status_response(received, status):
+        response = HttpResponse(json.dumps({'received': received}), content_type='application/json', status=status)
+        if received:
+            response['Range'] = 'bytes=0-%d' % (received - 1)
+        return response
+
+    def get_simulation(self, request, id_on_client):
+        try:
+            return Simulation.objects.get(pk=int(id_on_client))
+        except (ValueError, Simulation.DoesNotExist):
+            raise self.make_error_response(request, self.Errors.INVALID_ID)
+
+    def check_file_names(self, request, simulation, names):
+        valid_names = get_output_file_names(simulation)
+        unknown_names = filter(lambda x: x not in valid_names, names)
+        if unknown_names:
+            raise self.make_error_response(request, self.Errors.UNKNOWN_NAMES,
+                                           'Unknown names: ' + ', '.join(unknown_names),
+                                           simulation=simulation)
+
+    def store_file(self, request, simulation, name, file_obj, is_gzipped):
+        """
+        Store an output file read from a file-like object; it is streamed to the file server, which calculates its MD5
+        hash as it's written.  The simulation's previous files with the same name are deleted once the new file is
+        stored, so storing a file again replaces it.  Only the files stored before are deleted, so the latest of
+        concurrent uploads of a file is kept.
+        """
+        if is_gzipped:
+            file_obj = GunzipReader(file_obj)
+        sim_output_file = SimulationOutputFile.objects.create(name=name, simulation=simulation)
+        try:
+            sim_output_file._set_contents(file_obj)
+        except zlib.error as e:
+            sim_output_file.delete()
+            raise self.make_error_response(request, self.Errors.INVALID_GZIP, e, simulation=simulation)
+        with transaction.commit_on_success():
+            SimulationOutputFile.objects.filter(simulation=simulation, name=name, id__lt=sim_output_file.id).delete()
+
 
 def update_status(simulation, new_status):
     """
@@ -0,0 +1,149 @@
+"""
+Helpers for uploading simulation output files as streams: gzip decompression while the file is read, and partial
+uploads that are kept on the local disk until all their bytes have been received, so an interrupted upload can be
+resumed where it stopped.
+"""
+
+import os
+import re
+import tempfile
+import time
+import zlib
+
+from django.conf import settings
+
+#: Directory where partial uploads are kept until they are complete
+OUTPUT_FILE_UPLOAD_DIR = getattr(settings, "OUTPUT_FILE_UPLOAD_DIR",
+                                 os.path.join(tempfile.gettempdir(), "output_file_uploads"))
+
+#: Number of seconds after its last part was received that a partial upload is considered abandoned, and deleted
+OUTPUT_FILE_UPLOAD_MAX_AGE = getattr(settings, "OUTPUT_FILE_UPLOAD_MAX_AGE", 2 * 24 * 60 * 60)
+
+CHUNK_SIZE = 64 * 1024
+
+_content_range_regex = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+
+
+class GunzipReader(object):
+    """
+    Wraps a file-like object with gzip-compressed contents, and decompresses the contents as they are read.
+    """
+
+    def __init__(self, file_obj):
+        self.file_obj = file_obj
+        self.decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)  # 16 = gzip header and trailer
+        self.buffer = ''
+
+    def read(self, size=-1):
+        """
+        :raises zlib.error: if the contents are not valid gzip data
+        """
+        while size < 0 or len(self.buffer) < size:
+            chunk = self.file_obj.read(CHUNK_SIZE)
+            if not chunk:
+                self.buffer += self.decompressor.flush()
+                break
+            self.buffer += self.decompressor.decompress(chunk)
+            while self.decompressor.unused_data:
+                #  Start of another gzip member
+                unused_data = self.decompressor.unused_data
+                self.decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                self.buffer += self.decompressor.decompress(unused_data)
+        if size < 0:
+            data, self.buffer = self.buffer, ''
+        else:
+            data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+def parse_content_range(header):
+    """
+    Parse a Content-Range header of a request, e.g. "bytes 0-1023/4096".
+
+    :returns: Tuple of (first byte, last byte, total size).  The total size is None if it's unknown ("*").
+    :raises ValueError: if the header is invalid
+    """
+    match = _content_range_regex.match(header.strip())
+    if match is None:
+        raise ValueError('Invalid Content-Range: %s' % header)
+    first, last = int(match.group(1)), int(match.group(2))
+    total = int(match.group(3)) if match.group(3) != '*' else None
+    if last < first or (total is not None and last >= total):
+        raise ValueError('Invalid Content-Range: %s' % header)
+    return first, last, total
+
+
+class PartialUpload(object):
+    """
+    The bytes of an output file received so far.
+    """
+
+    def __init__(self, simulation_id, file_name):
+        self.path = os.path.join(OUTPUT_FILE_UPLOAD_DIR, str(simulation_id), file_name)
+
+    @property
+    def size(self):
+        """
+        Number of bytes received.
+        """
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def write(self, first, file_obj):
+        """
+        Write the bytes read from a file-like object, starting at a given position.  Bytes after that position that
+        were already received are replaced.
+
+        :param int first: Position of the first byte
+        :returns int: Number of bytes received
+        :raises ValueError: if there are missing bytes before the position
+        """
+        if first > self.size:
+            raise ValueError('Missing bytes %s-%s' % (self.size, first - 1))
+        directory = os.path.dirname(self.path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(self.path, 'r+b' if os.path.exists(self.path) else 'wb') as f:
+            f.seek(first)
+            f.truncate()
+            while True:
+                chunk = file_obj.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                f.write(chunk)
+            return f.tell()
+
+    def open(self):
+        return open(self.path, 'rb')
+
+    def delete(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def delete_abandoned_uploads(max_age=OUTPUT_FILE_UPLOAD_MAX_AGE):
+    """
+    Delete the partial uploads that haven't received any part for max_age seconds, and the directories of the
+    simulations left without partial uploads.
+
+    :returns int: Number of partial uploads deleted
+    """
+    expiry_time = time.time() - max_age
+    deleted = 0
+    for directory, _, file_names in os.walk(OUTPUT_FILE_UPLOAD_DIR, topdown=False):
+        for file_name in file_names:
+            path = os.path.join(directory, file_name)
+            try:
+                if os.path.getmtime(path) < expiry_time:
+                    os.remove(path)
+                    deleted += 1
+            except OSError:  # Completed or deleted by another request
+                pass
+        if directory != OUTPUT_FILE_UPLOAD_DIR:
+            try:
+                os.rmdir(directory)
+            except OSError:  # Not empty
+                pass
+    return deleted
@@ -31,6 +31,16 @@ class FileServer(object):
         """
         raise NotImplementedError
 
+    def store_files(self, contents_list):
+        """
+        Store several new files on the server.
+
+        :param contents_list: The contents of each file (see store_file).
+
+        :returns: A list of (URI, MD5 hash) tuples, in the same order as contents_list
+        """
+        return [self.store_file(contents) for contents in contents_list]
+
     def open_for_reading(self, uri):
         """
         Open a file on the server for reading.
@@ -45,6 +55,41 @@ class FileServer(object):
             raise ValueError('No scheme in URI: %s', uri)
         return self.open_in_read_mode(parsed_url)
 
+    def delete_file(self, uri):
+        """
+        Delete a file on the server.  Deleting a file that doesn't exist is not an error.
+
+        :param str uri: The file's URI.
+        """
+        parsed_url = custom_urlparse(uri)
+        if parsed_url.scheme == '':
+            raise ValueError('No scheme in URI: %s', uri)
+        self.delete_in_scheme(parsed_url)
+
+    @abstractmethod
+    def delete_in_scheme(self, parsed_url):
+        """
+        Delete a file.
+
+        :param parsed_url: The file's URL.
+        :type  parsed_url: urlparse.ParseResult
+        """
+        raise NotImplementedError
+
+    def read_files(self, uris):
+        """
+        Read the whole contents of several files on the server.
+
+        :param uris: The files' URIs.
+
+        :returns: A list with the contents (str) of each file, in the same order as uris
+        """
+        contents_list = list()
+        for uri in uris:
+            with self.open_for_reading(uri) as f:
+                contents_list.append(f.read())
+        return contents_list
+
     @abstractmethod
     def open_in_read_mode(self, parsed_url):
         """
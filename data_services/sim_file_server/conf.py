@@ -53,6 +53,21 @@ def read_configuration():
     return server_factory
 
 
+def is_content_addressed():
+    """
+    Is the file server in content-addressed write mode?  In that mode, files with identical contents (i.e., the same
+    MD5 hash) are stored only once and are shared by all the simulation files that have those contents.  The mode is
+    enabled with the optional "content addressed" setting in FILE_SERVER (default = False).  It is always off with
+    the "data" write scheme: the contents are in the URI, so sharing the URI would store a second copy of them.
+
+    :rtype: bool
+    """
+    from django.conf import settings
+    if settings.FILE_SERVER.get('write scheme') == 'data':
+        return False
+    return bool(settings.FILE_SERVER.get('content addressed', False))
+
+
 def get_uri_schemes(server_settings):
     """
     Get the URI schemes that the server is configured to read and which scheme it uses to store new files.
@@ -2,6 +2,7 @@ from .api import FileServer
 from .uri_schemes.data_scheme import DataSchemeHandler
 from .uri_schemes.file_scheme import FileSchemeHandler
 from .uri_schemes.https_scheme import HttpsSchemeHandler
+from .util import custom_urlparse
 
 handler_factories = {
     'data': DataSchemeHandler,
@@ -38,7 +39,38 @@ class MultiSchemeServer(FileServer):
         uri, md5_hash = self.handler_for_writing.store_file(contents)
         return uri, md5_hash
 
+    def store_files(self, contents_list):
+        return self.handler_for_writing.store_files(contents_list)
+
+    def read_files(self, uris):
+        #  Group the files by scheme, so each handler can read its files together
+        parsed_urls = dict()
+        for index, uri in enumerate(uris):
+            parsed_url = custom_urlparse(uri)
+            if parsed_url.scheme == '':
+                raise ValueError('No scheme in URI: %s', uri)
+            parsed_urls.setdefault(parsed_url.scheme, list()).append((index, parsed_url))
+
+        contents_list = [None] * len(uris)
+        for indexed_urls in parsed_urls.itervalues():
+            handler = self.handler_for_scheme(indexed_urls[0][1])
+            contents = handler.read_files([parsed_url for index, parsed_url in indexed_urls])
+            for (index, parsed_url), file_contents in zip(indexed_urls, contents):
+                contents_list[index] = file_contents
+        return contents_list
+
     def open_in_read_mode(self, parsed_url):
+        return self.handler_for_scheme(parsed_url).open_in_read_mode(parsed_url)
+
+    def delete_in_scheme(self, parsed_url):
+        self.handler_for_scheme(parsed_url).delete_file(parsed_url)
+
+    def handler_for_scheme(self, parsed_url):
+        """
+        Get the handler for reading a URL.
+
+        :raises ValueError: if the URL's scheme is unknown or not enabled for reading
+        """
         try:
             handler = self.handlers[parsed_url.scheme]
         except KeyError:
@@ -47,4 +79,4 @@ class MultiSchemeServer(FileServer):
             else:
                 scheme_status = 'Unknown'
             raise ValueError('%s scheme in URI: %s' % (scheme_status, parsed_url.geturl()))
-        return handler.open_in_read_mode(parsed_url)
+        return handler
@@ -102,6 +102,12 @@ class FileSchemeHandler(UriSchemeHandler):
             raise ValueError('URI is not a file: %s' % parsed_url.get_url())
         return open(file_path, 'rb')
 
+    def delete_file(self, parsed_url):
+        rel_path = parsed_url.path.lstrip('/')
+        file_path = os.path.join(FileSchemeConfiguration.root_directory, rel_path)
+        if os.path.isfile(file_path):
+            os.remove(file_path)
+
 
 def write_data_to_file(data, file_path):
     """
@@ -29,6 +29,16 @@ class UriSchemeHandler(object):
         """
         raise NotImplementedError
 
+    def store_files(self, contents_list):
+        """
+        Store several new files.  Handlers that can transfer files concurrently override this method.
+
+        :param contents_list: The contents of each file (see store_file).
+
+        :returns: A list of (URI, MD5 hash) tuples, in the same order as contents_list
+        """
+        return [self.store_file(contents) for contents in contents_list]
+
     @abstractmethod
     def open_in_read_mode(self, parsed_url):
         """
@@ -41,3 +51,28 @@ class UriSchemeHandler(object):
                             mode.  The object is a context manager so it can be used in a "with" statement.
         """
         raise NotImplementedError
+
+    def delete_file(self, parsed_url):
+        """
+        Delete a file.  Deleting a file that doesn't exist is not an error.  Handlers that store the contents outside
+        the URL override this method.
+
+        :param parsed_url: The file's URL.
+        :type  parsed_url: urlparse.ParseResult
+        """
+        pass
+
+    def read_files(self, parsed_urls):
+        """
+        Read the whole contents of several files.  Handlers that can transfer files concurrently override this method.
+
+        :param parsed_urls: The files' URLs.
+        :type  parsed_urls: list of urlparse.ParseResult
+
+        :returns: A list with the contents (str) of each file, in the same order as parsed_urls
+        """
+        contents_list = list()
+        for parsed_url in parsed_urls:
+            with self.open_in_read_mode(parsed_url) as f:
+                contents_list.append(f.read())
+        return contents_list
@@ -1,7 +1,11 @@
 from hashlib import md5
 from io import BytesIO
+from multiprocessing.pool import ThreadPool
+import threading
+import time
 
 import requests
+import requests.adapters
 import requests.auth
 
 from .conf import ConfigurationError, SchemeConfiguration
@@ -160,6 +164,131 @@ class HttpsSchemeConfiguration(SchemeConfiguration):
         cls.root_directory = None
         cls.verify_certificates = False
         cls.authentication = None
+        WebDavClient.reset()
+
+
+class WebDavClient(object):
+    """
+    A client for the WebDAV server shared by all the https scheme handlers in a process.
+
+    Requests go through one requests.Session whose connection pool keeps the connections (and their TLS sessions)
+    alive between requests, instead of opening a new connection for every HEAD, MKCOL, PUT and GET.  Directories that
+    are known to exist are remembered, so storing a file in a directory that was already used costs a single PUT.
+    Requests that fail with a connection error or a 5xx status are retried with an exponential backoff.
+    """
+
+    #  Number of connections kept open to the server; this is also the number of files transferred in parallel
+    POOL_SIZE = 8
+
+    #  Number of times a request is retried after a connection error or a 5xx response
+    MAX_RETRIES = 3
+
+    #  Delay in seconds before the first retry; the delay doubles with each retry
+    BACKOFF_FACTOR = 0.5
+
+    RETRY_STATUS_CODES = (500, 502, 503, 504)
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.POOL_SIZE)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.existing_directories = set()
+        self.lock = threading.Lock()
+
+    @classmethod
+    def get(cls):
+        """
+        Get the client shared by this process, creating it if necessary.
+
+        :rtype: WebDavClient
+        """
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    @classmethod
+    def reset(cls):
+        """
+        Drop the shared client, closing its connections and forgetting the directories it created.
+        """
+        with cls._instance_lock:
+            if cls._instance is not None:
+                cls._instance.session.close()
+            cls._instance = None
+
+    def request(self, method, url, data=None, retries=None, **kwargs):
+        """
+        Send a request to the server, retrying it if the connection fails or the server returns a 5xx status.
+
+        :param str method: HTTP method
+        :param str url: Full URL of the resource
+        :param data: Body of the request.  If it's a callable, it is called before each attempt to get a new body,
+                     which allows request bodies read from file-like objects to be sent again.
+        :param int retries: Number of retries (defaults to MAX_RETRIES)
+        :return: The requests.Response of the last attempt
+        """
+        if retries is None:
+            retries = self.MAX_RETRIES
+        kwargs.update(HttpsSchemeConfiguration.as_kwargs())
+        attempt = 0
+        while True:
+            body = data() if callable(data) else data
+            try:
+                resp = self.session.request(method, url, data=body, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= retries:
+                    raise
+            else:
+                if resp.status_code not in self.RETRY_STATUS_CODES or attempt >= retries:
+                    return resp
+                resp.close()
+            time.sleep(self.BACKOFF_FACTOR * (2 ** attempt))
+            attempt += 1
+
+    def make_directories(self, root_url, subdirs):
+        """
+        Make sure that a chain of subdirectories exists under a root directory, creating the missing ones.  Only the
+        directories that this client has not seen yet are checked on the server.
+
+        :param str root_url: Full URL to the root directory (ends with "/")
+        :param subdirs: Names of the nested subdirectories
+        :return str: Full URL to the last subdirectory (ends with "/")
+        """
+        dir_url = root_url
+        for subdir in subdirs:
+            dir_url += subdir + '/'
+            if dir_url in self.existing_directories:
+                continue
+            if not self.directory_exists(dir_url):
+                self.create_directory(dir_url)
+            with self.lock:
+                self.existing_directories.add(dir_url)
+        return dir_url
+
+    def forget_directories(self):
+        """
+        Forget the directories known to exist, e.g., after they were removed from the server by someone else.
+        """
+        with self.lock:
+            self.existing_directories.clear()
+
+    def directory_exists(self, dir_url):
+        resp = self.request('HEAD', dir_url)
+        return resp.status_code == 200
+
+    def create_directory(self, dir_url):
+        resp = self.request('MKCOL', dir_url)
+        #  405 (Method Not Allowed) means that the directory was created in the meantime, e.g., by another thread
+        assert resp.status_code in (201, 405)
+
+    def put(self, file_url, data, retries=None):
+        resp = self.request('PUT', file_url, data=data, retries=retries)
+        return resp.status_code
 
 
 class HttpsSchemeHandler(UriSchemeHandler):
@@ -178,14 +307,8 @@ class HttpsSchemeHandler(UriSchemeHandler):
         subdirs = rel_path_components[:-1]
         file_name = rel_path_components[-1]
 
-        # Walk down through subdirectories, making sure each one exists
-        dir_url = HttpsSchemeConfiguration.root_directory
-        for subdir in subdirs:
-            dir_url += subdir + '/'
-            if not directory_exists(dir_url):
-                create_directory(dir_url)
-
-        file_url = dir_url + file_name
+        client = WebDavClient.get()
+        file_url = client.make_directories(HttpsSchemeConfiguration.root_directory, subdirs) + file_name
 
         if isinstance(contents, str):
             md5_hash = write_data_to_file(contents, file_url)
@@ -195,9 +318,39 @@ class HttpsSchemeHandler(UriSchemeHandler):
             md5_hash = copy_data_to_file(file_obj, file_url)
         return file_url, md5_hash
 
+    def store_files(self, contents_list):
+        """
+        Store several new files, uploading them in parallel over the client's connection pool.
+        """
+        return self._map(self.store_file, contents_list)
+
+    def read_files(self, parsed_urls):
+        """
+        Read the contents of several files, downloading them in parallel over the client's connection pool.
+        """
+        return self._map(self._read_file, parsed_urls)
+
+    @staticmethod
+    def _map(func, items):
+        items = list(items)
+        if len(items) < 2:
+            return [func(item) for item in items]
+        pool = ThreadPool(min(len(items), WebDavClient.POOL_SIZE))
+        try:
+            return pool.map(func, items)
+        finally:
+            pool.close()
+            pool.join()
+
+    @staticmethod
+    def _read_file(parsed_url):
+        resp = WebDavClient.get().request('GET', parsed_url.geturl())
+        assert resp.status_code == 200
+        return resp.content
+
     def open_in_read_mode(self, parsed_url):
         file_url = parsed_url.geturl()
-        resp = requests.get(file_url, stream=True, **HttpsSchemeConfiguration.as_kwargs())
+        resp = WebDavClient.get().request('GET', file_url, stream=True)
         assert resp.status_code == 200
         content_length = int(resp.headers['content-length'])
         IN_MEMORY_LIMIT = 100
@@ -208,6 +361,10 @@ class HttpsSchemeHandler(UriSchemeHandler):
         else:
             return resp.raw
 
+    def delete_file(self, parsed_url):
+        resp = WebDavClient.get().request('DELETE', parsed_url.geturl())
+        assert resp.status_code in (200, 204, 404)
+
 
 def directory_exists(dir_url):
     """
@@ -215,8 +372,7 @@ def directory_exists(dir_url):
 
     :param string dir_url: Full URL to the directory on the server.
     """
-    resp = requests.head(dir_url, **HttpsSchemeConfiguration.as_kwargs())
-    return resp.status_code == 200
+    return WebDavClient.get().directory_exists(dir_url)
 
 
 def create_directory(dir_url):
@@ -225,8 +381,7 @@ def create_directory(dir_url):
 
     :param string dir_url: Full URL to the directory on the server.
     """
-    resp = requests.Session().request("MKCOL", dir_url, **HttpsSchemeConfiguration.as_kwargs())
-    assert resp.status_code == 201
+    WebDavClient.get().create_directory(dir_url)
 
 
 def write_data_to_file(data, file_url):
@@ -237,8 +392,8 @@ def write_data_to_file(data, file_url):
     :param str file_url: Full URL to the file on the server.
     :return str: MD5 hash of the data that was written to the file.
     """
-    resp = requests.put(file_url, data, **HttpsSchemeConfiguration.as_kwargs())
-    assert resp.status_code == 201
+    status_code = _put(file_url, data)
+    assert status_code == 201
     md5_hash = md5(data).hexdigest()
     return md5_hash
 
@@ -271,7 +426,38 @@ def copy_data_to_file(file_obj, file_url):
     :param str file_path: Full path to the local file.
     :return str: MD5 hash of the data that was written to the file.
     """
-    file_reader = Md5Reader(file_obj)
-    resp = requests.put(file_url, file_reader, **HttpsSchemeConfiguration.as_kwargs())
-    assert resp.status_code == 201
-    return file_reader.md5_hash.hexdigest()
+    try:
+        start = file_obj.tell()
+    except (AttributeError, IOError):
+        start = None
+    readers = list()
+
+    def new_reader():
+        #  A new attempt has to send the data again, from where the first attempt started
+        if readers:
+            file_obj.seek(start)
+        readers.append(Md5Reader(file_obj))
+        return readers[-1]
+
+    status_code = _put(file_url, new_reader, retries=None if start is not None else 0)
+    assert status_code == 201
+    return readers[-1].md5_hash.hexdigest()
+
+
+def _put(file_url, data, retries=None):
+    """
+    Upload data to a file on the WebDAV server.  If the server says that the file's directory is missing (409), the
+    directories known to exist are forgotten and the file's directory is created again before another attempt.
+
+    :return int: The HTTP status code of the response.
+    """
+    client = WebDavClient.get()
+    status_code = client.put(file_url, data, retries=retries)
+    if status_code == 409 and retries != 0:
+        client.forget_directories()
+        root_url = HttpsSchemeConfiguration.root_directory
+        if file_url.startswith(root_url):
+            subdirs = file_url[len(root_url):].split('/')[:-1]
+            client.make_directories(root_url, subdirs)
+            status_code = client.put(file_url, data, retries=retries)
+    return status_code
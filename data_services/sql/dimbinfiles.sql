@@ -0,0 +1,3 @@
+-- Keep the content of the files uncompressed, so DimBinFiles.iter_content reads each chunk directly instead of
+-- decompressing the content from its start for every chunk.
+ALTER TABLE dim_bin_files ALTER COLUMN content SET STORAGE EXTERNAL;
@@ -0,0 +1,61 @@
+"""
+This module contains the tests for the ChannelRegistry used by the EMOD ingester
+"""
+
+from django.test import TestCase
+
+from data_services.ingesters.channel_registry import ChannelRegistry
+from data_services.models import DimChannel, DimRun
+
+
+class ChannelRegistryTests(TestCase):
+    """
+    This contains the methods for testing the ChannelRegistry
+    """
+
+    def setUp(self):
+        self.run = DimRun.objects.create(model_version='1.5', timestep_interval_days=1, status='0')
+        self.existing = DimChannel.objects.create(title='Adult Vectors', type='funestus',
+                                                  file_name='VectorSpeciesReport')
+        ChannelRegistry._registries.clear()
+
+    def test_resolve(self):
+        """
+        Existing channels are reused, missing channels are created and all of them are linked to the run
+        """
+        keys = [('Adult Vectors', 'funestus'), ('Adult Vectors', 'gambiae'), ('Daily EIR', 'funestus')]
+        registry = ChannelRegistry.for_run(self.run, 'VectorSpeciesReport')
+        resolved = registry.resolve(keys)
+
+        self.assertEqual(set(resolved.keys()), set(keys))
+        self.assertEqual(resolved[('Adult Vectors', 'funestus')].id, self.existing.id)
+        self.assertEqual(DimChannel.objects.filter(file_name='VectorSpeciesReport').count(), 3)
+        self.assertEqual(
+            set(self.run.dimchannel_set.values_list('id', flat=True)),
+            set(channel.id for channel in resolved.values())
+        )
+
+    def test_resolve_cached(self):
+        """
+        A second replication of the same run resolves its channels without touching the database
+        """
+        keys = [('Adult Vectors', 'funestus'), ('Adult Vectors', 'gambiae')]
+        ChannelRegistry.for_run(self.run, 'VectorSpeciesReport').resolve(keys)
+
+        registry = ChannelRegistry.for_run(self.run, 'VectorSpeciesReport')
+        self.assertNumQueries(0, registry.resolve, keys)
+        self.assertEqual(self.run.dimchannel_set.count(), 2)
+
+    def test_resolve_in_other_process(self):
+        """
+        A registry with a cold cache (e.g. in another ingester process) reuses the channels and links created by
+        another registry instead of duplicating them
+        """
+        keys = [('Adult Vectors', 'funestus'), ('Adult Vectors', 'gambiae')]
+        resolved = ChannelRegistry(self.run, 'VectorSpeciesReport').resolve(keys)
+        resolved_again = ChannelRegistry(self.run, 'VectorSpeciesReport').resolve(keys)
+
+        self.assertEqual(dict((key, channel.id) for key, channel in resolved.items()),
+                         dict((key, channel.id) for key, channel in resolved_again.items()))
+        self.assertEqual(DimChannel.objects.filter(file_name='VectorSpeciesReport').count(), 2)
+        self.assertEqual(self.run.dimchannel_set.count(), 2)
@@ -0,0 +1,46 @@
+"""
+This module contains the tests for the boxplot statistics in data_services.utils.distribution
+"""
+
+from django.test import TestCase
+
+from data_services.utils.distribution import box_statistics
+
+
+class DistributionTests(TestCase):
+    """
+    This contains the methods for testing the statistics of a distribution
+    """
+
+    def test_box_statistics(self):
+        stats = box_statistics([1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0, 100.0, None])
+        self.assertEqual(stats['count'], 10)
+        self.assertEqual(stats['min'], 1.0)
+        self.assertEqual(stats['max'], 100.0)
+        self.assertAlmostEqual(stats['q1'], 3.25)
+        self.assertAlmostEqual(stats['median'], 5.5)
+        self.assertAlmostEqual(stats['q3'], 7.75)
+        #  The whiskers stop at the last values within 1.5 times the interquartile range
+        self.assertEqual(stats['low'], 1.0)
+        self.assertEqual(stats['high'], 9.0)
+        self.assertEqual(stats['outliers'], [100.0])
+        self.assertAlmostEqual(stats['mean'], 14.5)
+        self.assertTrue(stats['ci_low'] < stats['mean'] < stats['ci_high'])
+        #  t(9) = 2.262
+        self.assertAlmostEqual(stats['ci_high'] - stats['mean'], 2.262 * stats['stddev'] / 10 ** 0.5)
+
+    def test_single_value(self):
+        stats = box_statistics([2.5])
+        self.assertEqual(stats['count'], 1)
+        self.assertEqual(stats['median'], 2.5)
+        self.assertEqual(stats['low'], 2.5)
+        self.assertEqual(stats['high'], 2.5)
+        self.assertEqual(stats['outliers'], [])
+        self.assertIsNone(stats['stddev'])
+        self.assertIsNone(stats['ci_low'])
+
+    def test_no_values(self):
+        stats = box_statistics([])
+        self.assertEqual(stats['count'], 0)
+        self.assertEqual(stats['outliers'], [])
+        self.assertIsNone(stats['median'])
@@ -0,0 +1,57 @@
+"""
+This module contains the tests for the downsampling of chart series in data_services.utils.downsampling
+"""
+
+from django.test import TestCase
+
+import numpy
+
+from data_services.utils.downsampling import lttb, min_max, downsample_series
+
+
+class DownsamplingTests(TestCase):
+    """
+    This contains the methods for testing the downsampling of series
+    """
+
+    def setUp(self):
+        self.x = numpy.arange(10000, dtype=float)
+        self.y = numpy.sin(self.x / 100.0)
+        self.y[5000] = 10.0
+
+    def test_lttb(self):
+        indices = lttb(self.x, self.y, 500)
+        self.assertEqual(len(indices), 500)
+        self.assertEqual(indices[0], 0)
+        self.assertEqual(indices[-1], 9999)
+        self.assertTrue(numpy.all(numpy.diff(indices) > 0))
+        self.assertIn(5000, indices)
+
+    def test_min_max(self):
+        indices = min_max(self.x, self.y, 500)
+        self.assertTrue(len(indices) <= 500)
+        self.assertTrue(numpy.all(numpy.diff(indices) > 0))
+        self.assertIn(5000, indices)
+        self.assertIn(self.y.argmin(), indices)
+
+    def test_short_series(self):
+        self.assertEqual(list(lttb(self.x[:10], self.y[:10], 500)), range(10))
+        self.assertEqual(list(min_max(self.x[:10], self.y[:10], 500)), range(10))
+
+    def test_downsample_series(self):
+        values = [1.0, None, 3.0, 4.0]
+        self.assertEqual(downsample_series(values, 1000, 10), [[1000.0, 1.0], [1010.0, None], [1020.0, 3.0],
+                                                               [1030.0, 4.0]])
+        self.assertEqual(len(downsample_series(self.y.tolist(), 0, 1, max_points=100)), 100)
+        self.assertRaises(ValueError, downsample_series, values, 0, 1, 2, None, None, 'unknown')
+
+    def test_window(self):
+        series = downsample_series(self.y.tolist(), 0, 10, x_min=1005, x_max=1100)
+        #  The points just outside the window are included
+        self.assertEqual(series[0][0], 1000.0)
+        self.assertEqual(series[-1][0], 1100.0)
+        self.assertEqual(len(series), 11)
+        series = downsample_series(self.y.tolist(), 0, 10, max_points=50, x_min=10000, x_max=60000)
+        self.assertEqual(len(series), 50)
+        self.assertEqual(series[0][0], 10000.0)
+        self.assertEqual(series[-1][0], 60000.0)
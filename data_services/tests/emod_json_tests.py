@@ -0,0 +1,69 @@
+"""
+This module contains the tests for the incremental EMOD output file reader in data_services.ingesters.emod_json
+"""
+
+from array import array
+import json
+import os
+import tempfile
+
+from django.test import TestCase
+
+from data_services.ingesters import emod_json
+
+
+class ReadChannelsTests(TestCase):
+    """
+    This contains the methods for testing read_channels
+    """
+
+    def setUp(self):
+        """
+        This will write a small EMOD style output file with a one dimensional channel, a channel with sub channels,
+        and a channel that is never requested.
+        """
+        self.file_json = {
+            'Header': {
+                'Channels': 3,
+                'Subchannel_Metadata': {
+                    'MeaningPerAxis': [['arabiensis', 'funestus'], ['unused axis']]
+                }
+            },
+            'Channels': {
+                'Daily EIR': {'Units': 'Infectious bites', 'Data': [0, 1.5, 2.25]},
+                'Adult Vectors': {'Units': '', 'Data': [[10, 11, 12], [20, 21.5, 22]]},
+                'Not Wanted': {'Units': '', 'Data': [7, 8, 9]}
+            }
+        }
+        fd, self.filename = tempfile.mkstemp(suffix='.json')
+        with os.fdopen(fd, 'w') as file_obj:
+            json.dump(self.file_json, file_obj)
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def check_channels(self, meaning, channels):
+        self.assertEqual(meaning, ['arabiensis', 'funestus'])
+        self.assertEqual(set(channels.keys()), set(['Daily EIR', 'Adult Vectors']))
+        self.assertEqual(channels['Daily EIR'], array('d', [0, 1.5, 2.25]))
+        self.assertEqual(channels['Adult Vectors'], [array('d', [10, 11, 12]), array('d', [20, 21.5, 22])])
+
+    def test_read_channels(self):
+        """
+        Only the requested channels are returned, as arrays of doubles
+        """
+        self.check_channels(*emod_json.read_channels(self.filename, set(['Daily EIR', 'Adult Vectors', 'Missing'])))
+
+    def test_read_all_channels(self):
+        """
+        All channels are returned when no titles are given
+        """
+        meaning, channels = emod_json.read_channels(self.filename)
+        self.assertEqual(len(channels), 3)
+        self.assertEqual(channels['Not Wanted'], array('d', [7, 8, 9]))
+
+    def test_read_channels_json(self):
+        """
+        The json fallback returns the same thing as the event based reader
+        """
+        self.check_channels(*emod_json._read_channels_json(self.filename, set(['Daily EIR', 'Adult Vectors'])))
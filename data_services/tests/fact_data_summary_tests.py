@@ -0,0 +1,132 @@
+"""
+This module contains the tests for the precomputed statistics of the fact data in fact_data_summary
+"""
+
+from django.test import TestCase
+
+from data_services.models import DimChannel, DimExecution, FactDataSummary
+from data_services.tests.run_data_series_tests import FactDataTestMixin
+from data_services.utils.run_data import RunData, is_execution_finished, summarize_execution, \
+    summarize_finished_executions
+
+
+class FactDataSummaryTests(FactDataTestMixin, TestCase):
+    """
+    This contains the methods for testing summarize_execution and the use of the summary by RunData
+    """
+
+    def as_dict(self, group_by=False):
+        run_data = RunData(execution=DimExecution.objects.filter(run_key=self.run),
+                           channel=DimChannel.objects.filter(pk__in=[chan.id for chan in self.channels]),
+                           group_by=group_by)
+        return run_data.as_dict(with_ts=True)
+
+    def test_is_execution_finished(self):
+        """
+        An execution is finished once all its replications are ingested or failed, with at least one success
+        """
+        execution = self.executions[0]
+        self.assertTrue(is_execution_finished(execution))
+
+        #------ A replication is still running
+        replication = execution.dimreplication_set.all()[0]
+        replication.status = None
+        replication.save()
+        self.assertFalse(is_execution_finished(execution))
+
+        #------ A failed replication is finished
+        replication.status = -1
+        replication.save()
+        self.assertTrue(is_execution_finished(execution))
+
+        #------ But at least one of them must have succeeded
+        execution.dimreplication_set.update(status=-1)
+        self.assertFalse(is_execution_finished(execution))
+
+        execution.replications = 0
+        self.assertFalse(is_execution_finished(execution))
+
+    def test_summarize_execution(self):
+        """
+        The summary holds the statistics across replications of every timestep, and of every yearly sum
+        """
+        execution = self.executions[1]
+        summarize_execution(execution)
+
+        rows = FactDataSummary.objects.filter(execution_key=execution)
+        self.assertEqual(rows.filter(is_yearly=False).count(), 2 * self.timesteps)
+        self.assertEqual(rows.filter(is_yearly=True).count(), 2 * 2)
+        self.assertFalse(FactDataSummary.objects.filter(execution_key=self.executions[0]).exists())
+
+        for chan in self.channels:
+            daily = rows.filter(channel_key=chan, is_yearly=False).order_by('timestep')
+            self.assertEqual([row.mean for row in daily], self.expected_series(execution, chan))
+            for row in daily:
+                #  The two replications differ by 1
+                self.assertEqual(row.min, row.mean - 0.5)
+                self.assertEqual(row.max, row.mean + 0.5)
+                self.assertAlmostEqual(row.stddev, 0.5 ** 0.5)
+
+            yearly = rows.filter(channel_key=chan, is_yearly=True).order_by('timestep')
+            self.assertEqual([row.timestep for row in yearly], [0, 1])
+            self.assertEqual([row.mean for row in yearly], self.expected_series(execution, chan, group_by=True))
+            #  The yearly sums of the two replications differ by 5
+            self.assertEqual([row.max - row.min for row in yearly], [5.0, 5.0])
+
+    def test_summarize_execution_again(self):
+        """
+        Summarizing an execution again replaces its rows
+        """
+        summarize_execution(self.executions[0])
+        summarize_execution(self.executions[0])
+
+        self.assertEqual(FactDataSummary.objects.filter(execution_key=self.executions[0]).count(),
+                         2 * self.timesteps + 2 * 2)
+
+    def test_summarize_finished_executions(self):
+        """
+        Only the finished executions that have no summary yet are summarized
+        """
+        self.executions[1].dimreplication_set.filter(series_id=1).update(status=None)
+        summarize_finished_executions(self.run)
+
+        self.assertTrue(FactDataSummary.objects.filter(execution_key=self.executions[0]).exists())
+        self.assertFalse(FactDataSummary.objects.filter(execution_key=self.executions[1]).exists())
+
+        #------ Existing summaries are left alone
+        FactDataSummary.objects.filter(execution_key=self.executions[0]).update(mean=-1)
+        self.executions[1].dimreplication_set.update(status=0)
+        summarize_finished_executions(self.run)
+
+        self.assertFalse(FactDataSummary.objects.filter(execution_key=self.executions[0]).exclude(mean=-1).exists())
+        self.assertTrue(FactDataSummary.objects.filter(execution_key=self.executions[1]).exists())
+
+    def test_fetch_series_fallback(self):
+        """
+        The series of the summarized executions are read from the summary, the others from the fact data
+        """
+        summarize_execution(self.executions[0])
+        FactDataSummary.objects.filter(execution_key=self.executions[0], timestep=0).update(mean=-1)
+
+        run_data = RunData(execution=self.executions[0], channel=self.channels[0].id)
+        series = run_data.fetch_series(self.executions, self.channels)
+
+        self.assertEqual(len(series), 4)
+        for chan in self.channels:
+            self.assertEqual(series[(self.executions[0].id, chan.id)][1],
+                             [-1] + self.expected_series(self.executions[0], chan)[1:])
+            self.assertEqual(series[(self.executions[1].id, chan.id)][1],
+                             self.expected_series(self.executions[1], chan))
+
+    def test_summary_matches_fact_data(self):
+        """
+        The daily and yearly series read from the summary are those aggregated from the fact data
+        """
+        daily = self.as_dict()
+        yearly = self.as_dict(group_by=True)
+
+        for execution in self.executions:
+            summarize_execution(execution)
+
+        self.assertEqual(self.as_dict(), daily)
+        self.assertEqual(self.as_dict(group_by=True), yearly)
@@ -357,7 +357,8 @@ class EmodIngestTest(TransactionTestCase):
         data_file = 'data_services/tests/static_files/badSimType-9999.zip'
         #data_file = open(data_file, 'r')
         ingester = EMOD_ingester(data_file)
-        ingester.ingest()
+        # The missing channels are found while the COPY is streamed
+        ingester.ingest(stream=True)
 
         self.replication = DimReplication.objects.get(pk=self.replication.id)
 
@@ -376,4 +377,21 @@ class EmodIngestTest(TransactionTestCase):
         )
         return
 
+    def test_bad_simulation_ingest_in_memory(self):
+        """
+        This tests that a bad simulation type fails gracefully when the COPY payload is built in memory.
+        """
+        print "\nTesting bad sim type ingestion in memory"
+
+        data_file = 'data_services/tests/static_files/badSimType-9999.zip'
+        ingester = EMOD_ingester(data_file)
+        ingester.ingest(stream=False)
 
+        self.replication = DimReplication.objects.get(pk=self.replication.id)
+        self.assertEqual(
+            self.replication.status,
+            -1,
+            msg="Failed ingestion failed to set replication status."
+        )
+        self.assertEqual(BaseFactData.objects.count(), 0, msg="Rows were detected, no rows were expected.")
+        return
@@ -1,8 +1,11 @@
 import hashlib
+import StringIO
 
+from django.conf import settings
 from django.test import TestCase
 
-from ..models import DimUser, Simulation, SimulationGroup, SimulationInputFile
+from ..models import DimUser, Simulation, SimulationGroup, SimulationInputFile, SimulationFileContent
+from ..sim_file_server.conf import TestingAPI
 
 
 class SimInputFileTests(TestCase):
@@ -99,3 +102,73 @@ class SimInputFileTests(TestCase):
         with sim_input_file.open_for_reading() as f:
             retrieved_contents = f.read()
         self.assertEqual(retrieved_contents, empty_om_scenario)
+
+    def test_content_addressed(self):
+        """
+        Test that identical contents are stored once and shared in content-addressed mode.
+        """
+        file_server_settings = dict(settings.FILE_SERVER)
+        file_server_settings['content addressed'] = True
+        #  The contents aren't shared with the "data" write scheme
+        file_server_settings['write scheme'] = 'file'
+        TestingAPI.reset_configuration()
+        with self.settings(FILE_SERVER=file_server_settings):
+            contents = 'Shall I compare thee to a summer\'s day?'
+            md5_hash = hashlib.md5(contents).hexdigest()
+            input_file1 = SimulationInputFile.objects.create_file(contents, created_by=self.user)
+            input_file2 = SimulationInputFile.objects.create_file(contents, created_by=self.user)
+            self.assertEqual(input_file1.uri, input_file2.uri)
+            self.assertEqual(SimulationFileContent.objects.get(md5=md5_hash).ref_count, 2)
+
+            input_file3 = input_file1.copy()
+            self.assertEqual(input_file3.uri, input_file1.uri)
+            self.assertContentsEqual(input_file3, contents)
+            self.assertEqual(SimulationFileContent.objects.get(md5=md5_hash).ref_count, 3)
+
+            input_file2.delete()
+            self.assertEqual(SimulationFileContent.objects.get(md5=md5_hash).ref_count, 2)
+
+            input_file1.delete()
+            input_file3.delete()
+            self.assertEqual(SimulationFileContent.objects.get(md5=md5_hash).ref_count, 0)
+            self.assertEqual(SimulationFileContent.objects.purge(), 1)
+            self.assertFalse(SimulationFileContent.objects.filter(md5=md5_hash).exists())
+        TestingAPI.reset_configuration()
+
+    def test_content_addressed_legacy_files(self):
+        """
+        Test that files stored before content addressing was turned on don't change the references of the shared
+        contents.
+        """
+        file_server_settings = dict(settings.FILE_SERVER)
+        file_server_settings['write scheme'] = 'file'
+        TestingAPI.reset_configuration()
+        contents = 'Rough winds do shake the darling buds of May'
+        md5_hash = hashlib.md5(contents).hexdigest()
+        with self.settings(FILE_SERVER=file_server_settings):
+            legacy_file1 = SimulationInputFile.objects.create_file(contents, created_by=self.user)
+            legacy_file2 = SimulationInputFile.objects.create_file(contents, created_by=self.user)
+
+        file_server_settings['content addressed'] = True
+        with self.settings(FILE_SERVER=file_server_settings):
+            input_file = SimulationInputFile.objects.create_file(contents, created_by=self.user)
+            self.assertNotEqual(input_file.uri, legacy_file1.uri)
+            self.assertEqual(SimulationFileContent.objects.get(md5=md5_hash).ref_count, 1)
+
+            # Deleting a legacy file doesn't release the shared contents
+            legacy_file2.delete()
+            self.assertEqual(SimulationFileContent.objects.get(md5=md5_hash).ref_count, 1)
+
+            # A copy of a legacy file references the shared contents, not the legacy file's
+            legacy_copy = legacy_file1.copy()
+            self.assertEqual(legacy_copy.uri, input_file.uri)
+            self.assertEqual(SimulationFileContent.objects.get(md5=md5_hash).ref_count, 2)
+            legacy_copy.delete()
+            self.assertEqual(SimulationFileContent.objects.purge(), 0)
+            self.assertContentsEqual(legacy_file1, contents)
+
+            # Contents stored from a file-like object are shared too, the duplicate is deleted
+            streamed_file = SimulationInputFile.objects.create_file(StringIO.StringIO(contents), created_by=self.user)
+            self.assertEqual(streamed_file.uri, input_file.uri)
+            self.assertEqual(SimulationFileContent.objects.get(md5=md5_hash).ref_count, 2)
+        TestingAPI.reset_configuration()
@@ -1,8 +1,11 @@
 import hashlib
+import json
 
+from django.conf import settings
 from django.test import TestCase
 
 from ..models import DimUser, Simulation, SimulationGroup, SimulationOutputFile
+from ..sim_file_server.conf import TestingAPI, get_active_server
 
 
 class SimOutputFileTests(TestCase):
@@ -24,4 +27,55 @@ class SimOutputFileTests(TestCase):
         retrieved_contents = sim_out_file.get_contents()
         self.assertEqual(retrieved_contents, contents)
         expected_hash = hashlib.md5(contents).hexdigest()
-        self.assertEqual(sim_out_file.metadata[sim_out_file.MetadataKeys.CHECKSUM], expected_hash)
\ No newline at end of file
+        self.assertEqual(sim_out_file.metadata[sim_out_file.MetadataKeys.CHECKSUM], expected_hash)
+
+    def create_inset_chart(self, username):
+        user = DimUser.objects.create(username=username)
+        sim_group = SimulationGroup.objects.create(submitted_by=user)
+        simulation = Simulation.objects.create(group=sim_group)
+        contents = json.dumps({
+            'Header': {'Channels': 2, 'Timesteps': 3},
+            'Channels': {
+                'Daily EIR': {'Units': 'infectious bites/day', 'Data': [0.5, 1.0, 1.5]},
+                'Adult Vectors': {'Units': '', 'Data': [100, 200, 300]},
+            }
+        })
+        return SimulationOutputFile.objects.create_file(contents, name='InsetChart.json', simulation=simulation)
+
+    def assertChannelsEqual(self, sim_out_file):
+        self.assertEqual(sorted(sim_out_file.get_channel_titles()), ['Adult Vectors', 'Daily EIR'])
+        self.assertEqual(sim_out_file.get_channel('Daily EIR'), [0.5, 1.0, 1.5])
+        self.assertEqual(sim_out_file.get_channel('Adult Vectors'), [100.0, 200.0, 300.0])
+        self.assertRaises(KeyError, sim_out_file.get_channel, 'Missing')
+
+    def test_inset_chart_channels(self):
+        # The index isn't stored with the "data" write scheme
+        sim_out_file = self.create_inset_chart('test-user-2')
+        self.assertIsNone(sim_out_file.channel_index_uri)
+        self.assertChannelsEqual(sim_out_file)
+
+    def test_stored_channel_index(self):
+        file_server_settings = dict(settings.FILE_SERVER)
+        file_server_settings['write scheme'] = 'file'
+        TestingAPI.reset_configuration()
+        with self.settings(FILE_SERVER=file_server_settings):
+            sim_out_file = self.create_inset_chart('test-user-3')
+            index_uri = sim_out_file.channel_index_uri
+            self.assertTrue(index_uri.startswith('file:'))
+            self.assertChannelsEqual(sim_out_file)
+
+            # Files stored before the index existed are indexed when their channels are read
+            del sim_out_file.metadata[sim_out_file.MetadataKeys.CHANNEL_INDEX]
+            sim_out_file.save()
+            self.assertEqual(sim_out_file.get_channel('Daily EIR'), [0.5, 1.0, 1.5])
+            self.assertIsNotNone(sim_out_file.channel_index_uri)
+            self.assertNotEqual(sim_out_file.channel_index_uri, index_uri)
+
+            # The index is deleted when the contents are replaced, and when the file is deleted
+            index_uri = sim_out_file.channel_index_uri
+            sim_out_file._set_contents(sim_out_file.get_contents())
+            self.assertRaises(ValueError, get_active_server().open_for_reading, index_uri)
+            index_uri = sim_out_file.channel_index_uri
+            sim_out_file.delete()
+            self.assertRaises(ValueError, get_active_server().open_for_reading, index_uri)
+        TestingAPI.reset_configuration()
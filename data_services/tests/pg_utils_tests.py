@@ -9,7 +9,8 @@ import hashlib
 from django.test import TestCase
 from django.db import connections
 
-from data_services.utils import encode_binary, commit_to_warehouse
+from data_services.utils import encode_binary, encode_binary_batch, commit_to_warehouse
+from data_services.utils.pg_utils import CopyStream, stream_to_warehouse
 from data_services.models import FactData
 
 
@@ -59,4 +60,87 @@ class PgUtilsTests(TestCase):
             msg="The encoded binary data's hash is different from the expected hash, encoding failed"
         )
 
-        return
\ No newline at end of file
+        return
+
+    def test_encode_binary_batch(self):
+        """
+        This will test the encode binary batch function.
+
+        The batch encoder must produce exactly the same bytes as encoding each timestep of
+        the channel with encode_binary and consecutive ids.
+        """
+        print "\nTesting encode_binary_batch"
+        data = [row[2] for row in self.data] + [0, 1]
+
+        for ts, value in enumerate(data):
+            self.pg_io.write(encode_binary(100 + ts, ts, value, 2, 3, 4))
+
+        self.assertEqual(
+            self.pg_io.getvalue(),
+            str(encode_binary_batch(100, data, 2, 3, 4)),
+            msg="The batch encoded binary data is different from the per row encoding, encoding failed"
+        )
+
+        # Without ids the rows only contain the FACT_COLUMNS
+        self.assertEqual(
+            ''.join(pack('!hiiidiiiiii', 5, 4, ts, 8, value, 4, 2, 4, 3, 4, 4) for ts, value in enumerate(data)),
+            str(encode_binary_batch(None, data, 2, 3, 4)),
+            msg="The batch encoded binary data without ids is wrong, encoding failed"
+        )
+
+        self.assertRaises(TypeError, encode_binary_batch, 100, ['not a number'], 2, 3, 4)
+        self.assertRaises(TypeError, encode_binary_batch, 100, data, '2', 3, 4)
+
+        return
+
+    def test_copy_stream(self):
+        """
+        This will test the CopyStream file-like object handed to copy_expert.
+
+        Reading the stream in blocks of any size must return the concatenation of the
+        chunks, and chunks must only be consumed as they are read.
+        """
+        print "\nTesting CopyStream"
+        chunks = ['PGCOPY', bytearray('abc'), '', 'defghij', 'k']
+        expected = ''.join(str(chunk) for chunk in chunks)
+
+        for size in (1, 2, 5, 8192):
+            stream = CopyStream(chunks)
+            read = list()
+            block = stream.read(size)
+            while block:
+                self.assertTrue(len(block) <= size)
+                read.append(block)
+                block = stream.read(size)
+            self.assertEqual(''.join(read), expected)
+
+        self.assertEqual(CopyStream(chunks).read(), expected)
+
+        consumed = list()
+
+        def lazy_chunks():
+            for chunk in chunks:
+                consumed.append(chunk)
+                yield chunk
+
+        stream = CopyStream(lazy_chunks())
+        self.assertEqual(stream.read(4), 'PGCO')
+        self.assertEqual(len(consumed), 1)
+
+        return
+
+    def test_stream_to_warehouse_error(self):
+        """
+        This will test that an exception raised while producing the chunks of a COPY is propagated, rather than
+        psycopg2's error about the failed read.
+        """
+        print "\nTesting stream_to_warehouse with a failing chunk producer"
+
+        def failing_chunks():
+            yield pack('!11sii', b'PGCOPY\n\377\r\n\0', 0, 0)
+            raise KeyError('Missing channel')
+
+        self.assertRaises(KeyError, stream_to_warehouse, failing_chunks(), connections['default'].settings_dict,
+                          'fact_data')
+
+        return
@@ -1,5 +1,9 @@
 import cStringIO
 import datetime
+import gzip
+import os
+import StringIO
+import time
 
 from django.contrib.auth.models import User
 from tastypie.test import ResourceTestCase
@@ -9,6 +13,7 @@ from ..models import DimBinFiles, DimUser, Simulation, SimulationGroup, Simulati
 from ..rest_api import api  # To ensure API singleton is instantiated, so that get_resource_uri method calls work.
                             # See https://groups.google.com/forum/#!topic/django-tastypie/VZoFaBossnw
 from ..rest_api.resources import InputFileResource, OutputFileResource
+from ..rest_api.uploads import GunzipReader, PartialUpload, delete_abandoned_uploads, parse_content_range
 from VECNet import test_settings
 
 
@@ -76,6 +81,28 @@ class DimBinFileTests(ResourceTestCase):
 
         self.logout()
 
+    def test_download(self):
+        """
+        Test the downloading of a file's content, whole and by range.
+        """
+        download_url = '/data_services/api/v1/dim_bin_files/%s/download/' % self.input_file.pk
+        content = self.input_file.content
+        response = self.client.get(download_url)
+        self.assertHttpOK(response)
+        self.assertEqual(''.join(response.streaming_content), content)
+        self.assertEqual(response['ETag'], '"AAAA"')
+
+        response = self.client.get(download_url, HTTP_RANGE='bytes=5-9')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(''.join(response.streaming_content), content[5:10])
+        self.assertEqual(response['Content-Range'], 'bytes 5-9/%d' % len(content))
+
+        response = self.client.get(download_url, HTTP_RANGE='bytes=%d-' % len(content))
+        self.assertEqual(response.status_code, 416)
+
+        response = self.client.get(download_url, HTTP_IF_NONE_MATCH='"AAAA"')
+        self.assertEqual(response.status_code, 304)
+
 
 class InputFileTests(ResourceTestCase):
     """
@@ -126,6 +153,20 @@ class InputFileTests(ResourceTestCase):
         self.assertHttpOK(response)
         contents = ''.join(response.streaming_content)
         self.assertEqual(contents, self.contents)
+        self.assertEqual(response['ETag'], '"%s"' % self.input_file.checksum)
+        self.assertEqual(int(response['Content-Length']), len(self.contents))
+
+    def test_download_range(self):
+        """
+        Test the downloading of the last bytes of an input file, and of a file the client already has.
+        """
+        download_url = self.file_url + 'download/'
+        response = self.api_client.get(download_url, HTTP_RANGE='bytes=-20')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(''.join(response.streaming_content), self.contents[-20:])
+
+        response = self.api_client.get(download_url, HTTP_IF_NONE_MATCH='"%s"' % self.input_file.checksum)
+        self.assertEqual(response.status_code, 304)
 
 
 # Sample OpenMalaria files
@@ -462,3 +503,140 @@ class OutputFileTests(ResourceTestCase):
         self.assert_file_is_output_txt(output_file)
 
         self.check_sim_status(sim_status.SCRIPT_DONE)
+
+
+def gzip_data(data):
+    buf = StringIO.StringIO()
+    with gzip.GzipFile(fileobj=buf, mode='wb') as f:
+        f.write(data)
+    return buf.getvalue()
+
+
+class OutputFileUploadTests(ResourceTestCase):
+    """
+    Tests of output files uploaded as multipart/form-data bodies or as the bodies of PUT requests.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.resource_endpoint = OutputFileResource().get_resource_uri()
+        test_user = DimUser.objects.create(username='test-user')
+        sim_group = SimulationGroup.objects.create(submitted_by=test_user)
+        cls.simulation = Simulation.objects.create(group=sim_group)
+        cls.file_url = '%s%s/ctsout.txt/' % (cls.resource_endpoint, cls.simulation.id)
+
+    @classmethod
+    def tearDownClass(cls):
+        for data_model in Simulation, SimulationGroup, DimUser:
+            data_model.objects.all().delete()
+
+    def setUp(self):
+        super(OutputFileUploadTests, self).setUp()
+        SimulationOutputFile.objects.all().delete()
+        PartialUpload(self.simulation.id, 'ctsout.txt').delete()
+        self.simulation.status = sim_status.STARTED_SCRIPT
+        self.simulation.save()
+
+    def check_sim_status(self, expected_status):
+        updated_simulation = Simulation.objects.get(id=self.simulation.id)
+        self.assertEqual(updated_simulation.status, expected_status)
+
+    def check_ctsout_txt(self):
+        sim_out_file = SimulationOutputFile.objects.get(simulation=self.simulation, name='ctsout.txt')
+        self.assertEqual(sim_out_file.get_contents(), CTSOUT_TXT)
+
+    def test_multipart(self):
+        ctsout_file = StringIO.StringIO(gzip_data(CTSOUT_TXT))
+        ctsout_file.name = 'ctsout.txt.gz'
+        output_file = StringIO.StringIO(OUTPUT_TXT)
+        output_file.name = 'output.txt'
+        data = {
+            'id_on_client': str(self.simulation.id),
+            'ctsout.txt': ctsout_file,
+            'output.txt': output_file,
+        }
+        response = self.client.post(self.resource_endpoint, data=data)
+        self.assertHttpAccepted(response)
+        self.check_ctsout_txt()
+        sim_out_file = SimulationOutputFile.objects.get(simulation=self.simulation, name='output.txt')
+        self.assertEqual(sim_out_file.get_contents(), OUTPUT_TXT)
+        self.check_sim_status(sim_status.SCRIPT_DONE)
+
+    def test_multipart_unknown_names(self):
+        foo_file = StringIO.StringIO('foo')
+        foo_file.name = 'foo.dat'
+        response = self.client.post(self.resource_endpoint, data={'id_on_client': str(self.simulation.id),
+                                                                  'foo.dat': foo_file})
+        self.assertHttpBadRequest(response)
+        self.assertEqual(self.deserialize(response)['error'], OutputFileResource.Errors.UNKNOWN_NAMES)
+        self.check_sim_status(sim_status.OUTPUT_ERROR)
+
+    def test_put(self):
+        response = self.client.put(self.file_url, data=gzip_data(CTSOUT_TXT), content_type='text/plain',
+                                   HTTP_CONTENT_ENCODING='gzip')
+        self.assertHttpCreated(response)
+        self.check_ctsout_txt()
+        self.check_sim_status(sim_status.STAGING_OUTPUT)
+
+    def test_put_again(self):
+        for contents in OUTPUT_TXT, CTSOUT_TXT:
+            response = self.client.put(self.file_url, data=contents, content_type='text/plain')
+            self.assertHttpCreated(response)
+        self.check_ctsout_txt()
+
+    def test_put_invalid_gzip(self):
+        response = self.client.put(self.file_url, data=CTSOUT_TXT, content_type='text/plain',
+                                   HTTP_CONTENT_ENCODING='gzip')
+        self.assertHttpBadRequest(response)
+        self.assertEqual(self.deserialize(response)['error'], OutputFileResource.Errors.INVALID_GZIP)
+        self.assertFalse(SimulationOutputFile.objects.filter(simulation=self.simulation).exists())
+
+    def test_resumed_put(self):
+        data = gzip_data(CTSOUT_TXT)
+        middle = len(data) // 2
+        response = self.client.put(self.file_url, data=data[:middle], content_type='text/plain',
+                                   HTTP_CONTENT_ENCODING='gzip',
+                                   HTTP_CONTENT_RANGE='bytes 0-%d/%d' % (middle - 1, len(data)))
+        self.assertHttpAccepted(response)
+        self.assertEqual(response['Range'], 'bytes=0-%d' % (middle - 1))
+        self.assertFalse(SimulationOutputFile.objects.filter(simulation=self.simulation).exists())
+
+        # The upload is interrupted, the client asks how many bytes were received
+        response = self.client.get(self.file_url)
+        self.assertHttpOK(response)
+        self.assertEqual(self.deserialize(response)['received'], middle)
+
+        # A part that doesn't follow the received bytes is refused
+        response = self.client.put(self.file_url, data=data[middle + 1:], content_type='text/plain',
+                                   HTTP_CONTENT_ENCODING='gzip',
+                                   HTTP_CONTENT_RANGE='bytes %d-%d/%d' % (middle + 1, len(data) - 1, len(data)))
+        self.assertEqual(response.status_code, 416)
+
+        response = self.client.put(self.file_url, data=data[middle:], content_type='text/plain',
+                                   HTTP_CONTENT_ENCODING='gzip',
+                                   HTTP_CONTENT_RANGE='bytes %d-%d/%d' % (middle, len(data) - 1, len(data)))
+        self.assertHttpCreated(response)
+        self.check_ctsout_txt()
+        self.assertEqual(PartialUpload(self.simulation.id, 'ctsout.txt').size, 0)
+
+    def test_abandoned_put(self):
+        partial_upload = PartialUpload(self.simulation.id, 'ctsout.txt')
+        partial_upload.write(0, StringIO.StringIO(CTSOUT_TXT[:10]))
+        delete_abandoned_uploads()
+        self.assertEqual(partial_upload.size, 10)
+
+        two_days_ago = time.time() - 2 * 24 * 60 * 60 - 1
+        os.utime(partial_upload.path, (two_days_ago, two_days_ago))
+        self.assertEqual(delete_abandoned_uploads(max_age=2 * 24 * 60 * 60), 1)
+        self.assertEqual(partial_upload.size, 0)
+
+    def test_gunzip_reader(self):
+        data = gzip_data(CTSOUT_TXT) + gzip_data(OUTPUT_TXT)
+        reader = GunzipReader(StringIO.StringIO(data))
+        self.assertEqual(reader.read(10) + reader.read(), CTSOUT_TXT + OUTPUT_TXT)
+
+    def test_parse_content_range(self):
+        self.assertEqual(parse_content_range('bytes 0-99/200'), (0, 99, 200))
+        self.assertEqual(parse_content_range('bytes 100-199/*'), (100, 199, None))
+        for header in ('bytes 10-9/200', 'bytes 0-200/200', 'items 0-1/2'):
+            self.assertRaises(ValueError, parse_content_range, header)
@@ -0,0 +1,202 @@
+"""
+This module contains the tests for the aggregation of the fact data of a run by RunData
+"""
+
+from django.db import connection
+from django.test import TestCase
+
+from data_services.models import DimChannel, DimExecution, DimReplication, DimRun
+from data_services.utils.run_data import FactPoint, RunData
+
+
+class FactDataTestMixin(object):
+    """
+    Builds a run with two executions of two replications each, reporting two channels over ten timesteps.  The
+    timestep interval is 73 days, so a year has 5 timesteps and the data covers 2 years.
+
+    The value of a channel is 100 * execution + 10 * channel + replication + timestep (with the indexes of the
+    execution, channel and replication counted from 0), so its mean across replications is that of replication 0.5.
+    """
+
+    timesteps = 10
+
+    def setUp(self):
+        self.run = DimRun.objects.create(model_version='1.5', timestep_interval_days=73, status='0')
+        self.channels = [
+            DimChannel.objects.create(title='Daily EIR', type='funestus', file_name='VectorSpeciesReport'),
+            DimChannel.objects.create(title='Adult Vectors', type='funestus', file_name='VectorSpeciesReport')
+        ]
+        self.executions = list()
+        self.replications = list()
+        for e_ndx in range(2):
+            execution = DimExecution.objects.create(run_key=self.run, name='execution %s' % e_ndx, replications=2)
+            self.executions.append(execution)
+            for r_ndx in range(2):
+                self.replications.append(DimReplication.objects.create(
+                    execution_key=execution, seed_used=r_ndx, series_id=r_ndx, status=0
+                ))
+
+        cursor = connection.cursor()
+        cursor.execute("create table fact_data_run_%s () inherits (base_fact_data)" % self.run.id)
+        rows = list()
+        for replication in self.replications:
+            e_ndx = self.executions.index(replication.execution_key)
+            for c_ndx, chan in enumerate(self.channels):
+                for timestep in range(self.timesteps):
+                    value = 100 * e_ndx + 10 * c_ndx + replication.series_id + timestep
+                    rows.append((timestep, value, chan.id, self.run.id, replication.id))
+        cursor.executemany(
+            "insert into fact_data_run_%s (timestep, value, channel_key, run_key, replication_key) "
+            "values (%%s, %%s, %%s, %%s, %%s)" % self.run.id,
+            rows
+        )
+        cursor.close()
+
+    def expected_series(self, execution, chan, group_by=False):
+        """
+        The series of a channel in an execution, computed from the definition of the test data
+        """
+        e_ndx = self.executions.index(execution)
+        c_ndx = self.channels.index(chan)
+        means = [100 * e_ndx + 10 * c_ndx + 0.5 + timestep for timestep in range(self.timesteps)]
+        if group_by:
+            return [sum(means[year * 5:(year + 1) * 5]) for year in range(self.timesteps / 5)]
+        return means
+
+
+class RunDataSeriesTests(FactDataTestMixin, TestCase):
+    """
+    This contains the methods for testing that RunData fetches every series with one grouped query, and returns the
+    same series as the per-series queries it replaced
+    """
+
+    def per_series(self, execution, chan, group_by=False):
+        """
+        The series of a channel in an execution, as it was fetched before the series were grouped in one query
+        """
+        query = """
+            select distinct(timestep), row_number() over (order by timestep nulls last) as id, avg(value) as value
+                from fact_data_run_%(run_id)s
+                inner join dim_channel on channel_key=dim_channel.id
+                inner join dim_replication on replication_key=dim_replication.id
+            where execution_key=%(execution_key)s and dim_channel.id=%(channel_key)s
+            group by timestep order by timestep
+            """
+        if group_by:
+            query = """
+            select sum(value) as value, row_number() over (order by timestep/%%(ts_year)s) as id,
+                (row_number() over (order by timestep/%%(ts_year)s)) - 1 as timestep
+            from (%s) foo
+            group by timestep/%%(ts_year)s order by timestep/%%(ts_year)s;
+            """ % query
+        cursor = connection.cursor()
+        cursor.execute(query, {
+            'run_id': self.run.id,
+            'execution_key': execution.id,
+            'channel_key': chan.id,
+            'ts_year': 5
+        })
+        if group_by:
+            values = [row[0] for row in cursor.fetchall()]
+        else:
+            values = [row[2] for row in cursor.fetchall()]
+        cursor.close()
+        return values
+
+    def test_single_series(self):
+        """
+        One execution and one channel give one series named after the execution
+        """
+        run_data = RunData(execution=self.executions[1], channel=self.channels[0].id)
+        data = run_data.as_dict(with_ts=True)
+
+        self.assertEqual(data['timestep'], range(self.timesteps))
+        self.assertEqual(data['execution 1'], self.per_series(self.executions[1], self.channels[0]))
+        self.assertEqual(data['execution 1'], self.expected_series(self.executions[1], self.channels[0]))
+
+    def test_execution_queryset(self):
+        """
+        A queryset of executions gives one series per execution
+        """
+        run_data = RunData(execution=DimExecution.objects.filter(run_key=self.run), channel=self.channels[1].id)
+        data = run_data.as_dict()
+
+        self.assertEqual(sorted(data.keys()), ['execution 0', 'execution 1'])
+        for execution in self.executions:
+            self.assertEqual(data[execution.name], self.per_series(execution, self.channels[1]))
+
+    def test_channel_queryset(self):
+        """
+        A queryset of channels gives one series per channel, named after the execution and the channel
+        """
+        run_data = RunData(execution=self.executions[0],
+                           channel=DimChannel.objects.filter(pk__in=[chan.id for chan in self.channels]))
+        data = run_data.as_dict()
+
+        self.assertEqual(sorted(data.keys()),
+                         ['execution 0-Adult Vectors-funestus', 'execution 0-Daily EIR-funestus'])
+        for chan in self.channels:
+            self.assertEqual(data['execution 0-%s-%s' % (chan.title, chan.type)],
+                             self.per_series(self.executions[0], chan))
+
+    def test_execution_and_channel_querysets(self):
+        """
+        Querysets of executions and channels, which were not supported by the per-series queries, give one series
+        per (execution, channel) pair
+        """
+        run_data = RunData(execution=DimExecution.objects.filter(run_key=self.run),
+                           channel=DimChannel.objects.filter(pk__in=[chan.id for chan in self.channels]))
+        data = run_data.as_dict()
+
+        self.assertEqual(len(data), 4)
+        for execution in self.executions:
+            for chan in self.channels:
+                self.assertEqual(data['%s-%s-%s' % (execution.name, chan.title, chan.type)],
+                                 self.per_series(execution, chan))
+
+    def test_group_by(self):
+        """
+        Grouping by year sums the means of the timesteps of each year
+        """
+        run_data = RunData(execution=DimExecution.objects.filter(run_key=self.run),
+                           channel=DimChannel.objects.filter(pk__in=[chan.id for chan in self.channels]),
+                           group_by=True)
+        data = run_data.as_dict(with_ts=True)
+
+        self.assertEqual(data['timestep'], [0, 1])
+        for execution in self.executions:
+            for chan in self.channels:
+                name = '%s-%s-%s' % (execution.name, chan.title, chan.type)
+                self.assertEqual(data[name], self.per_series(execution, chan, group_by=True))
+                self.assertEqual(data[name], self.expected_series(execution, chan, group_by=True))
+
+    def test_fetch_series(self):
+        """
+        All the series of the raw fact data are fetched by a single grouped query, after the lookup of the summary
+        """
+        run_data = RunData(execution=self.executions[0], channel=self.channels[0].id)
+
+        with self.assertNumQueries(2):
+            series = run_data.fetch_series(self.executions, self.channels)
+
+        self.assertEqual(len(series), 4)
+        for execution in self.executions:
+            for chan in self.channels:
+                self.assertEqual(series[(execution.id, chan.id)],
+                                 (range(self.timesteps), self.expected_series(execution, chan)))
+        self.assertEqual(run_data.fetch_series([], self.channels), {})
+
+    def test_as_object(self):
+        """
+        as_object returns the aggregated rows as FactPoints
+        """
+        run_data = RunData(execution=DimExecution.objects.filter(run_key=self.run), channel=self.channels[0].id)
+        points = run_data.as_object()
+
+        self.assertEqual(len(points), 2 * self.timesteps)
+        self.assertTrue(all(isinstance(point, FactPoint) for point in points))
+        self.assertEqual(
+            points[:2],
+            [FactPoint(self.executions[0].id, self.channels[0].id, 0, 0.5),
+             FactPoint(self.executions[0].id, self.channels[0].id, 1, 1.5)]
+        )
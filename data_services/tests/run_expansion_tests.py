@@ -0,0 +1,76 @@
+"""
+This module contains the tests for the bulk creation of executions and replications when a run is expanded
+"""
+
+from django.test import TestCase
+
+from change_doc import JCD
+from change_doc.jcd import Change
+from data_services.adapters import EMOD_Adapter
+from data_services.models import DimExecution, DimReplication, DimRun
+
+
+class RunExpansionTests(TestCase):
+    """
+    This contains the methods for testing DimRun.expand_executions and Model_Adapter.expand_run
+    """
+
+    def setUp(self):
+        self.run = DimRun.objects.create(model_version='1.5', timestep_interval_days=1, status='0', name='sweeps')
+        self.run.jcd = JCD.from_changes([
+            Change.atomic(xpath='config.json/parameters/Simulation_Duration', value=365),
+            Change.sweep('sweep1', xpath='config.json/parameters/Base_Infectivity', l_vals=[1, 2, 3]),
+            Change.sweep('sweep2', xpath='config.json/parameters/Run_Number', l_vals=[4, 5]),
+        ])
+
+    def test_expand_executions(self):
+        """
+        The executions and replications are created with one insert each, and returned with their ids
+        """
+        # 1 exists check, then for each of executions and replications: 1 insert and 1 select of the ids
+        (rl_jcd, executions) = self.assertNumQueries(
+            5, self.run.expand_executions, reps_per_exec=4, with_replications=True
+        )
+
+        self.assertEqual(len(executions), 6)
+        self.assertEqual(
+            [execution.id for execution in executions],
+            list(self.run.dimexecution_set.order_by('id').values_list('id', flat=True))
+        )
+        self.assertEqual(DimExecution.objects.get(pk=executions[0].id).name,
+                         'Base_Infectivity is 1.0 and Run_Number is 4.0')
+        self.assertEqual(DimExecution.objects.get(pk=executions[-1].id).name,
+                         'Base_Infectivity is 3.0 and Run_Number is 5.0')
+
+        for execution in executions:
+            self.assertEqual(
+                sorted(execution.dimreplication_set.values_list('series_id', flat=True)),
+                [0, 1, 2, 3]
+            )
+
+        self.assertRaises(ValueError, self.run.expand_executions, reps_per_exec=4)
+
+    def test_expand_replications(self):
+        (rl_jcd, executions) = self.run.expand_executions(reps_per_exec=2)
+        self.assertEqual(DimReplication.objects.filter(execution_key__run_key=self.run).count(), 0)
+
+        replications = executions[0].expand_replications(2)
+        self.assertEqual(
+            [replication.id for replication in replications],
+            list(executions[0].dimreplication_set.order_by('id').values_list('id', flat=True))
+        )
+
+    def test_expand_run(self):
+        (num_executions, executions) = EMOD_Adapter.expand_run(self.run, 3, with_replications=True)
+
+        self.assertEqual(num_executions, 6)
+        self.assertEqual(self.run.dimexecution_set.count(), 6)
+        self.assertEqual(DimReplication.objects.filter(execution_key__run_key=self.run).count(), 18)
+
+    def test_single_execution(self):
+        self.run.jcd = JCD.from_changes([Change.atomic(xpath='config.json/parameters/Run_Number', value=1)])
+
+        (rl_jcd, executions) = self.run.expand_executions(reps_per_exec=1)
+
+        self.assertEqual(len(executions), 1)
+        self.assertEqual(executions[0].name, 'sweeps')
@@ -1,10 +1,12 @@
 from datetime import timedelta
+import StringIO
+import zipfile
 
 from django.test import TestCase
 from django.utils import timezone
-from vecnet.simulation import sim_status
+from vecnet.simulation import sim_model, sim_status
 
-from ..models import DimUser, Simulation, SimulationGroup
+from ..models import DimUser, Simulation, SimulationGroup, SimulationInputFile, SimulationOutputFile
 
 
 class SimTimeFieldTests(TestCase):
@@ -61,3 +63,40 @@ class SimTimeFieldTests(TestCase):
         simulation.duration = duration.total_seconds()
         self.assertEqual(simulation.duration_as_timedelta, duration)
         self.assertEqual(simulation.ended_when, start_time + duration)
+
+
+class SimGroupZipFileTests(TestCase):
+    """
+    Tests for the zip file with the scenarios and outputs of an OpenMalaria simulation group.
+    """
+
+    def setUp(self):
+        self.user = DimUser.objects.create(username='test-user')
+        self.sim_group = SimulationGroup.objects.create(submitted_by=self.user)
+
+    def add_simulation(self, scenario, output=None, ctsout=None):
+        simulation = Simulation.objects.create(group=self.sim_group, model=sim_model.OPEN_MALARIA)
+        input_file = SimulationInputFile.objects.create_file(scenario, name="scenario.xml", created_by=self.user,
+                                                             metadata={})
+        simulation.input_files.add(input_file)
+        for name, contents in (("output.txt", output), ("ctsout.txt", ctsout)):
+            if contents is not None:
+                SimulationOutputFile.objects.create_file(contents, name=name, simulation=simulation, metadata={})
+        return input_file
+
+    def test_zip_file(self):
+        first = self.add_simulation("<scenario1/>", output="1\t1\t0\t1000\n", ctsout="##\t##\n")
+        second = self.add_simulation("<scenario2/>", output="2\t1\t0\t1000\n")
+
+        zip_file = zipfile.ZipFile(StringIO.StringIO("".join(self.sim_group.om_zip_file_stream(batch_size=1))))
+
+        names = ["scenario%s.xml" % first.id, "scenario%s_output.txt" % first.id, "scenario%s_ctsout.txt" % first.id,
+                 "scenario%s.xml" % second.id, "scenario%s_output.txt" % second.id]
+        self.assertEqual(zip_file.namelist(), names)
+        self.assertEqual(zip_file.read(names[0]), "<scenario1/>")
+        self.assertEqual(zip_file.read(names[4]), "2\t1\t0\t1000\n")
+
+    def test_missing_scenario(self):
+        Simulation.objects.create(group=self.sim_group, model=sim_model.OPEN_MALARIA)
+
+        self.assertRaises(RuntimeError, self.sim_group.om_zip_file_stream)
@@ -1,5 +1,10 @@
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from collections import Counter
+from SocketServer import ThreadingMixIn
 import os
 import shutil
+import tempfile
+import threading
 
 
 class OutputDirMixin(object):
@@ -34,6 +39,120 @@ class OutputDirMixin(object):
                 shutil.rmtree(item_path)
 
 
+class LocalWebDavServer(ThreadingMixIn, HTTPServer):
+    """
+    A minimal WebDAV server (HEAD, GET, PUT and MKCOL) running in a background thread on the local host, so the https
+    scheme handler can be tested without the real WebDAV server.  Files are kept in a temporary directory.  The server
+    counts the requests it receives by method and the connections it accepts.
+    """
+    daemon_threads = True
+
+    def __init__(self):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), LocalWebDavRequestHandler)
+        self.root = tempfile.mkdtemp()
+        self.requests = Counter()
+        self.connections = 0
+        #  Number of upcoming requests to fail with "503 Service Unavailable"
+        self.failures = 0
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.serve_forever)
+        self.thread.daemon = True
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%s/' % self.server_address[1]
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        shutil.rmtree(self.root)
+
+
+class LocalWebDavRequestHandler(BaseHTTPRequestHandler):
+    """
+    Request handler for LocalWebDavServer.  HTTP/1.1 is used so that clients can keep their connections alive.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def local_path(self):
+        return os.path.join(self.server.root, *[part for part in self.path.split('/') if part])
+
+    def respond(self, status, body=''):
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body and self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def read_body(self):
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            chunks = list()
+            while True:
+                size = int(self.rfile.readline().split(';')[0], 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            return ''.join(chunks)
+        return self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+    def handle_one_request(self):
+        self.raw_requestline = self.rfile.readline(65537)
+        if not self.raw_requestline:
+            self.close_connection = 1
+            return
+        if not self.parse_request():
+            return
+        with self.server.lock:
+            self.server.requests[self.command] += 1
+            failing = self.server.failures > 0
+            if failing:
+                self.server.failures -= 1
+        body = self.read_body() if self.command == 'PUT' else ''
+        if failing:
+            self.respond(503)
+            return
+        path = self.local_path()
+        if self.command in ('HEAD', 'GET'):
+            if os.path.isdir(path):
+                self.respond(200)
+            elif os.path.isfile(path):
+                with open(path, 'rb') as f:
+                    self.respond(200, f.read())
+            else:
+                self.respond(404)
+        elif self.command == 'MKCOL':
+            if os.path.exists(path):
+                self.respond(405)
+            elif not os.path.isdir(os.path.dirname(path)):
+                self.respond(409)
+            else:
+                os.mkdir(path)
+                self.respond(201)
+        elif self.command == 'PUT':
+            if not os.path.isdir(os.path.dirname(path)):
+                self.respond(409)
+            else:
+                with open(path, 'wb') as f:
+                    f.write(body)
+                self.respond(201)
+        else:
+            self.respond(405)
+        self.wfile.flush()
+
+
 class DataDirMixin(object):
     """
     A mixin for test suites that need to access test files in the "data" directory.
@@ -1,3 +1,9 @@
+import hashlib
+import os
+import shutil
+import StringIO
+import unittest
+
 from mock import patch
 import requests.auth
 
@@ -5,8 +11,10 @@ import VECNet.secrets_default
 
 from .conf_tests import ConfigurationTests
 from .handler_tests import SchemeHandlerTests
+from ..test_util import LocalWebDavServer
 from ....sim_file_server.uri_schemes.https_scheme import (ConfigurationErrors, HttpsSchemeConfiguration,
-                                                          HttpsSchemeHandler)
+                                                          HttpsSchemeHandler, WebDavClient)
+from ....sim_file_server.util import custom_urlparse
 
 
 TEST_DIR_URL = 'https://vecnet-qa.crc.nd.edu/webdav/unit-tests/'
@@ -56,6 +64,86 @@ class HttpsSchemeHandlerAuthTests(SchemeHandlerTests):
         HttpsSchemeConfiguration().reset_settings()
 
 
+class HttpsSchemeLocalServerTests(unittest.TestCase):
+    """
+    Tests of the WebDAV client used by the "https:" scheme handler, against a WebDAV server on the local host.
+    """
+
+    def setUp(self):
+        self.server = LocalWebDavServer()
+        self.server.start()
+        HttpsSchemeConfiguration.set_root_directory(self.server.url)
+        self.server.requests.clear()
+        self.handler = HttpsSchemeHandler()
+
+    def tearDown(self):
+        HttpsSchemeConfiguration.reset_settings()
+        self.server.stop()
+
+    def test_store_and_read_file(self):
+        contents = 'Lorem ipsum dolor sit amet'
+        uri, md5_hash = self.handler.store_file(contents)
+        self.assertTrue(uri.startswith(self.server.url))
+        self.assertEqual(md5_hash, hashlib.md5(contents).hexdigest())
+        with self.handler.open_in_read_mode(custom_urlparse(uri)) as f:
+            self.assertEqual(f.read(), contents)
+
+    def test_directories_created_once(self):
+        """
+        Test that the directories of a file are only checked on the server the first time they're used.
+        """
+        self.handler.store_file('first file')
+        self.assertEqual(self.server.requests['MKCOL'], 2)
+        self.server.requests.clear()
+        for i in range(5):
+            self.handler.store_file('file %d' % i)
+        self.assertEqual(self.server.requests['HEAD'], 0)
+        self.assertEqual(self.server.requests['MKCOL'], 0)
+        self.assertEqual(self.server.requests['PUT'], 5)
+
+    def test_connections_reused(self):
+        for i in range(10):
+            self.handler.store_file('file %d' % i)
+        self.assertLessEqual(self.server.connections, 2)
+
+    def test_store_and_read_files_in_parallel(self):
+        contents_list = ['file %d' % i for i in range(20)]
+        results = self.handler.store_files(contents_list)
+        self.assertEqual([md5_hash for uri, md5_hash in results],
+                         [hashlib.md5(contents).hexdigest() for contents in contents_list])
+        parsed_urls = [custom_urlparse(uri) for uri, md5_hash in results]
+        self.assertEqual(self.handler.read_files(parsed_urls), contents_list)
+        self.assertLessEqual(self.server.connections, WebDavClient.POOL_SIZE + 1)
+
+    @patch.object(WebDavClient, 'BACKOFF_FACTOR', 0)
+    def test_retry(self):
+        """
+        Test that uploads are retried when the server is temporarily unavailable, including uploads from files.
+        """
+        self.handler.store_file('create the directories')
+        self.server.failures = 2
+        contents = 'retried contents'
+        uri, md5_hash = self.handler.store_file(StringIO.StringIO(contents))
+        self.assertEqual(md5_hash, hashlib.md5(contents).hexdigest())
+        self.assertEqual(self.handler.read_files([custom_urlparse(uri)]), [contents])
+
+    @patch.object(WebDavClient, 'BACKOFF_FACTOR', 0)
+    def test_too_many_failures(self):
+        self.server.failures = 100
+        self.assertRaises(AssertionError, self.handler.store_file, 'contents')
+        self.server.failures = 0
+
+    def test_directories_removed(self):
+        """
+        Test that a file is stored even if its directories were removed after the client created them.
+        """
+        self.handler.store_file('first file')
+        for name in os.listdir(self.server.root):
+            shutil.rmtree(os.path.join(self.server.root, name))
+        uri, md5_hash = self.handler.store_file('second file')
+        self.assertEqual(self.handler.read_files([custom_urlparse(uri)]), ['second file'])
+
+
 class HttpsSchemeConfTests(ConfigurationTests):
     """
     Tests of the handling of the https-scheme configuration settings.
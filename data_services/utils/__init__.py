@@ -1 +1 @@
-from pg_utils import encode_binary, commit_to_warehouse
+from pg_utils import encode_binary, encode_binary_batch, commit_to_warehouse, stream_to_warehouse, FACT_COLUMNS
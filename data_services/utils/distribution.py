@@ -0,0 +1,66 @@
+"""
+Statistics of the distribution of a set of values, e.g. the values of a channel in the replications of an execution,
+as shown by a boxplot: quartiles, Tukey whiskers, outliers and the confidence interval of the mean.
+"""
+
+import math
+
+import numpy
+
+#: Two-sided 95% critical values of Student's t distribution, by degrees of freedom (1 to 30).  The normal
+#: approximation (1.96) is used for more degrees of freedom.
+T_95 = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228, 2.201, 2.179, 2.160, 2.145, 2.131,
+        2.120, 2.110, 2.101, 2.093, 2.086, 2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+
+
+def box_statistics(values, whisker=1.5):
+    """
+    Compute the statistics of a boxplot.
+
+    :param values: List of values (None values are ignored)
+    :param whisker: The whiskers extend to the furthest values within whisker times the interquartile range from the
+                    quartiles, the values beyond them are outliers.
+    :returns: Dictionary with the keys count, mean, stddev, min, q1, median, q3, max, low (low whisker), high (high
+              whisker), outliers (list of values), ci_low and ci_high (95% confidence interval of the mean).  All the
+              statistics but count and outliers are None if there are no values, stddev and the confidence interval
+              are None if there is only one value.
+    """
+    values = numpy.array([value for value in values if value is not None], dtype=float)
+    values.sort()
+    count = len(values)
+    if count == 0:
+        stats = dict.fromkeys(['mean', 'stddev', 'min', 'q1', 'median', 'q3', 'max', 'low', 'high', 'ci_low',
+                               'ci_high'])
+        stats.update(count=0, outliers=[])
+        return stats
+
+    q1, median, q3 = numpy.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    inliers = values[(values >= q1 - whisker * iqr) & (values <= q3 + whisker * iqr)]
+    mean = values.mean()
+    stddev = ci_low = ci_high = None
+    if count > 1:
+        stddev = values.std(ddof=1)
+        t = T_95[count - 2] if count - 2 < len(T_95) else 1.96
+        margin = t * stddev / math.sqrt(count)
+        ci_low, ci_high = mean - margin, mean + margin
+
+    return {
+        'count': count,
+        'mean': float(mean),
+        'stddev': _float(stddev),
+        'min': float(values[0]),
+        'q1': float(q1),
+        'median': float(median),
+        'q3': float(q3),
+        'max': float(values[-1]),
+        'low': float(inliers[0]),
+        'high': float(inliers[-1]),
+        'outliers': values[(values < inliers[0]) | (values > inliers[-1])].tolist(),
+        'ci_low': _float(ci_low),
+        'ci_high': _float(ci_high),
+    }
+
+
+def _float(value):
+    return None if value is None else float(value)
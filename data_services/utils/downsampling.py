@@ -0,0 +1,125 @@
+"""
+Shape-preserving downsampling of time series for charts.  A chart a few hundred pixels wide can't show more than a
+couple of points per pixel, so a long series (a 50 year run has more than 18000 daily timesteps) is reduced to a
+target number of points before it is sent to the browser:
+
+- lttb (Largest-Triangle-Three-Buckets) keeps, in each bucket of consecutive points, the point forming the largest
+  triangle with the points kept in the neighbouring buckets.  It follows the visual shape of the series closely.
+- min_max keeps the minimum and the maximum of each bucket, so no peak is lost.
+
+The series can also be restricted to a window of x values, so a zoomed chart can fetch the detail of the visible
+range only.
+"""
+
+import numpy
+
+
+def lttb(x, y, threshold):
+    """
+    Downsample a series with the Largest-Triangle-Three-Buckets algorithm.  The first and last points are always kept.
+
+    :param x: Array of x values, in increasing order
+    :param y: Array of y values (NaN for missing values)
+    :param int threshold: Number of points to keep
+    :returns: Array of the indices of the points kept
+    """
+    n = len(x)
+    if threshold >= n:
+        return numpy.arange(n)
+    if threshold < 3:
+        return numpy.array([0, n - 1])
+
+    #  The points between the first and the last one are split into threshold - 2 buckets
+    edges = numpy.linspace(1, n - 1, threshold - 1).astype(int)
+    indices = numpy.empty(threshold, dtype=int)
+    indices[0] = 0
+    indices[-1] = n - 1
+    a = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_start, next_end = end, edges[bucket + 2]
+        else:
+            next_start, next_end = n - 1, n
+        #  The third point of the triangles is the average of the next bucket
+        avg_x = x[next_start:next_end].mean()
+        avg_y = _nan_mean(y[next_start:next_end])
+        areas = numpy.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        areas[numpy.isnan(areas)] = -1
+        a = start + int(areas.argmax())
+        indices[bucket + 1] = a
+    return indices
+
+
+def min_max(x, y, threshold):
+    """
+    Downsample a series by keeping the minimum and maximum y values of threshold / 2 buckets of consecutive points.
+
+    :param x: Array of x values, in increasing order
+    :param y: Array of y values (NaN for missing values)
+    :param int threshold: Number of points to keep
+    :returns: Array of the indices of the points kept
+    """
+    n = len(x)
+    buckets = threshold // 2
+    if threshold >= n:
+        return numpy.arange(n)
+    if buckets < 1:
+        return numpy.array([0, n - 1])
+
+    edges = numpy.linspace(0, n, buckets + 1).astype(int)
+    lows = numpy.where(numpy.isnan(y), numpy.inf, y)
+    highs = numpy.where(numpy.isnan(y), -numpy.inf, y)
+    indices = set()
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end > start:
+            indices.add(start + int(lows[start:end].argmin()))
+            indices.add(start + int(highs[start:end].argmax()))
+    return numpy.array(sorted(indices), dtype=int)
+
+
+#: Downsampling methods, by name
+METHODS = {
+    'lttb': lttb,
+    'min_max': min_max,
+}
+
+
+def downsample_series(values, point_start, point_interval, max_points=None, x_min=None, x_max=None, method='lttb'):
+    """
+    Downsample a series of evenly spaced values, e.g. the data of a Highstock series defined by pointStart and
+    pointInterval.
+
+    :param values: List of values (None for missing values)
+    :param point_start: x value of the first point
+    :param point_interval: Interval between the x values of two points
+    :param max_points: (Optional) Number of points to keep (at least 2).  All the points in the window are kept if
+                       it's None.
+    :param x_min: (Optional) Smallest x value of the window
+    :param x_max: (Optional) Largest x value of the window
+    :param method: Name of the downsampling method (see METHODS)
+    :returns: List of [x, y] pairs.  The points just outside the window are included, so the line reaches the edges
+              of the chart.
+    :raises ValueError: if there is no such method
+    """
+    if method not in METHODS:
+        raise ValueError('Unknown downsampling method %s, expected one of %s' % (method, ', '.join(sorted(METHODS))))
+    y = numpy.array(values, dtype=float)
+    x = point_start + numpy.arange(len(y)) * float(point_interval)
+
+    first, last = 0, len(y)
+    if x_min is not None:
+        first = max(int(numpy.searchsorted(x, x_min, side='right')) - 1, 0)
+    if x_max is not None:
+        last = min(int(numpy.searchsorted(x, x_max, side='left')) + 1, len(y))
+    x, y = x[first:last], y[first:last]
+
+    if max_points is not None:
+        indices = METHODS[method](x, y, max(int(max_points), 2))
+        x, y = x[indices], y[indices]
+    return [[point_x, None if numpy.isnan(point_y) else point_y] for point_x, point_y in zip(x.tolist(), y.tolist())]
+
+
+def _nan_mean(values):
+    values = values[~numpy.isnan(values)]
+    return values.mean() if len(values) else 0.0
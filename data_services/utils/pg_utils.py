@@ -2,8 +2,21 @@
 This is a library of useful commands created to help manage the VECNET CI datawarehouse.  Even though most of these
 methods could be made more generic, they purposely haven't to control the data flow into and out of the DW.
 """
-from struct import pack
+import os
+import sys
+from struct import pack, Struct, error as StructError
 import psycopg2
+import psycopg2.pool
+
+#: Binary layout of a single FactBaseTable row in a PGCOPY stream.  Each field is preceded by its length in bytes.
+FACT_ROW = Struct('!hiiiiidiiiiii')
+
+#: Binary layout of a FactBaseTable row without its id column, to be copied into FACT_COLUMNS
+FACT_ROW_NO_ID = Struct('!hiiidiiiiii')
+
+#: Columns of a FactBaseTable row without its id column.  Copying into these columns lets the database assign ids
+#: from base_fact_data_id_seq, which is safe when several ingesters are loading data at the same time.
+FACT_COLUMNS = ('timestep', 'value', 'channel_key', 'run_key', 'replication_key')
 
 def encode_binary(pg_id, timestep, value, channel_key, run_key, replication_key):
     """ This method will encode a specific row of data into binary for fast ingestion.
@@ -33,6 +46,171 @@ def encode_binary(pg_id, timestep, value, channel_key, run_key, replication_key)
     ret_val = pack('!hiiiiidiiiiii', 6, 4, pg_id, 4, timestep, 8, value, 4, channel_key, 4, run_key, 4, replication_key)
     return ret_val
 
+def encode_binary_batch(pg_id, data, channel_key, run_key, replication_key):
+    """ This method will encode a whole channel of data into binary for fast ingestion.
+
+    The rows produced are byte for byte identical to calling encode_binary once per element of data, where the
+    timestep of each row is its index in data and the ids are allocated consecutively starting at pg_id.  The rows
+    are packed into a single preallocated buffer, so only one python call is made per row instead of one call and
+    six type checks.
+
+    If pg_id is None the id column is left out of the rows (see FACT_ROW_NO_ID), and they must be copied into
+    FACT_COLUMNS so the database assigns the ids.
+
+    :param pg_id: Id for the first row in the database, or None to let the database assign ids
+    :type pg_id: Integer
+    :param data: list of values where the index of any given value is its timestep
+    :type data: list
+    :returns: bytearray containing the encoded rows, should be used with BytesIO to piece together with others
+    :raises: TypeError
+    """
+    if pg_id is not None and not isinstance(pg_id, int):
+        raise TypeError("id must be an integer, you passed in %(id)s which was a %(type)s" % {'id': pg_id, 'type': type(pg_id)})
+    if not isinstance(channel_key, int):
+        raise TypeError("channel_key must be an integer, you passed in %(id)s which was a %(type)s" % {'id': channel_key, 'type': type(channel_key)})
+    if not isinstance(run_key, int):
+        raise TypeError("run_key must be an integer, you passed in %(id)s which was a %(type)s" % {'id': run_key, 'type': type(run_key)})
+    if not isinstance(replication_key, int):
+        raise TypeError("replication_key must be an integer, you passed in %(id)s which was a %(type)s" % {'id': replication_key, 'type': type(replication_key)})
+
+    row = FACT_ROW if pg_id is not None else FACT_ROW_NO_ID
+    row_size = row.size
+    pack_into = row.pack_into
+    buf = bytearray(row_size * len(data))
+    offset = 0
+    for timestep, value in enumerate(data):
+        try:
+            if pg_id is None:
+                pack_into(buf, offset, 5, 4, timestep, 8, value, 4, channel_key, 4, run_key, 4, replication_key)
+            else:
+                pack_into(buf, offset, 6, 4, pg_id + timestep, 4, timestep, 8, value, 4, channel_key, 4, run_key, 4, replication_key)
+        except StructError:
+            raise TypeError("value must be a float, you passed in %(id)s which was a %(type)s" % {'id': value, 'type': type(value)})
+        offset += row_size
+    return buf
+
+#: Connection pools to the datawarehouse, keyed by the connection parameters in the settings dictionary
+_connection_pools = dict()
+
+#: Maximum number of connections each pool will hold open
+POOL_MAX_CONNECTIONS = 4
+
+def get_connection_pool(settings):
+    """
+    This will return a pool of psycopg2 connections to the database described in the settings dictionary.  The pool
+    is created the first time it is requested and is then shared by every commit made in this process, so ingesting
+    a replication does not need to open a new connection to the database.
+
+    :param settings: A dictionary that should contain keywords HOST, PORT, USER, PASSWORD and NAME
+    :type settings: dict
+    :returns: psycopg2.pool.ThreadedConnectionPool
+    """
+    # Connections can not be shared with forked children, so each process gets its own pool
+    key = (os.getpid(), settings['HOST'], settings['PORT'], settings['USER'], settings['NAME'])
+    if key not in _connection_pools:
+        _connection_pools[key] = psycopg2.pool.ThreadedConnectionPool(
+            1,
+            POOL_MAX_CONNECTIONS,
+            host=settings['HOST'],
+            port=settings['PORT'],
+            user=settings['USER'],
+            password=settings['PASSWORD'],
+            database=settings['NAME']
+        )
+    return _connection_pools[key]
+
+class CopyStream(object):
+    """
+    This is a read only file-like object over an iterable of binary chunks, meant to be handed to copy_expert.
+
+    Chunks are only pulled from the iterable when copy_expert asks for more data, so if the chunks are produced
+    lazily (channel by channel for instance) no more than one chunk is held in memory at any time.
+
+    copy_expert replaces an exception raised by read() with a psycopg2 error, so the exception raised while
+    producing a chunk is kept in exc_info (see stream_to_warehouse).
+    """
+
+    def __init__(self, chunks):
+        """
+        :param chunks: Iterable of str or bytearray objects, the concatenation of which is the file content
+        """
+        self._chunks = iter(chunks)
+        self._chunk = b''
+        self._offset = 0
+        self.exc_info = None
+
+    def read(self, size=-1):
+        """
+        Read at most size bytes from the stream, or everything that is left if size is negative.  An empty string
+        is returned once all chunks have been consumed.
+        """
+        pieces = list()
+        wanted = size
+        while size < 0 or wanted > 0:
+            if self._offset >= len(self._chunk):
+                try:
+                    self._chunk = bytes(next(self._chunks))
+                except StopIteration:
+                    break
+                except Exception:
+                    self.exc_info = sys.exc_info()
+                    raise
+                self._offset = 0
+                continue
+            end = len(self._chunk) if size < 0 else min(len(self._chunk), self._offset + wanted)
+            pieces.append(self._chunk[self._offset:end])
+            wanted -= end - self._offset
+            self._offset = end
+        return b''.join(pieces)
+
+def stream_to_warehouse(chunks, settings, table, pg_index=None, columns=None):
+    """
+    This will transmit a binary COPY payload to the database described in the settings dictionary, pulling the
+    payload from chunks as the database consumes it.  Unlike commit_to_warehouse the payload is never assembled in
+    memory, so peak memory stays flat regardless of the size of the replication.
+
+    A pooled connection is used (see get_connection_pool).  If producing a chunk raises an exception the COPY is
+    aborted, nothing is committed, and the exception is propagated.
+
+    :param chunks: Iterable of binary chunks (including headers) for the postgresql database
+    :param settings: A dictionary that should contain keywords HOST, PORT, USER, PASSWORD and NAME
+    :type settings: dict
+    :param table: A string containing the table that the data should be appended to
+    :type table: str
+    :param pg_index: Index to set the value of the id sequence to, or a callable returning that index that is
+                     called once all chunks have been sent.  If None the sequence is left alone.
+    :param columns: Columns the rows contain (ex FACT_COLUMNS), if None the rows must contain every column of table.
+                    Columns left out receive their default value, which for the id column is the next value of the
+                    sequence, so several processes can stream into the same table at once when the id is left out.
+    :type columns: tuple
+    """
+    if columns is not None:
+        table = '%s (%s)' % (table, ', '.join(columns))
+    pool = get_connection_pool(settings)
+    conn = pool.getconn()
+    stream = CopyStream(chunks)
+    try:
+        data_cursor = conn.cursor()
+        try:
+            data_cursor.copy_expert('COPY %s FROM STDIN WITH BINARY' % table, stream)
+        except psycopg2.Error:
+            if stream.exc_info is not None:
+                # Raise the exception of the chunk producer rather than psycopg2's "error in .read() call"
+                raise stream.exc_info[0], stream.exc_info[1], stream.exc_info[2]
+            raise
+        if callable(pg_index):
+            pg_index = pg_index()
+        if pg_index is not None:
+            data_cursor.execute("select setval('base_fact_data_id_seq', %s);", (pg_index,))
+        data_cursor.close()
+        conn.commit()
+    except:
+        conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn)
+    return
+
 def commit_to_warehouse(pg_io, settings, table, pg_index):
     """
     This module will transmit a binary file that has been prepared to the database described in the setting dictionary
@@ -55,19 +233,19 @@ def commit_to_warehouse(pg_io, settings, table, pg_index):
     :param pg_index: Index to set the value of the id sequence to
     """
     pg_io.seek(0)
-    conn = psycopg2.connect(
-        host=settings['HOST'],
-        port=settings['PORT'],
-        user=settings['USER'],
-        password=settings['PASSWORD'],
-        database=settings['NAME']
-    )
-    data_cursor = conn.cursor()
-    data_cursor.copy_expert('COPY %s FROM STDIN WITH BINARY' % table, pg_io)
-    data_cursor.execute("select setval('base_fact_data_id_seq', %s);" % pg_index)
-    data_cursor.close()
-    conn.commit()
-    conn.close()
+    pool = get_connection_pool(settings)
+    conn = pool.getconn()
+    try:
+        data_cursor = conn.cursor()
+        data_cursor.copy_expert('COPY %s FROM STDIN WITH BINARY' % table, pg_io)
+        data_cursor.execute("select setval('base_fact_data_id_seq', %s);" % pg_index)
+        data_cursor.close()
+        conn.commit()
+    except:
+        conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn)
     return
 
 def frange(start, stop, step):
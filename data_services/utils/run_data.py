@@ -1,12 +1,115 @@
 __author__ = 'lselvy'
 
-from data_services.models import BaseFactData, DimExecution, DimRun, DimReplication, DimChannel
+from data_services.models import BaseFactData, DimExecution, DimRun, DimReplication, DimChannel, FactDataSummary
+from data_services.utils.distribution import box_statistics
+from data_services.utils.downsampling import downsample_series
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import connection, transaction
 from django.db.models.query import QuerySet
+from collections import namedtuple
 import json
 import time
 import itertools
 
+#: One row of aggregated fact data, the mean value of a channel at a given timestep across the replications of an
+#: execution (or the yearly sum of those means if the data is grouped by year)
+FactPoint = namedtuple('FactPoint', ['execution_key', 'channel_key', 'timestep', 'value'])
+
+def timesteps_per_year(run):
+    """
+    This function will determine how many timesteps there are in a year given the timestep interval in days stored
+    in the run.
+
+    :param run: Run the timesteps belong to
+    :type run: DimRun
+    """
+    DAYS_IN_YEAR = 365
+    time_interval = run.timestep_interval_days
+    mod = DAYS_IN_YEAR % time_interval
+
+    if mod == 0:
+        return DAYS_IN_YEAR/time_interval
+    elif mod/float(time_interval) >= 0.5:
+        return (DAYS_IN_YEAR/time_interval) + 1
+    elif mod/float(time_interval) < 0.5:
+        return DAYS_IN_YEAR/time_interval
+    else:
+        raise Exception("Should not have gotten to this point in the code")
+
+
+@transaction.commit_on_success
+def summarize_execution(execution):
+    """
+    This function fills the fact_data_summary table for an execution: the mean, minimum, maximum and standard
+    deviation across replications of every channel at every timestep, and the same statistics for the yearly sums
+    of each replication.  It should be called once all the replications of the execution have been ingested.
+    Existing summary rows of the execution are replaced, so calling it again is harmless.  Concurrent calls for the
+    same execution (e.g. by the ingesters of its last two replications) are serialized by a transaction-level
+    advisory lock on the execution id, so the second call replaces the rows committed by the first.
+
+    :param execution: Execution to summarize
+    :type execution: DimExecution
+    """
+    run = execution.run_key
+    query_dict = {
+        'run_id': run.id,
+        'execution_key': execution.id,
+        'ts_year': timesteps_per_year(run)
+    }
+
+    cursor = connection.cursor()
+    cursor.execute("select pg_advisory_xact_lock(%(execution_key)s)", query_dict)
+    cursor.execute("delete from fact_data_summary where execution_key=%(execution_key)s", query_dict)
+    cursor.execute("""
+        insert into fact_data_summary (execution_key, channel_key, timestep, is_yearly, mean, min, max, stddev)
+        select execution_key, channel_key, timestep, false, avg(value), min(value), max(value), stddev_samp(value)
+            from fact_data_run_%(run_id)s
+            inner join dim_replication on replication_key=dim_replication.id
+        where execution_key=%(execution_key)s
+        group by execution_key, channel_key, timestep
+        """, query_dict)
+    if run.timestep_interval_days <= 365:
+        cursor.execute("""
+            insert into fact_data_summary (execution_key, channel_key, timestep, is_yearly, mean, min, max, stddev)
+            select execution_key, channel_key, year, true, avg(value), min(value), max(value), stddev_samp(value)
+            from (select execution_key, channel_key, timestep/%(ts_year)s as year, sum(value) as value
+                    from fact_data_run_%(run_id)s
+                    inner join dim_replication on replication_key=dim_replication.id
+                where execution_key=%(execution_key)s
+                group by execution_key, channel_key, replication_key, timestep/%(ts_year)s) foo
+            group by execution_key, channel_key, year
+            """, query_dict)
+    cursor.close()
+    transaction.set_dirty()
+
+
+def is_execution_finished(execution):
+    """
+    Have all the replications of an execution been ingested, successfully or not, with at least one success?
+
+    :param execution: Execution to check
+    :type execution: DimExecution
+    """
+    if not execution.replications:
+        return False
+    replications = execution.dimreplication_set
+    return replications.filter(status=0).exists() and \
+        replications.filter(status__in=(0, -1)).count() >= execution.replications
+
+
+def summarize_finished_executions(run):
+    """
+    Summarize the finished executions of a run that have not been summarized yet (see summarize_execution).  This
+    catches the executions whose last replication failed, which the ingesters don't summarize.
+
+    :param run: Run whose executions are summarized
+    :type run: DimRun
+    """
+    for execution in DimExecution.objects.filter(run_key=run).exclude(replications=None):
+        if not FactDataSummary.objects.filter(execution_key=execution).exists() and is_execution_finished(execution):
+            summarize_execution(execution)
+
+
 class RunData(object):
     """
     This is the RunData Class.  As accessing the run results in the VecNet CI data warehouse becomes more and more
@@ -220,111 +323,209 @@ class RunData(object):
         This method will fetch and aggregate data from the BaseFactData table in the VecNet CI.  This takes the
         executions and channels that are saved in the class, and will create a dictionary that houses the data.
 
+        All the (execution, channel) series requested are averaged across replications by a single grouped query
+        (see fetch_series), whether executions, channels, or both are querysets.
+
         :returns: A dictionary where the keys are execution names and the values are lists of data.  Another key named
                   'timestep' will also be included that contains timestep information.  This timestep key can be used
                   to fill in the highchart/highstock javascript dates.
         """
+        executions = list(self.execution) if self.is_queryset else [self.execution]
+        channels = list(self.channel) if self.is_channel_queryset else [self.channel]
 
-        #----------- Determine which query to run
-        if self.is_grouped:
-            query = """
-            select sum(value) as value, row_number() over (order by timestep/%(ts_year)s) as id, (row_number() over (order by timestep/%(ts_year)s)) - 1 as timestep
-            from (select distinct(timestep), row_number() over (order by timestep nulls last) as id, avg(value) as value
+        series = self.fetch_series(executions, channels)
+
+        timesteps = set()
+        for execution in executions:
+            for chan in channels:
+                data = series.get((execution.id, chan.id), ([], []))
+                timesteps.update(data[0])
+                self.data_results[self.series_name(execution, chan)] = data[1]
+        self.data_results['timestep'] = sorted(timesteps)
+        return
+
+    def series_name(self, execution, chan):
+        """
+        Name of the series of a channel in an execution: the name of the execution (or its id if it has no name),
+        followed by the title and type of the channel if several channels were requested.
+        """
+        if execution.name == '':
+            name = str(execution.id)
+        else:
+            name = execution.name
+        if self.is_channel_queryset:
+            return '%(exec_name)s-%(title)s-%(type)s' % {
+                'exec_name': execution.name if not self.is_queryset else name,
+                'title': chan.title,
+                'type': chan.type
+            }
+        return name
+
+    def as_statistics(self, whisker=1.5):
+        """
+        This method computes the distribution of the values of the channels across the replications of every
+        execution, as shown by a boxplot.  The value of a replication is the mean of the channel over its timesteps,
+        or its mean yearly sum if the data is grouped by year.  The replication values are aggregated by the
+        database, only one value per replication is read.
+
+        :param whisker: The whiskers extend to the furthest values within whisker times the interquartile range
+        :type whisker: float
+        :returns: A list with one dictionary per (execution, channel) series, in the order of the executions and
+                  channels, with the keys name, execution, channel and statistics (see box_statistics)
+        """
+        executions = list(self.execution) if self.is_queryset else [self.execution]
+        channels = list(self.channel) if self.is_channel_queryset else [self.channel]
+        if not executions or not channels:
+            return list()
+
+        query = """
+            select execution_key, channel_key, replication_key, avg(value) as value
                 from fact_data_run_%(run_id)s
-                inner join dim_channel on channel_key=dim_channel.id
                 inner join dim_replication on replication_key=dim_replication.id
-            where execution_key=%(execution_key)s and dim_channel.id=%(channel_key)s
-            group by timestep order by timestep) foo
-            group by timestep/%(ts_year)s order by timestep/%(ts_year)s;
+            where execution_key in %(execution_keys)s and channel_key in %(channel_keys)s
+            group by execution_key, channel_key, replication_key
             """
-            ts_year = self.calculate_year()
-        else:
+        query_dict = {
+            'run_id': self.run.id,
+            'execution_keys': tuple(execution.id for execution in executions),
+            'channel_keys': tuple(chan.id for chan in channels)
+        }
+        if self.is_grouped:
             query = """
-            select distinct(timestep), row_number() over (order by timestep nulls last) as id, avg(value) as value
+            select execution_key, channel_key, replication_key, avg(value) as value
+            from (select execution_key, channel_key, replication_key, sum(value) as value
+                    from fact_data_run_%(run_id)s
+                    inner join dim_replication on replication_key=dim_replication.id
+                where execution_key in %(execution_keys)s and channel_key in %(channel_keys)s
+                group by execution_key, channel_key, replication_key, timestep/%(ts_year)s) foo
+            group by execution_key, channel_key, replication_key
+            """
+            query_dict['ts_year'] = self.calculate_year()
+
+        cursor = connection.cursor()
+        cursor.execute(query, query_dict)
+        replication_values = dict()
+        for execution_key, channel_key, replication_key, value in cursor.fetchall():
+            replication_values.setdefault((execution_key, channel_key), []).append(value)
+        cursor.close()
+
+        statistics = list()
+        for execution in executions:
+            for chan in channels:
+                statistics.append({
+                    'name': self.series_name(execution, chan),
+                    'execution': execution.id,
+                    'channel': chan.id,
+                    'statistics': box_statistics(replication_values.get((execution.id, chan.id), []), whisker)
+                })
+        return statistics
+
+    def fetch_series(self, executions, channels):
+        """
+        This method fetches the mean across replications of every (execution, channel) pair requested, and pivots the
+        rows into one series per pair.
+
+        Series are read from the precomputed fact_data_summary table (see summarize_execution) when they are
+        available.  Executions that have not been summarized yet are aggregated from the fact table of the run with
+        one grouped query, and if the data is grouped by year the yearly sums are computed in that same query.
+
+        :param executions: Executions to fetch
+        :type executions: list
+        :param channels: Channels to fetch
+        :type channels: list
+        :returns: A dictionary mapping (execution id, channel id) to a tuple of two lists, timesteps and values
+        """
+        self.qs = list()
+        if not executions or not channels:
+            return dict()
+
+        query = """
+            select execution_key, channel_key, timestep, mean as value
+                from fact_data_summary
+            where execution_key in %(execution_keys)s and channel_key in %(channel_keys)s and is_yearly=%(is_yearly)s
+            order by execution_key, channel_key, timestep
+            """
+        series = self._fetch(query, {
+            'execution_keys': tuple(execution.id for execution in executions),
+            'channel_keys': tuple(chan.id for chan in channels),
+            'is_yearly': self.is_grouped
+        })
+
+        executions = [execution for execution in executions
+                      if any((execution.id, chan.id) not in series for chan in channels)]
+        if not executions:
+            return series
+
+        query = """
+            select execution_key, channel_key, timestep, avg(value) as value
                 from fact_data_run_%(run_id)s
-                inner join dim_channel on channel_key=dim_channel.id
                 inner join dim_replication on replication_key=dim_replication.id
-            where execution_key=%(execution_key)s and dim_channel.id=%(channel_key)s
-            group by timestep order by timestep
+            where execution_key in %(execution_keys)s and channel_key in %(channel_keys)s
+            group by execution_key, channel_key, timestep
             """
-            ts_year = None
-        if self.is_queryset and not self.is_channel_queryset:
-            for execution in self.execution:
-                query_dict = {
-                    'run_id': self.run.id,
-                    'execution_key': execution.id,
-                    'channel_key': self.channel.id,
-                    'ts_year': ts_year
-                }
-                self.qs = list(BaseFactData.objects.raw(query, query_dict))
-                if execution.name == '':
-                    name = str(execution.id)
-                else:
-                    name = execution.name
-                self.data_results[name] = [point.value for point in self.qs]
-            self.data_results['timestep'] = [point.timestep for point in self.qs]
-            return
-        elif not self.is_queryset and not self.is_channel_queryset:
-            query_dict = {
-                'run_id': self.run.id,
-                'execution_key': self.execution.id,
-                'channel_key': self.channel.id,
-                'ts_year': ts_year
-            }
-            self.qs = list(BaseFactData.objects.raw(query, query_dict))
-            if self.execution.name == '':
-                name = str(self.execution.id)
-            else:
-                name = self.execution.name
-            self.data_results[name] = [point.value for point in self.qs]
-            self.data_results['timestep'] = [point.timestep for point in self.qs]
-            return
-        elif not self.is_queryset and self.is_channel_queryset:
-            for chan in self.channel:
-                query_dict = {
-                    'run_id': self.run.id,
-                    'execution_key': self.execution.id,
-                    'channel_key': chan.id,
-                    'ts_year': ts_year
-                }
-                self.qs = list(BaseFactData.objects.raw(query, query_dict))
-                key = '%(exec_name)s-%(title)s-%(type)s' % {
-                    'run_id': self.run.id,
-                    'exec_name': self.execution.name,
-                    'title': chan.title,
-                    'type': chan.type
-                }
-                self.data_results[key] = [point.value for point in self.qs]
-            self.data_results['timestep'] = [point.timestep for point in self.qs]
-            return
-        elif self.is_queryset and self.is_channel_queryset:
-            raise NotImplemented('A queryset of both channels and executions is not yet implemented')
+        query_dict = {
+            'run_id': self.run.id,
+            'execution_keys': tuple(execution.id for execution in executions),
+            'channel_keys': tuple(chan.id for chan in channels)
+        }
+        if self.is_grouped:
+            query = """
+            select execution_key, channel_key, timestep/%%(ts_year)s as timestep, sum(value) as value
+            from (%s) foo
+            group by execution_key, channel_key, timestep/%%(ts_year)s
+            """ % query
+            query_dict['ts_year'] = self.calculate_year()
+        query += " order by execution_key, channel_key, timestep"
+
+        series.update(self._fetch(query, query_dict))
+        return series
+
+    def _fetch(self, query, query_dict):
+        """
+        Run a query returning (execution_key, channel_key, timestep, value) rows ordered by timestep, append the rows
+        to self.qs and pivot them into series.
+
+        :returns: A dictionary mapping (execution id, channel id) to a tuple of two lists, timesteps and values
+        """
+        cursor = connection.cursor()
+        cursor.execute(query, query_dict)
+
+        series = dict()
+        for row in cursor.fetchall():
+            point = FactPoint(*row)
+            self.qs.append(point)
+            timesteps, values = series.setdefault((point.execution_key, point.channel_key), ([], []))
+            timesteps.append(point.timestep)
+            values.append(point.value)
+        cursor.close()
+
+        return series
 
     def calculate_year(self):
         """
         This method will determine how many timesteps there are in a year given the timestep interval in days stored
         in the run.
         """
-        DAYS_IN_YEAR = 365
-        time_interval = self.run.timestep_interval_days
-        mod = DAYS_IN_YEAR % time_interval
-
-        if mod == 0:
-            return DAYS_IN_YEAR/time_interval
-        elif mod/float(time_interval) >= 0.5:
-            return (DAYS_IN_YEAR/time_interval) + 1
-        elif mod/float(time_interval) < 0.5:
-            return DAYS_IN_YEAR/time_interval
-        else:
-            raise Exception("Should not have gotten to this point in the code")
+        return timesteps_per_year(self.run)
 
-    def as_chart(self, as_highstock=False):
+    def as_chart(self, as_highstock=False, max_points=None, x_min=None, x_max=None, downsampling='lttb'):
         """
         This method is one method responsible for formatting the run data into a highstock or highchart format.  This
         will also convert the timesteps into milliseconds from the epoch (for highstock charts).
 
+        Highstock series can be downsampled and restricted to a window of dates (see downsample_series), their data
+        is then a list of [milliseconds, value] pairs instead of values spaced by pointInterval.
+
         :param as_highstock: Flag that decides whether the json returned is a highstock or highchart object
         :type as_highstock: bool
+        :param max_points: (Optional) Number of points to keep in each highstock series
+        :type max_points: int
+        :param x_min: (Optional) First date of the window, in milliseconds from the epoch
+        :type x_min: float
+        :param x_max: (Optional) Last date of the window, in milliseconds from the epoch
+        :type x_max: float
+        :param downsampling: Downsampling method, 'lttb' or 'min_max'
+        :type downsampling: str
         :returns: A json object containing a highstock or highchart object
         """
         if not self.data_results:
@@ -393,12 +594,16 @@ class RunData(object):
             else:
                 pinterval = 24 * 3600 * 1000 * interval
 
+            pstart = time.mktime(start_time.timetuple()) * 1000
+            is_downsampled = max_points is not None or x_min is not None or x_max is not None
             for key, data in self.data_results.iteritems():
                 if key is 'timestep': continue
+                if is_downsampled:
+                    data = downsample_series(data, pstart, pinterval, max_points, x_min, x_max, downsampling)
                 return_chart['series'].append({
                     "name": key,
                     "data": data,
-                    "pointStart": time.mktime(start_time.timetuple()) * 1000,
+                    "pointStart": pstart,
                     "pointInterval": pinterval
                 })
 
@@ -441,9 +646,10 @@ class RunData(object):
     
     def as_object(self):
         """
-        The as object method will return a queryset of BaseFactData.
+        The as object method will return the aggregated rows, each with execution_key, channel_key, timestep and
+        value attributes.
 
-        :returns: HStoreQueryset
+        :returns: list of FactPoint
         """
         if not self.data_results:
             self.aggregate_data()
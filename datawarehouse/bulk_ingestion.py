@@ -0,0 +1,350 @@
+"""
+Bulk ingestion of CSV files into the data warehouse.
+
+The file is copied into a temporary staging table with COPY.  The values of each row are then checked, and the
+locations and foreign keys are resolved with one statement per mapping entry, working on the distinct values of the
+file rather than on each row.  Finally the rows are inserted in batches, one INSERT ... SELECT per batch.  Rows that
+can't be ingested have their error recorded in the staging table and are skipped.  Loading new rows increments the
+FactsVersion, which invalidates the cached cube results.
+
+The mapping file has the same format as for the row by row ingestion (see IngestionView).  Empty values are ingested
+as NULL, except in text columns that are not nullable.
+"""
+
+import csv
+
+from django.db import connections, transaction, DatabaseError
+from django.db.models.loading import get_app, get_models
+
+from data_services.models import DimLocation, DimUser, GisBaseTable
+from datawarehouse.exceptions.etlExceptions import TableDoesNotExist
+from datawarehouse.models import FactsVersion
+
+#: Number of rows inserted by each INSERT statement
+BATCH_SIZE = 10000
+
+#: The location names that can be mapped, and their admin level in gis_base_table, in order of precedence
+LOCATION_LEVELS = (('admin2', 2), ('admin1', 1), ('admin0', 0), ('admin007', -1))
+
+# Returns the error message of casting a value to a type, or NULL if the value can be cast
+CAST_ERROR_FUNCTION = """
+CREATE OR REPLACE FUNCTION pg_temp.etl_cast_error(value text, type_name text) RETURNS text AS $$
+BEGIN
+    EXECUTE 'SELECT CAST(' || quote_literal(value) || ' AS ' || type_name || ')';
+    RETURN NULL;
+EXCEPTION WHEN others THEN
+    RETURN SQLERRM;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+def get_model_for_table(table):
+    """
+    Find the data warehouse model of a database table.
+
+    :raises TableDoesNotExist: if no model of the datawarehouse app uses the table
+    """
+    for model in get_models(get_app('datawarehouse')):
+        if model._meta.db_table == table:
+            return model
+    raise TableDoesNotExist("The database table " + table + " does not exist.")
+
+
+def is_text(db_type):
+    return db_type == 'text' or db_type.startswith('varchar')
+
+
+class Value(object):
+    """
+    A mapped value.  sql is a text expression of the staging table row (alias s) that is never NULL, empty strings
+    standing for NULL.
+    """
+
+    def __init__(self, sql, field, connection):
+        self.sql = sql
+        self.field = field
+        self.db_type = field.db_type(connection=connection)
+
+    def typed(self, sql):
+        """
+        The value as the type of its column, sql being the value's text.
+        """
+        if is_text(self.db_type):
+            return sql if not self.field.null else "NULLIF(%s, '')" % sql
+        return "CAST(NULLIF(%s, '') AS %s)" % (sql, self.db_type)
+
+    def match(self, column, sql):
+        """
+        Condition that the column of a table is equal to the value, sql being the value's text.  NULL matches NULL,
+        as with Django's get_or_create.
+        """
+        if self.field.null:
+            return "%s IS NOT DISTINCT FROM %s" % (column, self.typed(sql))
+        return "%s = %s" % (column, self.typed(sql))
+
+
+class BulkIngestion(object):
+    """
+    Ingests a CSV file into a data warehouse table.
+    """
+
+    def __init__(self, mapping, batch_size=BATCH_SIZE, using='default'):
+        """
+        :param dict mapping: The decoded mapping file
+        :param int batch_size: Number of rows inserted by each statement
+        :param str using: The database
+        """
+        self.model = get_model_for_table(mapping['table'])
+        self.mapping = mapping['mapping']
+        self.batch_size = batch_size
+        self.using = using
+        self.connection = connections[using]
+        self.cursor = None
+        self.columns = None  # Column of the staging table of each column of the file, by header
+        self.key_columns = 0
+
+    def ingest(self, csv_file):
+        """
+        Ingest a file.
+
+        :param csv_file: The CSV file, with a header line, opened in universal newline mode
+        :returns: Tuple of (number of rows inserted, dict of error messages by row number).  The rows are numbered
+                  from 1, the header being row 0.
+        """
+        user = DimUser.objects.get(pk=1)
+        with transaction.commit_on_success(using=self.using):
+            self.cursor = self.connection.cursor()
+            self.cursor.execute(CAST_ERROR_FUNCTION)
+            self.stage(csv_file)
+
+            self.check(self.model, self.mapping)
+            values = self.resolve(self.model, self.mapping)
+            user_field = self.model._meta.get_field('user_key')
+            values[user_field.column] = Value("'%d'" % user.pk, user_field, self.connection)
+            inserted = self.insert(values)
+            if inserted:
+                FactsVersion.increment()
+
+            self.cursor.execute("SELECT row_number, error FROM etl_staging WHERE error IS NOT NULL "
+                                "ORDER BY row_number")
+            errors = dict(self.cursor.fetchall())
+        return inserted, errors
+
+    def stage(self, csv_file):
+        """
+        Copy the file into the staging table.
+        """
+        header = csv.reader([csv_file.readline()]).next()
+        self.columns = dict((name, "c%s" % ndx) for ndx, name in enumerate(header))
+        columns = ["c%s" % ndx for ndx in range(len(header))]
+        # In case the transaction of a previous ingestion was not committed
+        self.cursor.execute("DROP TABLE IF EXISTS etl_staging")
+        self.cursor.execute("CREATE TEMPORARY TABLE etl_staging (row_number serial PRIMARY KEY, %s, error text) "
+                            "ON COMMIT DROP" % ", ".join("%s text" % column for column in columns))
+        self.cursor.copy_expert("COPY etl_staging (%s) FROM STDIN WITH CSV" % ", ".join(columns), csv_file)
+
+    def staging_column(self, name):
+        try:
+            return self.columns[name]
+        except KeyError:
+            raise ValueError("There is no column %s in the file" % name)
+
+    def set_error(self, message, condition, params=()):
+        self.cursor.execute("UPDATE etl_staging s SET error = %%s WHERE s.error IS NULL AND %s" % condition,
+                            [message] + list(params))
+
+    def check(self, model, mapping):
+        """
+        Record the errors of the rows with values that don't fit their column.
+        """
+        for key, value in mapping.iteritems():
+            if key == 'table' or (model is self.model and key == 'location_key'):
+                continue
+            field = model._meta.get_field(key)
+            if not isinstance(value, basestring):
+                self.check(get_model_for_table(value['table']), value)
+                continue
+
+            column = "s.%s" % self.staging_column(value)
+            db_type = field.db_type(connection=self.connection)
+            if is_text(db_type):
+                if getattr(field, 'max_length', None):
+                    self.set_error("%s: value too long (more than %s characters)" % (value, field.max_length),
+                                   "length(%s) > %%s" % column, [field.max_length])
+            else:
+                if not field.null:
+                    self.set_error("%s: value is missing" % value, "NULLIF(%s, '') IS NULL" % column)
+                self.cursor.execute(
+                    "UPDATE etl_staging s SET error = %%s || pg_temp.etl_cast_error(%(column)s, %%s) "
+                    "WHERE s.error IS NULL AND NULLIF(%(column)s, '') IS NOT NULL "
+                    "AND pg_temp.etl_cast_error(%(column)s, %%s) IS NOT NULL" % {'column': column},
+                    ["%s: " % value, db_type, db_type])
+
+    def resolve(self, model, mapping):
+        """
+        Resolve the locations and foreign keys of a mapping.
+
+        :returns: dict of the Values of the mapping, by database column
+        """
+        values = dict()
+        if model is self.model and 'location_key' in mapping:
+            # First, so the rows whose location is unknown are not used to resolve the foreign keys
+            field = model._meta.get_field('location_key')
+            values[field.column] = Value(self.resolve_location(mapping['location_key']), field, self.connection)
+
+        for key, value in mapping.iteritems():
+            if key == 'table' or (model is self.model and key == 'location_key'):
+                continue
+            field = model._meta.get_field(key)
+            if isinstance(value, basestring):
+                sql = "coalesce(s.%s, '')" % self.staging_column(value)
+            else:
+                related_model = get_model_for_table(value['table'])
+                sql = self.resolve_foreign_key(related_model, self.resolve(related_model, value))
+            values[field.column] = Value(sql, field, self.connection)
+        return values
+
+    def add_key_column(self):
+        """
+        Add an integer column to the staging table.
+
+        :returns: The text of the column for the Values
+        """
+        self.key_columns += 1
+        column = "key%s" % self.key_columns
+        self.cursor.execute("ALTER TABLE etl_staging ADD COLUMN %s integer" % column)
+        return column
+
+    def create_keys_table(self, sqls):
+        """
+        Create the table of the distinct values of some expressions of the staging table (columns k0, k1, ...), for
+        the rows without errors.
+        """
+        self.cursor.execute("CREATE TEMPORARY TABLE etl_keys ON COMMIT DROP AS SELECT DISTINCT %s "
+                            "FROM etl_staging s WHERE s.error IS NULL" %
+                            ", ".join("%s AS k%s" % (sql, ndx) for ndx, sql in enumerate(sqls)))
+
+    def set_key_column(self, column, sqls, key_id):
+        """
+        Copy a column of etl_keys into a column of the staging table.
+        """
+        self.cursor.execute("UPDATE etl_staging s SET %s = k.%s FROM etl_keys k WHERE s.error IS NULL AND %s" %
+                            (column, key_id, " AND ".join("%s = k.k%s" % (sql, ndx) for ndx, sql in enumerate(sqls))))
+        self.cursor.execute("DROP TABLE etl_keys")
+
+    def resolve_foreign_key(self, model, values):
+        """
+        Get or create the rows of a table referenced by the mapped table, for each distinct combination of values.
+
+        :returns: The text of the staging table column with the foreign keys
+        """
+        columns = sorted(values)
+        sqls = [values[column].sql for column in columns]
+        table = model._meta.db_table
+        pk = model._meta.pk.column
+
+        self.create_keys_table(sqls)
+        self.cursor.execute("ALTER TABLE etl_keys ADD COLUMN id integer")
+        lookup = "UPDATE etl_keys k SET id = (SELECT min(t.%s) FROM %s t WHERE %s) WHERE k.id IS NULL" % (
+            pk, table, " AND ".join(values[column].match("t." + column, "k.k%s" % ndx)
+                                    for ndx, column in enumerate(columns)))
+        self.cursor.execute(lookup)
+        self.cursor.execute("INSERT INTO %s (%s) SELECT DISTINCT %s FROM etl_keys k WHERE k.id IS NULL" % (
+            table, ", ".join(columns),
+            ", ".join(values[column].typed("k.k%s" % ndx) for ndx, column in enumerate(columns))))
+        self.cursor.execute(lookup)
+
+        key_column = self.add_key_column()
+        self.set_key_column(key_column, sqls, "id")
+        return "coalesce(s.%s::text, '')" % key_column
+
+    def resolve_location(self, mapping):
+        """
+        Get or create the locations of the rows, from the latitude and longitude or from the name of the location.
+
+        :returns: The text of the staging table column with the location keys
+        """
+        if 'lattitude' in mapping and 'longitude' in mapping:
+            sqls = ["s.%s" % self.staging_column(mapping[name]) for name in ('lattitude', 'longitude')]
+            self.create_keys_table(sqls)
+            self.cursor.execute("ALTER TABLE etl_keys ADD COLUMN location integer")
+            self.cursor.execute("SELECT k0, k1 FROM etl_keys WHERE k0 <> '' AND k1 <> ''")
+            for lattitude, longitude in self.cursor.fetchall():
+                location = DimLocation.vecnet_fill_location_from_point(lattitude, longitude)
+                self.cursor.execute("UPDATE etl_keys SET location = %s WHERE k0 = %s AND k1 = %s",
+                                    [location.id, lattitude, longitude])
+        else:
+            for name, admin_level in LOCATION_LEVELS:
+                if name in mapping:
+                    break
+            else:
+                raise ValueError("The location_key mapping has no location name nor coordinates")
+            sqls = ["coalesce(s.%s, '')" % self.staging_column(mapping[name])]
+            self.create_keys_table(sqls)
+            self.cursor.execute("ALTER TABLE etl_keys ADD COLUMN geom_key integer, ADD COLUMN location integer")
+            self.cursor.execute("UPDATE etl_keys k SET geom_key = (SELECT min(g.id) FROM %s g WHERE g.s_name = k.k0 "
+                                "AND g.admin_level = %%s)" % GisBaseTable._meta.db_table, [admin_level])
+            location_table = DimLocation._meta.db_table
+            lookup = ("UPDATE etl_keys k SET location = (SELECT min(d.id) FROM %(table)s d "
+                      "WHERE d.geom_key = k.geom_key AND d.%(name)s = k.k0) "
+                      "WHERE k.geom_key IS NOT NULL AND k.location IS NULL" % {'table': location_table, 'name': name})
+            self.cursor.execute(lookup)
+            self.cursor.execute("INSERT INTO %s (geom_key, %s) SELECT k.geom_key, k.k0 FROM etl_keys k "
+                                "WHERE k.geom_key IS NOT NULL AND k.location IS NULL" % (location_table, name))
+            self.cursor.execute(lookup)
+
+        location_column = self.add_key_column()
+        self.set_key_column(location_column, sqls, "location")
+        self.set_error("Location not found", "s.%s IS NULL" % location_column)
+        return "coalesce(s.%s::text, '')" % location_column
+
+    def insert(self, values, row_condition=None):
+        """
+        Insert the rows without errors that are not in the table yet, batch_size rows at a time.  If a batch fails,
+        its rows are inserted one by one, and the errors of the rows that fail are recorded.
+
+        :returns: Number of rows inserted
+        """
+        columns = sorted(values)
+        insert = "INSERT INTO %s (%s) SELECT DISTINCT %s FROM etl_staging s WHERE s.error IS NULL AND %%s " \
+                 "AND NOT EXISTS (SELECT 1 FROM %s t WHERE %s)" % (
+                     self.model._meta.db_table, ", ".join(columns),
+                     ", ".join(values[column].typed(values[column].sql) for column in columns),
+                     self.model._meta.db_table,
+                     " AND ".join(values[column].match("t." + column, values[column].sql) for column in columns))
+
+        self.cursor.execute("SELECT max(row_number) FROM etl_staging")
+        last_row = self.cursor.fetchone()[0] or 0
+        inserted = 0
+        for first_row in range(1, last_row + 1, self.batch_size):
+            rows = [first_row, first_row + self.batch_size - 1]
+            sid = transaction.savepoint(using=self.using)
+            try:
+                self.cursor.execute(insert % "s.row_number BETWEEN %s AND %s", rows)
+            except DatabaseError:
+                transaction.savepoint_rollback(sid, using=self.using)
+                inserted += self.insert_rows(insert, rows)
+            else:
+                transaction.savepoint_commit(sid, using=self.using)
+                inserted += self.cursor.rowcount
+        return inserted
+
+    def insert_rows(self, insert, rows):
+        """
+        Insert the rows of a batch one by one.
+        """
+        self.cursor.execute("SELECT row_number FROM etl_staging WHERE error IS NULL AND row_number BETWEEN %s AND %s "
+                            "ORDER BY row_number", rows)
+        inserted = 0
+        for (row_number, ) in self.cursor.fetchall():
+            sid = transaction.savepoint(using=self.using)
+            try:
+                self.cursor.execute(insert % "s.row_number = %s", [row_number])
+            except DatabaseError as e:
+                transaction.savepoint_rollback(sid, using=self.using)
+                self.cursor.execute("UPDATE etl_staging SET error = %s WHERE row_number = %s", [str(e), row_number])
+            else:
+                transaction.savepoint_commit(sid, using=self.using)
+                inserted += self.cursor.rowcount
+        return inserted
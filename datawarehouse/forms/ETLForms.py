@@ -107,6 +107,9 @@ class IngestionForm(forms.Form):
     inputURL = forms.URLField(help_text=URLHELP, required=False)
     mappingFile = forms.FileField(required=False)
     mappingURL = forms.URLField(help_text=URLHELP, required=False)
+    bulk = forms.BooleanField(required=False, label="Bulk ingestion",
+                              help_text="Ingest the whole file with a few set-based queries (for large files). "
+                                        "Empty values are ingested as NULL.")
     
     def clean(self):
         cleaned_data = self.cleaned_data
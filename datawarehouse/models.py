@@ -6,7 +6,8 @@
 #   Alexander Vyushkov <alexander.vyushkov@nd.edu>
 ########################################################################################################################
 from django.contrib.gis.db import models
-from django.db.models import Q
+from django.db.models import F, Q
+from django.db.models.signals import post_delete, post_save
 from data_services.models import DimLocation, DimUser
 
 fact_prefix = 'fact_'
@@ -525,4 +526,37 @@ class FutureDimLocation(models.Model):
 
     class Meta:
         db_table = 'dim_locations_view'
-        managed = False
\ No newline at end of file
+        managed = False
+
+class FactsVersion(models.Model):
+    """
+    Version of the facts of the data warehouse, incremented each time facts are saved or deleted with the ORM (see
+    facts_changed) and each time the bulk ingestion loads new facts.  The cube results cached by CubeResultsView are
+    keyed by it, so they are invalidated by new facts.  The table has a single row.
+    """
+    version = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'dw_facts_version'
+
+    @classmethod
+    def current(cls):
+        return cls.objects.get_or_create(pk=1)[0].version
+
+    @classmethod
+    def increment(cls):
+        if not cls.objects.filter(pk=1).update(version=F('version') + 1):
+            cls.objects.create(pk=1, version=1)
+
+
+def facts_changed(sender, **kwargs):
+    """
+    Signal handler incrementing the FactsVersion when a fact is saved or deleted, e.g. by each row of the row by row
+    ingestion, so the rows already ingested invalidate the cached cube results even if the ingestion fails later.
+    """
+    FactsVersion.increment()
+
+for fact_model in (FactDemographics, FactPacrainRainfall, FactWeather, FactWmrActOprtnlCvrg, FactWmrHhSurveys,
+                   FactWmrIrsOprtnlCvrg, FactWmrItnOprtnlCvrg, FactGrossNationalIncome, FactHouseholds):
+    post_save.connect(facts_changed, sender=fact_model)
+    post_delete.connect(facts_changed, sender=fact_model)
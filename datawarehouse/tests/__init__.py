@@ -9,3 +9,5 @@ __author__ = 'lselvy'
 from FunctionalTests import *
 
 from tests import *
+from bulk_ingestion_tests import *
+from cube_results_tests import *
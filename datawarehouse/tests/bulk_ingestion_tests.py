@@ -0,0 +1,62 @@
+"""
+Tests for the bulk ingestion of CSV files into the data warehouse
+"""
+
+import StringIO
+
+from django.contrib.gis.geos import MultiPolygon, Polygon
+from django.test import TestCase
+
+from data_services.models import DimLocation, DimUser, GisBaseTable
+from datawarehouse.bulk_ingestion import BulkIngestion
+from datawarehouse.exceptions.etlExceptions import TableDoesNotExist
+from datawarehouse.models import DimDate, DimSource, FactDemographics
+
+MAPPING = {
+    "table": "fact_demographics",
+    "user": 1,
+    "mapping": {
+        "location_key": {"admin0": "Country"},
+        "start_date_key": {"table": "dim_date", "timestamp": "Start"},
+        "end_date_key": {"table": "dim_date", "timestamp": "End"},
+        "source_key": {"table": "dim_source", "source": "Source", "file_uid": "File"},
+        "yrs_0_4": "0-4",
+        "yrs_5_9": "5-9",
+    }
+}
+
+CSV = """Country,Start,End,Source,File,0-4,5-9
+Kenya,2010-01-01,2010-12-31,Census,kenya.csv,1000,900
+Kenya,2011-01-01,2011-12-31,Census,kenya.csv,1100,
+Kenya,2011-01-01,2011-12-31,Census,kenya.csv,many,950
+Atlantis,2011-01-01,2011-12-31,Census,kenya.csv,10,20
+"""
+
+
+class BulkIngestionTests(TestCase):
+    def setUp(self):
+        DimUser.objects.create(id=1, username='ingestor')
+        square = Polygon(((30, -5), (40, -5), (40, 5), (30, 5), (30, -5)))
+        GisBaseTable.objects.create(geom=MultiPolygon(square, srid=4326), s_name="Kenya", admin_level=0)
+
+    def test_ingest(self):
+        inserted, errors = BulkIngestion(MAPPING, batch_size=2).ingest(StringIO.StringIO(CSV))
+
+        self.assertEqual(inserted, 2)
+        self.assertEqual(sorted(errors), [3, 4])
+        self.assertIn("0-4", errors[3])
+        self.assertEqual(errors[4], "Location not found")
+
+        self.assertEqual(FactDemographics.objects.count(), 2)
+        self.assertEqual(DimSource.objects.count(), 1)
+        self.assertEqual(DimDate.objects.count(), 4)
+        self.assertEqual(DimLocation.objects.filter(admin0="Kenya").count(), 1)
+        self.assertIsNone(FactDemographics.objects.get(yrs_0_4=1100).yrs_5_9)
+
+        # The rows already in the table are not inserted again
+        inserted, errors = BulkIngestion(MAPPING).ingest(StringIO.StringIO(CSV))
+        self.assertEqual(inserted, 0)
+        self.assertEqual(FactDemographics.objects.count(), 2)
+
+    def test_unknown_table(self):
+        self.assertRaises(TableDoesNotExist, BulkIngestion, dict(MAPPING, table="fact_unknown"))
@@ -0,0 +1,35 @@
+"""
+Tests for the caching of the cube results
+"""
+
+from django.test import TestCase
+
+from cubes import PointCut, RangeCut
+from datawarehouse.cubes_config import results_cache
+from datawarehouse.models import FactsVersion
+from datawarehouse.views.CubeResultsView import cutsKey, evaluateQuery
+
+
+class CubeResultsCacheTests(TestCase):
+    def setUp(self):
+        results_cache.clear()
+        self.queries = 0
+
+    def query(self):
+        self.queries += 1
+        return [{'year': 2010, 'count': 3}]
+
+    def test_cached_until_new_facts(self):
+        cuts = [PointCut('location', ['Kenya']), RangeCut('date', ['2010'], ['2012'])]
+        self.assertEqual(cutsKey(cuts), cutsKey([PointCut('location', ['Kenya']),
+                                                 RangeCut('date', ['2010'], ['2012'])]))
+
+        key = (FactsVersion.current(), 'demographics', 'raw', cutsKey(cuts))
+        self.assertEqual(evaluateQuery((key, self.query)), [{'year': 2010, 'count': 3}])
+        evaluateQuery((key, self.query))
+        self.assertEqual(self.queries, 1)
+
+        FactsVersion.increment()
+        key = (FactsVersion.current(), 'demographics', 'raw', cutsKey(cuts))
+        evaluateQuery((key, self.query))
+        self.assertEqual(self.queries, 2)
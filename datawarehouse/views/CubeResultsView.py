@@ -12,10 +12,11 @@ This module contains the CubeResultsView class.
 
 # import statements
 import operator
+from functools import partial
 from django.views.generic import TemplateView
 from datawarehouse.mixins import JSONMixin
-from datawarehouse.models import dimension_prefix, fact_prefix
-from datawarehouse.cubes_config import dwmodel, engine
+from datawarehouse.models import FactsVersion
+from datawarehouse.cubes_config import dwmodel, get_browser, results_cache, run_queries
 import cubes, string, itertools, pdb
 from collections import OrderedDict
 
@@ -73,6 +74,55 @@ def sortDictByMultipleKeys(mydict, arguments):
     mydict.sort(key=operator.itemgetter(*arguments)) # sorts the list in place
     return mydict
 
+def cutsKey(cutlist):
+    """This method returns a hashable description of a list of cuts, used in
+    the keys of the cached results.
+
+    :param cutlist: A list of cuts.
+    """
+    key = []
+    for cut in cutlist:
+        if hasattr(cut, 'path'):
+            key.append((str(cut.dimension), 'point', tuple(cut.path)))
+        elif hasattr(cut, 'paths'):
+            key.append((str(cut.dimension), 'set', tuple(tuple(path) for path in cut.paths)))
+        else:
+            key.append((str(cut.dimension), 'range', tuple(cut.from_path), tuple(cut.to_path)))
+    return tuple(key)
+
+
+def getFacts(cube_name, cell):
+    """This method returns the facts of a cell, as a list.
+
+    :param cube_name: The name of the cube.
+    :param cell: The cell.
+    """
+    return list(get_browser(cube_name).facts(cell))
+
+
+def getAggregate(cube_name, cell, drilldown, arguments):
+    """This method returns the aggregation of a cell, as a list sorted by
+    the given levels.
+
+    :param cube_name: The name of the cube.
+    :param cell: The cell.
+    :param drilldown: The drilldown of the aggregation.
+    :param arguments: A list of keys to sort on
+    """
+    rows = list(get_browser(cube_name).aggregate(cell, drilldown=drilldown))
+    return sortDictByMultipleKeys(rows, arguments)
+
+
+def evaluateQuery(query):
+    """This method returns the rows of a query, from the results cache if
+    the query was already run on the current facts.
+
+    :param query: A tuple of (cache key, function returning the rows).
+    """
+    key, function = query
+    return results_cache.get_or_put(key, function)
+
+
 class CubeResultsView(JSONMixin, TemplateView):
     """CubeResultsView is an extension of the generic TemplateView in Django.
     It is used to generate results of a datawarehouse request. The results
@@ -183,22 +233,17 @@ class CubeResultsView(JSONMixin, TemplateView):
         if self.error == {}:                                                # if there are no errors, perform the aggregations        
             # initialize variables
             results = {}                                                    # this dictionary gets serialized into the returned JSON object
-            agg_result = None                                               # this holds the aggregated cubes data
-            counter = 0                                                     # a counter variable
             cube = dwmodel.cube(dwmodel.cubes[cube_name])                   # Create the cube
             # cube.key = cube.mappings['id']                                  # enforce cube mappings
-            conn = engine.connect()                                         # Connect to the sqlalchemy engine
-            workspace = cubes.create_workspace("sql",dwmodel,engine=engine,
-                                               dimension_prefix=dimension_prefix,
-                                               fact_prefix=fact_prefix) # get a workspace
-            browser = workspace.browser(cube)                               # get a browser
             cell = cubes.Cell(cube)                                         # create the cell
+            version = FactsVersion.current()                                # the cached results are valid for this version of the facts
             
             results['slices'] = []                                          # create a holder for the slices
-            # for each requested aggregation, we must perform all cuts in the cut list and generate
-            # an object containing aggregated data for the cut
+            # The slice strings, cache keys and queries of each cut list are prepared first, then the queries are
+            # run concurrently (or their rows are taken from the cache), and finally the results are assembled
             if mode == 'raw':
                 result = {}
+                queries = []
                 for cutlist in hashProduct:
                     sliceString = ""                                        # create a string containing information about the cuts
                                                                             # this string will be added to measure names
@@ -216,8 +261,11 @@ class CubeResultsView(JSONMixin, TemplateView):
                             
                         results['slices'].append(sliceString)               # add the slicestring to the results object
                     new_cell = cell.multi_slice(cutlist)                    # Slice up the cube using all of the cuts
-                    raw_result = browser.facts(new_cell)                    # and get the data 
-            
+                    key = (version, cube_name, 'raw', cutsKey(cutlist))
+                    queries.append((sliceString, (key, partial(getFacts, cube_name, new_cell))))
+
+                rows_list = run_queries(evaluateQuery, [query for sliceString, query in queries])
+                for (sliceString, query), raw_result in zip(queries, rows_list):
                     counter = 0                                             # reinitialize the counter
                         
                     # Parse the cubes data into columns which are added to a dictionary
@@ -235,8 +283,9 @@ class CubeResultsView(JSONMixin, TemplateView):
                 self.return_list = results                                  # set the return_list, used by JSONMixin
                         
             else:
+                queries = []
                 for a, p in agg_dict.iteritems():
-                    result = {}                                                 # create an object
+                    results[a] = {}                                             # create an object
                     for cutlist in hashProduct:
                         level = None
                         sliceString = ""                                        # create a string containing information about the cuts
@@ -268,15 +317,15 @@ class CubeResultsView(JSONMixin, TemplateView):
     
                         new_cell = cell.multi_slice(cutlist)                        # Slice up the cube using all of the cuts
                         if p == "":
-                            agg_result = browser.aggregate(new_cell, drilldown=[a]) # and aggregate the data
+                            drilldown = [a]
                         else:
                             level = p
-                            agg_result = browser.aggregate(new_cell, drilldown=[(a,'default',p)])
+                            drilldown = [(a, 'default', p)]
                         # add information about the x-axis to the object
                         if str(a) == level:                                     
-                            result['level'] = level                          
+                            result_level = level                          
                         else:
-                            result['level'] = str(a + "." + level)              
+                            result_level = str(a + "." + level)              
 
                         # get the levels. results are sorted by level up to the requested level depth
                         arguments = []                              # create an empty list for the levels
@@ -284,28 +333,26 @@ class CubeResultsView(JSONMixin, TemplateView):
                             arguments.append(x.attributes[0].ref()) # append the level to the arguments list
                             if x.name == level:                     # if we've reached the requested level, then break
                                 break
-    
-                        counter = 0
-                        newlist = []                        # create an empty list
-                        for row in agg_result:              # create a list copy of the cubes result object
-                            newlist.append(row)
-                        newlist = sortDictByMultipleKeys(newlist, arguments)    # sort the result object by the levels
-                        # Parse the cubes data into columns which are added to a dictionary
-                        for row in newlist:
-                            if counter == 0:                                    # on the first pass, create the column lists
-                                for k, v in row.iteritems():
-                                    result[k+sliceString] = []
-                                counter = counter + 1                           # and increment the counter
-                            
-                            for k, v in row.iteritems():                        # add the values to the appropriate column list
-                                result[k+sliceString].append(v)       
-                    
-                    results[a] = result                                     # append this object to the dict of objects
+
+                        key = (version, cube_name, 'aggregate', a, p, level, cutsKey(cutlist))
+                        query = (key, partial(getAggregate, cube_name, new_cell, drilldown, arguments))
+                        queries.append((a, sliceString, result_level, query))
+
+                rows_list = run_queries(evaluateQuery, [query for a, sliceString, result_level, query in queries])
+                for (a, sliceString, result_level, query), newlist in zip(queries, rows_list):
+                    result = results[a]                                 # the object of this aggregation
+                    result['level'] = result_level
+                    counter = 0
+                    # Parse the cubes data into columns which are added to a dictionary
+                    for row in newlist:
+                        if counter == 0:                                    # on the first pass, create the column lists
+                            for k, v in row.iteritems():
+                                result[k+sliceString] = []
+                            counter = counter + 1                           # and increment the counter
+                        
+                        for k, v in row.iteritems():                        # add the values to the appropriate column list
+                            result[k+sliceString].append(v)       
                     
                 self.return_list = results                                  # set the return_list, used by JSONMixin
         else:
             self.return_list = self.error                               # if errors were present, return them
-            
-        conn.close()
-
-
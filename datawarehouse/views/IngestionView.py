@@ -17,12 +17,12 @@ import csv
 from django.views.generic import FormView
 
 from django.shortcuts import render
-from django.db import connections, IntegrityError
-from django.db.models.loading import get_app, get_models
+from django.db import connections, DatabaseError, IntegrityError
 from django.core.exceptions import ObjectDoesNotExist
 from django.core.files.storage import FileSystemStorage
 from django.core.files.base import ContentFile
 
+from datawarehouse.bulk_ingestion import BulkIngestion, get_model_for_table
 from datawarehouse.forms.ETLForms import IngestionForm
 
 from data_services.models import DimLocation, DimUser, GisBaseTable
@@ -81,11 +81,12 @@ class IngestionView(FormView):
         form_class = self.get_form_class()
         form = self.get_form(form_class)
         if form.is_valid():
-            return self.ingestData(self.request.FILES['inputFile'], self.request.FILES['mappingFile'])
+            return self.ingestData(self.request.FILES['inputFile'], self.request.FILES['mappingFile'],
+                                   bulk=form.cleaned_data.get('bulk', False))
         else:
             return self.form_invalid(form)
     
-    def ingestData(self, inputFile, mappingFile):
+    def ingestData(self, inputFile, mappingFile, bulk=False):
         """This method is used to ingest data into the database.
 
         This method is responsible for taking an input file
@@ -93,6 +94,8 @@ class IngestionView(FormView):
         into the database, using the mapping file to determine the
         relationship between input and database columns.
 
+        :param bulk: Ingest the file with set-based queries (see datawarehouse.bulk_ingestion)
+        instead of row by row.
         :return: An http response object via the form_valid method.
         """
         # load the mapping file to json, and read the inputfile using python csv
@@ -102,6 +105,8 @@ class IngestionView(FormView):
         # first save the file to disk, then open using universal csv mode
         fs = FileSystemStorage(location=MEDIA_ROOT)
         tmp = fs.save(str(MEDIA_ROOT + '/' + f.name), ContentFile(f.read()))
+        if bulk:
+            return self.bulkIngestData(tmp, data)
         reader = csv.reader(open(tmp, 'rU'), dialect=csv.excel_tab, delimiter=",")
         # initialize variables
         cols = {}
@@ -141,31 +146,43 @@ class IngestionView(FormView):
                                 else:
                                     sql_dict[key] = self.fkeymap(value, row, cols)
         
-                    app = get_app('datawarehouse')
-                    models = get_models(app)
-                    # find the specified model and insert/update it
-                    for mdl in models:
-                        if mdl._meta.db_table == table:
-                            model = mdl
-                            break
-                    # if a model for the given table couldn't be found, raise an exception
-                    if model == None:
-                        raise TableDoesNotExist("The database table " + table + " does not exist.")
-                    else:
-                        sql_dict['user_key'] = DimUser.objects.get(pk=1)
-                        try:
-                            model, created = model.objects.get_or_create(**sql_dict)
-                        except Exception as e:
-                            error_list['Row ' + str(counter)] = str(e)
+                    # find the specified model (raises TableDoesNotExist if it can't be found) and insert/update it
+                    if model is None:
+                        model = get_model_for_table(table)
+                    sql_dict['user_key'] = DimUser.objects.get(pk=1)
+                    try:
+                        model.objects.get_or_create(**sql_dict)
+                    except Exception as e:
+                        error_list['Row ' + str(counter)] = str(e)
                 counter += 1
                 
         except (IntegrityError, ObjectDoesNotExist, TableDoesNotExist) as e:
             return self.form_valid({'Message': 'row' + str(counter) + ', ' + str(e)})
         else:
+            # The facts saved have incremented the FactsVersion (see datawarehouse.models.facts_changed)
             if error_list == {}:
                 error_list['Message'] = "The file was successfully ingested."
             return self.form_valid(error_list)
 
+    def bulkIngestData(self, path, mapping):
+        """This method is used to ingest a file in bulk.
+
+        :param path: Path of the input file.
+        :param mapping: The decoded mapping file.
+        :return: An http response object via the form_valid method.
+        """
+        try:
+            with open(path, 'rU') as input_file:
+                inserted, errors = BulkIngestion(mapping).ingest(input_file)
+        except (DatabaseError, ObjectDoesNotExist, TableDoesNotExist, ValueError) as e:
+            return self.form_valid({'Message': str(e)})
+
+        error_list = dict(('Row ' + str(row_number), error) for row_number, error in errors.iteritems())
+        if error_list == {}:
+            error_list['Message'] = "The file was successfully ingested."
+        error_list['Rows inserted'] = str(inserted)
+        return self.form_valid(error_list)
+
     def locationMap(self, obj, row, cols):
         """This method is used to map the location key.
 
@@ -240,16 +257,8 @@ class IngestionView(FormView):
         :return: A model object.
         """
         
-        model = None
-        app = get_app('datawarehouse')
-        models = get_models(app)
         # attempt to match the specified table to a model and raise an exception if not found
-        for m in models:
-            if m._meta.db_table == obj['table']:
-                model = m
-                break
-        if model == None:
-            raise TableDoesNotExist("The database table " + obj['table'] + " does not exist.")
+        model = get_model_for_table(obj['table'])
         
         sql_dict = {}
         # loop through the mapping object and create the object using data from the input file
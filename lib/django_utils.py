@@ -14,3 +14,26 @@ def make_choices_tuple(choices, get_display_name):
     """
     assert callable(get_display_name)
     return tuple((x, get_display_name(x)) for x in choices)
+
+
+def bulk_save(objects, queryset):
+    """
+    Insert new model instances with a single bulk insert, and set their ids.
+
+    bulk_create doesn't return the ids of the rows it inserts, so they are read back with one more query: they are the
+    largest ids of the given queryset, which must contain the new rows.  PostgreSQL assigns the ids of the rows of a
+    multi-row insert in order, so the ids are matched with the instances in order.  Rows added to the queryset by
+    another connection in the meantime would break this, so the queryset should be specific to the new rows' parent.
+
+    :param objects: New (unsaved) instances of a model
+    :type objects: list
+    :param queryset: Queryset of the model that contains the new rows
+    :return: The objects
+    """
+    if not objects:
+        return objects
+    queryset.model._default_manager.bulk_create(objects)
+    ids = list(queryset.order_by('-pk').values_list('pk', flat=True)[:len(objects)])
+    for obj, pk in zip(objects, reversed(ids)):
+        obj.pk = pk
+    return objects
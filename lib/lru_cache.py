@@ -0,0 +1,84 @@
+"""
+A size-bounded, least recently used cache shared by the threads of a process.
+"""
+
+from collections import OrderedDict
+import threading
+import time
+
+
+class LRUCache(object):
+    """
+    Mapping that evicts its least recently used entries when the total size of its values exceeds max_size.
+
+    The size of a value is given by the sizeof function (by default every value has a size of 1, so max_size is the
+    number of entries).  A value larger than max_size is not cached.  If max_age is given, the entries expire max_age
+    seconds after they are put.
+    """
+
+    def __init__(self, max_size, sizeof=None, max_age=None):
+        self.max_size = max_size
+        self.sizeof = sizeof if sizeof is not None else (lambda value: 1)
+        self.max_age = max_age
+        self.size = 0
+        self._entries = OrderedDict()  # key -> (value, size, expiry time), from least to most recently used
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                entry = self._entries.pop(key)
+            except KeyError:
+                return default
+            if self._expired(entry):
+                self.size -= entry[1]
+                return default
+            self._entries[key] = entry
+            return entry[0]
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        expires = time.time() + self.max_age if self.max_age is not None else None
+        with self._lock:
+            if key in self._entries:
+                self.size -= self._entries.pop(key)[1]
+            if size > self.max_size:
+                return
+            self._entries[key] = (value, size, expires)
+            self.size += size
+            while self.size > self.max_size:
+                self.size -= self._entries.popitem(last=False)[1][1]
+
+    def get_or_put(self, key, compute):
+        """
+        Get the value of a key, computing and caching it if it isn't cached.  The cache is not locked while the value is
+        computed, so concurrent misses on the same key may compute it more than once.
+
+        :param key: The key
+        :param compute: Function returning the value of the key
+        """
+        value = self.get(key, _missing)
+        if value is _missing:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and not self._expired(entry)
+
+    @staticmethod
+    def _expired(entry):
+        return entry[2] is not None and entry[2] <= time.time()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_missing = object()
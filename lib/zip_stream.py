@@ -0,0 +1,69 @@
+"""
+Zip archives generated while they are sent.
+"""
+
+import zipfile
+
+
+class _ZipOutput(object):
+    """
+    Write-only file object collecting the bytes written by a ZipFile.  ZipFile only needs write(), tell() and
+    flush() when the files are added with writestr.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.offset = 0
+
+    def write(self, data):
+        self.chunks.append(data)
+        self.offset += len(data)
+
+    def tell(self):
+        return self.offset
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = "".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class ZipStream(object):
+    """
+    Generate a zip archive chunk by chunk.  Only the file being added is held in memory, so the archive can be sent
+    (for example with a StreamingHttpResponse) while the next files are read.
+
+    Usage:
+        def archive(files):
+            zip_stream = ZipStream()
+            for name, contents in files:
+                yield zip_stream.add(name, contents)
+            yield zip_stream.close()
+    """
+
+    def __init__(self, compression=zipfile.ZIP_STORED):
+        self._output = _ZipOutput()
+        self._zip_file = zipfile.ZipFile(self._output, 'w', compression, allowZip64=True)
+
+    def add(self, name, contents):
+        """
+        Add a file to the archive.
+
+        :param str name: Name of the file in the archive
+        :param str contents: Contents of the file
+        :returns: The bytes of the archive to send
+        """
+        self._zip_file.writestr(name, contents)
+        return self._output.pop()
+
+    def close(self):
+        """
+        Finish the archive.
+
+        :returns: The last bytes of the archive to send (its central directory)
+        """
+        self._zip_file.close()
+        return self._output.pop()
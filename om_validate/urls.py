@@ -1,11 +1,12 @@
 from django.conf.urls import patterns, include, url
-from views import validate
+from views import validate, validate_batch
 # Uncomment the next two lines to enable the admin:
 #from django.contrib import admin
 #admin.autodiscover()
 
 urlpatterns = patterns('',
     url(r'^validate/$', validate, name='validate'),
+    url(r'^validate/batch/$', validate_batch, name='validate_batch'),
 
     # Uncomment the admin/doc line below to enable admin documentation:
     #url(r'^admin/doc/', include('django.contrib.admindocs.urls')),
@@ -0,0 +1,146 @@
+"""
+Validation of OpenMalaria scenarios.
+
+A scenario is validated in two steps: against the XML schema of its schemaVersion, then by running OpenMalaria with
+--validate-only.  The compiled schemas are loaded once per process and reused.  OpenMalaria runs in the bin directory
+(the cwd of the subprocess, the process' own cwd is never changed), and at most OM_VALIDATE_WORKERS instances run at
+the same time in a process.
+"""
+
+from multiprocessing.pool import ThreadPool
+import glob
+import logging
+import os
+import re
+import subprocess
+import tempfile
+import threading
+
+from django.conf import settings
+from lxml import etree
+
+from ts_om.check import check_url, check_dir
+
+logger = logging.getLogger('prod_logger')
+
+#: Maximum number of OpenMalaria --validate-only processes running at the same time
+OM_VALIDATE_WORKERS = getattr(settings, "OM_VALIDATE_WORKERS", 4)
+
+_openmalaria_slots = threading.BoundedSemaphore(OM_VALIDATE_WORKERS)
+
+#: Compiled schemas and the lock serializing their use (validators keep their error log), keyed by xsd path
+_schemas = dict()
+_schemas_lock = threading.Lock()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+_schema_version = re.compile(r'^\d+\Z')
+_schema_file = re.compile(r'^scenario_(\d+)\.xsd$')
+
+
+def get_om_dir():
+    return check_url(getattr(settings, "OPENMALARIA_EXEC_DIR", None), "openmalaria")
+
+
+def get_schema(schema_version):
+    """
+    Get the compiled XML schema for a scenario schemaVersion, loading it the first time it's needed.  If the bin
+    directory has no scenario_<schemaVersion>.xsd (or the scenario has no schemaVersion), the latest schema available
+    is used.
+
+    :param schema_version: Value of the schemaVersion attribute of the scenario (None if missing)
+    :returns: Tuple of (etree.XMLSchema, threading.Lock)
+    :raises ValueError: if the schemaVersion isn't an integer, or there is no schema in the bin directory
+    """
+    if schema_version is not None and not _schema_version.match(schema_version):
+        raise ValueError("Invalid schemaVersion %r" % schema_version)
+    om_dir = get_om_dir()
+    path = os.path.join(om_dir, "scenario_%s.xsd" % schema_version)
+    if schema_version is None or not os.path.isfile(path):
+        versions = []
+        for available_path in glob.glob(os.path.join(om_dir, 'scenario_*.xsd')):
+            match = _schema_file.match(os.path.basename(available_path))
+            if match:
+                versions.append((int(match.group(1)), available_path))
+        if not versions:
+            raise ValueError("No scenario schema found in %s" % om_dir)
+        path = max(versions)[1]
+
+    with _schemas_lock:
+        if path not in _schemas:
+            logger.info("Loading schema %s" % path)
+            _schemas[path] = (etree.XMLSchema(etree.parse(path)), threading.Lock())
+        return _schemas[path]
+
+
+def validate(xml):
+    """
+    Validate a scenario.
+
+    :param str xml: The scenario
+    :returns: Tuple of (return code, output).  The return code is 0 if the scenario is valid.
+    """
+    try:
+        tree = etree.fromstring(xml)
+    except etree.ParseError as e:
+        return -1, "".join(entry.message + "\n" for entry in e.error_log)
+
+    try:
+        schema, schema_lock = get_schema(tree.get("schemaVersion"))
+    except ValueError as e:
+        return -1, "%s\n" % e
+    with schema_lock:
+        try:
+            schema.assertValid(tree)
+        except (etree.DocumentInvalid, etree.XMLSchemaValidateError) as e:
+            return -1, "".join(entry.message + "\n" for entry in e.error_log)
+
+    return run_openmalaria(xml)
+
+
+def run_openmalaria(xml):
+    """
+    Run OpenMalaria with --validate-only on a scenario, waiting for a free slot if OM_VALIDATE_WORKERS instances are
+    already running.
+
+    :param str xml: The scenario
+    :returns: Tuple of (return code, output)
+    """
+    om_dir = get_om_dir()
+    scenarios_dir = check_dir(getattr(settings, "TS_OM_SCENARIOS_DIR", None))
+    if not os.path.isdir(scenarios_dir):
+        logger.info("Created %s" % scenarios_dir)
+        os.makedirs(scenarios_dir)
+
+    fd, filename = tempfile.mkstemp(prefix='scenario_', suffix='.xml', dir=scenarios_dir)
+    try:
+        with os.fdopen(fd, 'w') as destination:
+            destination.write(xml)
+
+        executable = 'openMalaria.exe' if os.name == "nt" else 'openMalaria'
+        cmd = [os.path.join(om_dir, executable), '--scenario', filename, '--validate-only']
+        with _openmalaria_slots:
+            try:
+                return 0, subprocess.check_output(cmd, stderr=subprocess.STDOUT, cwd=om_dir)
+            except subprocess.CalledProcessError as e:
+                return e.returncode, e.output
+    finally:
+        os.unlink(filename)
+
+
+def validate_many(xmls):
+    """
+    Validate several scenarios in parallel, with at most OM_VALIDATE_WORKERS running at the same time.
+
+    :param xmls: The scenarios
+    :returns: List of (return code, output) tuples, in the same order as xmls
+    """
+    global _pool
+    xmls = list(xmls)
+    if len(xmls) < 2:
+        return [validate(xml) for xml in xmls]
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPool(OM_VALIDATE_WORKERS)
+    return _pool.map(validate, xmls)
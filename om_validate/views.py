@@ -1,91 +1,53 @@
-import string
-import random
-import sys
-import os
-import glob
-import subprocess
 import json
 import logging
 
 from django.shortcuts import HttpResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.conf import settings
-from lxml import etree
 
-from ts_om.check import check_url, check_dir
+from om_validate.validator import validate as validate_scenario, validate_many
 
 logger = logging.getLogger('prod_logger')
 
 
+def validation_result(return_code, out):
+    return {
+        'result': return_code,
+        'om_output': out.split("\n"),
+    }
+
+
 @csrf_exempt
 def validate(request):
     logger.info("om_validate service started")
     logger.info("user: %s" % request.user)
-    fileNew = request.read()
-    om_dir = check_url(getattr(settings, "OPENMALARIA_EXEC_DIR", None), "openmalaria")
-    scenarios_dir = check_dir(getattr(settings, "TS_OM_SCENARIOS_DIR", None))
-    return_code = 0
-    out = None
-    data = {}
-
-    os.chdir(om_dir)
 
-    schema = []
-    for f in glob.glob(om_dir + '*.xsd'):
-        schema.append(f)
+    return_code, out = validate_scenario(request.read())
 
-    xmlSchemaDoc = etree.parse(schema[0])
-    xmlSchema = etree.XMLSchema(xmlSchemaDoc)
-
-    try:
-        tree = etree.fromstring(fileNew)
-    except etree.ParseError as e:
-        return_code = -1
-        out = ""
-        for entry in e.error_log:
-            out += entry.message + "\n"
+    logger.info("Return code: %s" % return_code)
+    data = validation_result(return_code, out)
 
-    if not out:
-        try:
-            xmlSchema.assertValid(tree)
-        except etree.DocumentInvalid as e:
-            return_code = -1
-            out = ""
-            for entry in e.error_log:
-                out += entry.message + "\n"
-        except etree.XMLSchemaValidateError as e:
-            return_code = -1
-            out = ""
-            for entry in e.error_log:
-                out += entry.message + "\n"
+    return HttpResponse(json.dumps(data), mimetype="application/json")
 
-    filename = None
-    if not out:
-        logger.info("scenarios_dir: %s" % scenarios_dir)
-        if not os.path.isdir(scenarios_dir):
-            logger.info("Created %s" % scenarios_dir)
-            os.mkdir(scenarios_dir)
-        filename = os.path.join(scenarios_dir, 'scenario_' + ''.join(random.sample(string.lowercase+string.digits,10)) + ".xml")
-        logger.info("Filename: %s" % filename)
-        with open(filename, 'w') as destination:
-            destination.write(fileNew)
 
-        if os.name == "nt":
-            cmd = ['openMalaria.exe', '--scenario', filename, '--validate-only']
-        else:
-            cmd = ['./openMalaria', '--scenario', filename, '--validate-only']
-        try:
-            out = subprocess.check_output(cmd, stderr=subprocess.STDOUT)
-        except subprocess.CalledProcessError as e:
-            return_code = e.returncode
-            out = e.output
+@csrf_exempt
+def validate_batch(request):
+    """
+    Validate several scenarios in parallel.  The request body is a JSON list of scenarios (XML strings), and the
+    response is the list of their validation results, in the same order.
+    """
+    logger.info("om_validate batch service started")
+    logger.info("user: %s" % request.user)
+    try:
+        xmls = json.loads(request.read())
+    except ValueError:
+        xmls = None
+    if not isinstance(xmls, list) or not all(isinstance(xml, basestring) for xml in xmls):
+        return HttpResponse(json.dumps({'error': 'Expected a JSON list of scenarios'}), status=400,
+                            mimetype="application/json")
 
-    # Remove temp file
-    if filename:
-        os.unlink(filename)
+    results = validate_many([xml.encode('utf-8') if isinstance(xml, unicode) else xml for xml in xmls])
 
-    logger.info("Return code: %s" % return_code)
-    data['result'] = return_code
-    data['om_output'] = out.split("\n")
+    logger.info("Return codes: %s" % [return_code for return_code, out in results])
+    data = [validation_result(return_code, out) for return_code, out in results]
 
     return HttpResponse(json.dumps(data), mimetype="application/json")
@@ -16,6 +16,7 @@
 
     var seriesCount = 1; // used to increment the series number as they are added to the chart
     var currentXHR; // keeps track of the current series request to the server so it can be manually aborted
+    var zoomXHRs = []; // requests for the detail of the visible window, aborted if the user zooms again
     // this will be needed for eventually getting a csv download from the server
     // var seriesList = [];
 
@@ -37,6 +38,20 @@
         {
             'enabled': false
         }, // takes away the 1W, 1Month, 1Yr, YTD options as well as zooming to specific dates
+        navigator:
+        {
+            adaptToUpdatedData: false // the navigator keeps showing the whole series when the detail of a window is loaded
+        },
+        xAxis:
+        {
+            events:
+            {
+                afterSetExtremes: function(e)
+                {
+                    fetchVisibleWindow(this.chart, e.min, e.max);
+                }
+            }
+        },
         yAxis:
         {
             labels:
@@ -57,15 +72,82 @@
         }
     });
 
-    // TODO: add download option
-    /*Highcharts.getOptions().exporting.buttons.contextButton.menuItems.push(
+    // the csv is generated by the server from the options of each series, at full resolution
+    Highcharts.getOptions().exporting.buttons.contextButton.menuItems.push(
     {
         text:'Download CSV',
         onclick: function()
         {
-            alert('feature in development')
+            var theSeries = [];
+            $.each(this.series, function(i, series)
+            {
+                if (series.options.fetchOptions !== undefined) // skip the navigator series
+                {
+                    theSeries.push({name: series.name, request: series.options.fetchOptions.request});
+                }
+            });
+            if (theSeries.length == 0)
+            {
+                return;
+            }
+
+            var form = $('<form/>', {method: 'POST', action: viewtastic_link + 'export/'});
+            form.append($('<input/>', {type: 'hidden', name: 'csrfmiddlewaretoken', value: CSRF_TOKEN}));
+            form.append($('<input/>', {type: 'hidden', name: 'series', value: JSON.stringify(theSeries)}));
+            form.append($('<input/>', {type: 'hidden', name: 'chart_type', value: 'time_series'}));
+            form.append($('<input/>', {type: 'hidden', name: 'run_name', value: $('#run-select option:selected').text()}));
+            form.append($('<input/>', {type: 'hidden', name: 'chart_name', value: $('#channel-select option:selected').text()}));
+            form.appendTo('body').submit().remove();
         }
-    });*/
+    });
+
+    // the server downsamples every series to about two points per pixel of the chart.
+    function maxPoints(chart)
+    {
+        return Math.max(Math.round(chart.plotWidth * 2), 100);
+    }
+
+    // the server returns [date, value] pairs, shift the dates by the offset of the series (its start date if the
+    // series is aligned to the left)
+    function alignSeriesData(data, offset)
+    {
+        return $.map(data, function(point)
+        {
+            return [[point[0] - offset, point[1]]];
+        });
+    }
+
+    // once the chart is zoomed, the series are fetched again with the detail of the visible window only
+    function fetchVisibleWindow(chart, min, max)
+    {
+        $.each(zoomXHRs, function(i, xhr) { xhr.abort(); });
+        zoomXHRs = [];
+
+        $.each(chart.series, function(i, series)
+        {
+            var fetchOptions = series.options.fetchOptions;
+            if (fetchOptions === undefined)
+            {
+                return; // the navigator series
+            }
+            var ajaxObject = $.extend({}, fetchOptions.request);
+            ajaxObject.max_points = maxPoints(chart);
+            ajaxObject.x_min = min + fetchOptions.offset;
+            ajaxObject.x_max = max + fetchOptions.offset;
+
+            zoomXHRs.push($.ajax(
+            {
+                type: "POST",
+                url: fetchOptions.url,
+                data: JSON.stringify(ajaxObject),
+                contentType: "application/x-www-form-urlencoded",
+                timeout: 120000
+            }).success(function(new_data)
+            {
+                series.setData(alignSeriesData(new_data['chart_JSON'].series[0].data, fetchOptions.offset));
+            }));
+        });
+    }
 
     // function to reinitialize the page in a bit more elegant way.
     // moved it out of the doc ready function to be in same scope as the clear chart button from highcharts menu
@@ -311,6 +393,10 @@
                     ajaxObject.outliers = false;
                     ajaxObject.boxplot = false;
 
+                    // target resolution of the chart, the series is downsampled by the server
+                    ajaxObject.max_points = maxPoints($('#highchart-placeholder').highcharts());
+                    ajaxObject.downsampling = "lttb";
+
                     // build a temporary div to return back to the correct div after series is returned.
                     // $('#element option:selected').text() gets the actual text of the dropdown option currently selected
                     var tempDiv = $('<div/>').data('channel-id',$('#channel-select option:selected').text()).data(
@@ -372,27 +458,26 @@
                             myDiv.children('span').append('<strong>Aggregation:</strong> ' + myDiv.data('aggregation') + '<br/>');
                             myDiv.children('span').append('<br/>');
 
-                            // build up the series and modify some of the highchart values before adding it to the chart
+                            // set start time based on alignment option
+                            var offset = 0;
+                            if ( myDiv.data('align') == 'Left' )
+                            {
+                                offset = new_data['chart_JSON'].series[0].pointStart;
+                            }
+
+                            // build up the series and modify some of the highchart values before adding it to the chart.
+                            // fetchOptions are kept to fetch the detail of the series when the chart is zoomed.
                             var tempSeries =
                             {
-                                data: new_data['chart_JSON'].series[0].data, name: 'series #' + seriesCount,
-                                pointInterval: new_data['chart_JSON'].series[0].pointInterval
+                                data: alignSeriesData(new_data['chart_JSON'].series[0].data, offset),
+                                name: 'series #' + seriesCount,
+                                fetchOptions: {url: loadURL, request: ajaxObject, offset: offset}
                             };
 
                             seriesCount++;
                             $("#start-over-btn").removeClass('disabled');
                             $("#download-series-btn").removeClass('disabled');
 
-                            // set start time based on alignment option
-                            if ( myDiv.data('align') == 'Left' )
-                            {
-                                tempSeries.pointStart = 0;
-                            }
-                            else
-                            {
-                                tempSeries.pointStart = new_data['chart_JSON'].series[0].pointStart;
-                            }
-
                             // add the series, then set the css on the legend div to match the series color on the chart
                             chart.addSeries(tempSeries);
                             myDiv.css("color", chart.series[chart.series.length - 1].color);
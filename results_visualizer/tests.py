@@ -14,3 +14,29 @@ class SimpleTest(TestCase):
         Tests that 1 + 1 always equals 2.
         """
         self.assertEqual(1 + 1, 2)
+
+
+class ChartHelperTests(TestCase):
+    def test_parse_series_request(self):
+        from results_visualizer.views.results_visualizer import parse_series_request
+        arguments = parse_series_request({'run_id': '12', 'channel_id': '3', 'execution': 40,
+                                          'aggregation': 'yearly_sum', 'max_points': 1000})
+        self.assertEqual(arguments, {'run_id': 12, 'channel_id': 3, 'execution_id': 40, 'group_by': True})
+
+        arguments = parse_series_request({'run_id': '12', 'channel_id': '3', 'aggregation': 'daily', 'parameters': {
+            'config.json/parameters/b': {'values': ['2'], 'mod_order': 1},
+            'config.json/parameters/a': {'values': ['1'], 'mod_order': 0}}})
+        self.assertEqual(arguments['exec_dict'], [{'config.json/parameters/a': ['1']},
+                                                  {'config.json/parameters/b': ['2']}])
+        self.assertFalse(arguments['group_by'])
+
+        self.assertIsNone(parse_series_request({'run_id': 's5', 'channel_id': 'Daily EIR'}))
+
+    def test_as_boxplot(self):
+        from results_visualizer.views.results_visualizer import as_boxplot
+        from data_services.utils.distribution import box_statistics
+        chart = as_boxplot([{'name': 'a', 'statistics': box_statistics([1, 2, 3, 4, 100])},
+                            {'name': 'b', 'statistics': box_statistics([])}])
+        self.assertEqual(chart['xAxis']['categories'], ['a', 'b'])
+        self.assertEqual(chart['series'][0]['data'], [[1.0, 2.0, 3.0, 4.0, 4.0], None])
+        self.assertEqual(chart['series'][1]['data'], [[0, 100.0]])
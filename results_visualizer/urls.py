@@ -1,6 +1,6 @@
 from django.conf.urls import patterns, url
 from django.views.generic import TemplateView
-from results_visualizer.views.results_visualizer import viewtastic_fetch_data, \
+from results_visualizer.views.results_visualizer import viewtastic_fetch_data, viewtastic_fetch_statistics, \
     viewtastic_download_data, ResultView, viewtastic_fetch_runs, \
     viewtastic_fetch_keys, viewtastic_fetch_channels, ResultByScenarioView, ResultByRunView, ResultBySimulationView
 
@@ -13,6 +13,7 @@ urlpatterns = patterns('results_visualizer.views',
     url(r'^data/\d+/(?P<run_id>\w+)/keys/$', viewtastic_fetch_keys, name="results_viewer.keys"),
     url(r'^data/\d+/(?P<run_id>\w+)/channels/$', viewtastic_fetch_channels, name="results_viewer.channels"),
     url(r'^data/\d+/\w+/data/$', viewtastic_fetch_data, name="results_viewer_data"),
+    url(r'^data/\d+/\w+/statistics/$', viewtastic_fetch_statistics, name="results_viewer_statistics"),
 
     url(r'^$', ResultView.as_view(), name='results_viewer.index'),
     url(r'^scenario/(?P<scenario_id>\d+)/$', ResultByScenarioView.as_view(), name='results_viewer.scenario'),
@@ -13,7 +13,7 @@
 """
 from collections import defaultdict
 import datetime
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseBadRequest
 from django.views.decorators.cache import never_cache
 from django.views.decorators.csrf import csrf_exempt
 from django.views.generic import TemplateView
@@ -22,18 +22,25 @@ from django.core.exceptions import ObjectDoesNotExist
 import time
 from data_services.adapters import EMOD_Adapter
 from data_services.models import DimBaseline, DimUser, DimRun, Folder, SimulationOutputFile, Simulation
+from data_services.utils.downsampling import downsample_series, METHODS as DOWNSAMPLING_METHODS
 
 import json
 import csv
-import urllib
 
+#: Start date of the charts of a simulation's InsetChart.json
+SIMULATION_START_DATE = datetime.datetime(1995, 1, 1)
 
-def as_chart(data, start_time, is_grouped=False):
+
+def as_chart(data, start_time, is_grouped=False, max_points=None, x_min=None, x_max=None, downsampling='lttb'):
         """
         This method is one method responsible for formatting the simulation data into a highstock or highchart format.
         This will also convert the timesteps into milliseconds from the epoch (for highstock charts).
 
         :param data: array of data to be visualized
+        :param max_points: (Optional) Number of points to keep (see data_services.utils.downsampling)
+        :param x_min: (Optional) First date of the chart, in milliseconds from the epoch
+        :param x_max: (Optional) Last date of the chart, in milliseconds from the epoch
+        :param downsampling: Downsampling method, 'lttb' or 'min_max'
         :returns: A json object containing a highstock object
         """
 
@@ -98,10 +105,14 @@ def as_chart(data, start_time, is_grouped=False):
         else:
             pinterval = 24 * 3600 * 1000 * interval
 
+        pstart = time.mktime(start_time.timetuple()) * 1000
+        if max_points is not None or x_min is not None or x_max is not None:
+            data = downsample_series(data, pstart, pinterval, max_points, x_min, x_max, downsampling)
+
         return_chart['series'].append({
             "name": "Test Name",
             "data": data,
-            "pointStart": time.mktime(start_time.timetuple()) * 1000,
+            "pointStart": pstart,
             "pointInterval": pinterval
         })
 
@@ -303,9 +314,9 @@ def viewtastic_fetch_channels(request, run_id):
     except ValueError:
         # This is a simulation ID, return list of channels in InsectChart
         sim = Simulation.objects.get(id=int(run_id[1:]))
-        config = json.loads(sim.simulationoutputfile_set.get(name="InsetChart.json").get_contents())
+        insetchartfile = sim.simulationoutputfile_set.get(name="InsetChart.json")
         return_channels = []
-        for channel in config["Channels"]:
+        for channel in insetchartfile.get_channel_titles():
             return_channels.append({"id": channel,
                                     "info": {
                                         "title": channel,
@@ -326,16 +337,123 @@ def viewtastic_fetch_channels(request, run_id):
                         content_type="application/json")
 
 
+def parse_series_request(series_request):
+    """
+    Translate the options of a series chosen in the chart builder into the arguments of the adapter's fetch_data.
+
+    :param series_request: dictionary with the run_id, channel_id and aggregation of the series, and either the
+    parameters (the values chosen for each sweep) or the execution id.  The run_id of a simulation is its id
+    prefixed by 's'.
+    :type series_request: dict
+    :return: the arguments of fetch_data, or None if the series is a channel of a simulation's InsetChart.json
+    """
+    try:
+        the_run = int(series_request['run_id'])
+    except ValueError:
+        return None
+
+    arguments = dict(run_id=the_run,
+                     channel_id=int(series_request['channel_id']),
+                     group_by=series_request.get('aggregation', 'daily') == 'yearly_sum')
+
+    # if there weren't any sweeps done, then the execution id needs to be passed to the function.
+    the_params = series_request.get('parameters')
+    if the_params:
+        # Turn the dict of lists into a list of dicts, ordered by the mod order from when the fetch_keys
+        # was called
+        the_param_list = []
+        for sweep_object in the_params:
+            the_params[sweep_object]['name'] = sweep_object
+            the_param_list.append(the_params[sweep_object])
+
+        final_param_list = []
+        for param in sorted(the_param_list, key=lambda sweep: sweep['mod_order']):
+            final_param_list.append({param['name']: param['values']})
+        arguments['exec_dict'] = final_param_list
+    else:
+        arguments['execution_id'] = series_request['execution']
+
+    return arguments
+
+
+def fetch_simulation_data(series_request):
+    """
+    Fetch the data of a channel of a simulation's InsetChart.json.  Only that channel is read, from the index of
+    the file's channels.
+
+    :param series_request: dictionary with the run_id ('s' followed by the simulation id) and the channel_id (the
+    name of the channel)
+    :type series_request: dict
+    :return: list of the values of the channel
+    """
+    sim_id = int(series_request['run_id'][1:])  # Remove first 's' character
+    insetchartfile = SimulationOutputFile.objects.get(simulation=sim_id, name="InsetChart.json")
+    return insetchartfile.get_channel(series_request['channel_id'])
+
+
+def as_boxplot(statistics):
+    """
+    Format the statistics returned by the adapter's fetch_data(as_statistics=True) into a highcharts boxplot: one
+    box per series, and a scatter series with the outliers.
+
+    :param statistics: list of dictionaries with the name and statistics of each series
+    :returns: A dictionary containing a highchart object
+    """
+    boxes = []
+    outliers = []
+    for idx, series in enumerate(statistics):
+        stats = series['statistics']
+        if stats['count'] == 0:
+            boxes.append(None)
+        else:
+            boxes.append([stats['low'], stats['q1'], stats['median'], stats['q3'], stats['high']])
+        outliers.extend([idx, value] for value in stats['outliers'])
+
+    return {
+        "chart": {
+            "type": "boxplot"
+        },
+        "title": {
+            "text": ""
+        },
+        "legend": {
+            "enabled": False
+        },
+        "xAxis": {
+            "categories": [series['name'] for series in statistics]
+        },
+        "series": [
+            {
+                "name": "Replications",
+                "data": boxes
+            },
+            {
+                "name": "Outliers",
+                "type": "scatter",
+                "data": outliers
+            }
+        ]
+    }
+
+
 @never_cache
 def viewtastic_download_data(request):
     """
-    Given a specific set of chart data, create a csv of all of the raw data points for download
-    :param request: the GET value should contain all of the needed chart properties to create the file.
+    Given the series of a chart, create a csv of all of the data points for download.  The data is fetched again on
+    the server at full resolution (or, for a boxplot, the statistics across replications are computed again), so
+    the browser only sends the options of each series.
+
+    :param request: the POST value should contain the series (a json list of the series names and the options
+    used to fetch them, as sent to viewtastic_fetch_data), the chart_type, and optionally the run_name and
+    chart_name.
     :return: a csv file HTTPResponse type. SHould open a download dialog on the host browser upon return.
     """
-    # since this is a querySet, need to get the data. Should only be one key, but for safety simply
-    # overwrite if a second one is found.
-    the_chart = json.loads(urllib.unquote(request.POST['json-data']))
+    adapter = EMOD_Adapter(user_name=request.user.username)  # get_appropriate_model_adapter(request)
+    try:
+        the_series = json.loads(request.POST['series'])
+    except (KeyError, ValueError):
+        return HttpResponseBadRequest('The series to download are missing.')
+    chart_type = request.POST.get('chart_type', 'time_series')
 
     # create a CSV response type
     response = HttpResponse(mimetype='text/csv')
@@ -347,52 +465,42 @@ def viewtastic_download_data(request):
     csv_writer = csv.writer(response)
 
     # write out the run name
-    csv_writer.writerow(['Run Name:', the_chart.get('runName', '')])
+    csv_writer.writerow(['Run Name:', request.POST.get('run_name', '')])
 
     # EMOD, OM, etc
-    csv_writer.writerow(['Simulation Model:', request.session['visualizer_adapter']])
+    csv_writer.writerow(['Simulation Model:', request.session.get('visualizer_adapter', '')])
 
     # The 'Channel' or 'Output' chosen (yAxis label)
-    csv_writer.writerow(['Chart Title:', the_chart.get('chartName', '')])
+    csv_writer.writerow(['Chart Title:', request.POST.get('chart_name', '')])
 
     csv_writer.writerow([])
-    csv_writer.writerow(['Series Name', 'Data Values'])
-
-    # use default values in case it wasn't passed in by js
-    protected_chart_type = the_chart.get('chartType', 'null')
-    protected_categories = the_chart.get('categories', [])
-
-    # TODO: Add start date and timestep for each series
-
-    # boxplot logic will be the death of me. Each chart type comes in with a little different
-    # property structure, so have to write custom code for each type right now.
-    if protected_chart_type == 'boxplot':
-        chart_has_outliers = len(the_chart['series']) > 1
-        if chart_has_outliers:  # preprocess the outliers
-            outlier_dict = {}
-            for outlier_tuple in the_chart['series'][1]['data']:
-                try:
-                    outlier_dict[outlier_tuple[0]]
-                except:  # if it doesn't exist, create an empty list, otherwise simply append
-                    outlier_dict[outlier_tuple[0]] = []
-                outlier_dict[outlier_tuple[0]].append(outlier_tuple[1])
-
-        for idx, boxplotSeries in enumerate(the_chart['series'][0]['data']):
-            try:
-                series_name = protected_categories[idx]
-            except:
-                series_name = 'Error Retrieving Series Name'
-            data_row = [series_name, ] + boxplotSeries
-            csv_writer.writerow(data_row)
-            if chart_has_outliers and outlier_dict.get(idx, False):
-                # overall chart has outliers, but more importantly so does this series
-                data_row = ['series outliers', ]+outlier_dict[idx]
-                csv_writer.writerow(data_row)
+
+    if chart_type == 'boxplot':
+        csv_writer.writerow(['Series Name', 'Low Whisker', 'Lower Quartile', 'Median', 'Upper Quartile',
+                             'High Whisker', 'Mean', 'Mean 95% CI Low', 'Mean 95% CI High', 'Replications'])
+        for series in the_series:
+            arguments = parse_series_request(series['request'])
+            if arguments is None:
+                continue  # a simulation has no replications
+            statistics = adapter.fetch_data(as_statistics=True, **arguments)
+            for stats in statistics:
+                series_name = series['name'] if len(statistics) == 1 else '%s %s' % (series['name'], stats['name'])
+                stats = stats['statistics']
+                csv_writer.writerow([series_name] + [stats[key] for key in ('low', 'q1', 'median', 'q3', 'high',
+                                                                            'mean', 'ci_low', 'ci_high', 'count')])
+                if stats['outliers']:
+                    csv_writer.writerow(['series outliers'] + stats['outliers'])
     else:  # not a boxplot, right now default is a time series.
-        for series in the_chart['series']:
-            series_name = series['name']
-            data_row = [series_name, ]+series['data']
-            csv_writer.writerow(data_row)
+        csv_writer.writerow(['Series Name', 'Data Values'])
+        for series in the_series:
+            arguments = parse_series_request(series['request'])
+            if arguments is None:
+                csv_writer.writerow([series['name']] + fetch_simulation_data(series['request']))
+                continue
+            data = adapter.fetch_data(**arguments)
+            for key in sorted(data):
+                series_name = series['name'] if len(data) == 1 else '%s %s' % (series['name'], key)
+                csv_writer.writerow([series_name] + data[key])
 
     # Return our CSV-type response
     return response
@@ -406,6 +514,9 @@ def viewtastic_fetch_data(request):
     a highcharts object.
     This function also returns the channel id for asynchronous data flow and identification reasons.
 
+    The series are downsampled to max_points points and restricted to the dates between x_min and x_max if these
+    options are given.
+
     :param request: needed for providing a validated username and providing the execution dictionary via the
     packaged GET data.
     :type request: ajax request object
@@ -419,72 +530,26 @@ def viewtastic_fetch_data(request):
     for key in request.POST:
         dict_list.append(json.loads(key))
 
-    # if there weren't any sweeps done, then the execution id needs to be passed to the function.
-    the_params = None
-    try:
-        the_params = dict_list[0]['parameters']
-        # Turn the dict of lists into a list of dicts, ordered by the mod order from when the fetch_keys
-        # was called
-        the_param_list = []
-        for sweep_object in the_params:
-            the_params[sweep_object]['name'] = sweep_object
-            the_param_list.append(the_params[sweep_object])
+    chart_type = dict_list[0].get('chart_type', 'time_series')
+    the_aggregation = dict_list[0].get('aggregation', 'daily')
 
-        final_param_list = []
-        for param in sorted(the_param_list, key=lambda sweep: sweep['mod_order']):
-            final_param_list.append({param['name']: param['values']})
-
-    except:
-        the_execid = dict_list[0]['execution']
-
-    try:
-        chart_type = dict_list[0]['chart_type']
-    except:
-        chart_type = 'time_series'
-
-    try:
-        the_aggregation = dict_list[0]['aggregation']
-    except:
-        the_aggregation = 'daily'
+    # target resolution and visible window of the chart, the series are downsampled to max_points points
+    chart_options = dict(max_points=dict_list[0].get('max_points'),
+                         x_min=dict_list[0].get('x_min'),
+                         x_max=dict_list[0].get('x_max'),
+                         downsampling=dict_list[0].get('downsampling', 'lttb'))
+    if chart_options['downsampling'] not in DOWNSAMPLING_METHODS:
+        chart_options['downsampling'] = 'lttb'
 
-    try:
-        the_run = int(dict_list[0]['run_id'])
-        the_channel = int(dict_list[0]['channel_id'])
-    except:
+    arguments = parse_series_request(dict_list[0])
+    if arguments is None:
         # Requesting Simulation data
-        sim_id = int(dict_list[0]['run_id'][1:])  # Remove first 's' character
         the_channel = dict_list[0]['channel_id']
-        start_date = datetime.datetime(1995, 1, 1)
-        insetchartfile = SimulationOutputFile.objects.get(simulation=sim_id, name="InsetChart.json")
-        data = json.loads(insetchartfile.get_contents())["Channels"][the_channel]["Data"]
-        data = as_chart(data, start_date)
-
+        data = as_chart(fetch_simulation_data(dict_list[0]), SIMULATION_START_DATE, **chart_options)
     else:
-        # if the parameters aren't available then try getting the data via the execution id
-        if the_params is not None:
-            if the_aggregation == 'yearly_sum':
-                data = adapter.fetch_data(group_by=True,
-                                          exec_dict=final_param_list,
-                                          run_id=the_run,
-                                          channel_id=the_channel,
-                                          as_chart=True, as_highstock=True)
-            else:
-                data = adapter.fetch_data(exec_dict=final_param_list,
-                                          run_id=the_run,
-                                          channel_id=the_channel,
-                                          as_chart=True, as_highstock=True)
-        else:
-            if the_aggregation == 'yearly_sum':
-                data = adapter.fetch_data(group_by=True,
-                                          execution_id=the_execid,
-                                          run_id=the_run,
-                                          channel_id=the_channel,
-                                          as_chart=True, as_highstock=True)
-            else:
-                data = adapter.fetch_data(execution_id=the_execid,
-                                          run_id=the_run,
-                                          channel_id=the_channel,
-                                          as_chart=True, as_highstock=True)
+        the_channel = arguments['channel_id']
+        arguments.update(chart_options)
+        data = adapter.fetch_data(as_chart=True, as_highstock=True, **arguments)
 
     temp_chart_json = json.loads(data)
 
@@ -500,6 +565,39 @@ def viewtastic_fetch_data(request):
     return HttpResponse(content=json.dumps(real_return_json), content_type="application/json")
 
 
+@never_cache
+@csrf_exempt
+def viewtastic_fetch_statistics(request):
+    """
+    For a given execution dictionary, the fetch_statistics function returns the distribution of the selected channel
+    across the replications of each execution: quartiles, whiskers, outliers and the confidence interval of the mean,
+    along with a boxplot chart json of it.  The replications are aggregated on the server, only these summary
+    statistics are returned.
+
+    :param request: the POST data is the same execution dictionary as for viewtastic_fetch_data
+    :type request: ajax request object
+    :return: a dictionary containing the channel id, the statistics of each series and the boxplot chart
+    """
+    adapter = EMOD_Adapter(user_name=request.user.username)  # get_appropriate_model_adapter(request)
+
+    dict_list = []
+    for key in request.POST:
+        dict_list.append(json.loads(key))
+
+    arguments = parse_series_request(dict_list[0])
+    if arguments is None:
+        return HttpResponseBadRequest('Statistics across replications are only available for runs.')
+    statistics = adapter.fetch_data(as_statistics=True, **arguments)
+
+    real_return_json = dict(channel_id=arguments['channel_id'],
+                            statistics=statistics,
+                            chart_JSON=as_boxplot(statistics),
+                            chart_type='boxplot',
+                            aggregation=dict_list[0].get('aggregation', 'daily'))
+
+    return HttpResponse(content=json.dumps(real_return_json), content_type="application/json")
+
+
 class ResultView(TemplateView):
     """
     This view is responsible for rendering visualizations for the data warehouse
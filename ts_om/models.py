@@ -111,6 +111,52 @@ class Scenario(models.Model):
             status = None
         return status
 
+    def save(self, *args, **kwargs):
+        super(Scenario, self).save(*args, **kwargs)
+        ScenarioSummary.from_scenario(self).save()
+
+
+class ScenarioSummary(models.Model):
+    """
+    Fields of Scenario.xml shown in the list of scenarios.  They are extracted when the scenario is saved, so the list
+    can be served without parsing the xml of every scenario.
+    """
+    scenario = models.OneToOneField(Scenario, primary_key=True, related_name="summary")
+    # False if the xml couldn't be parsed
+    valid = models.BooleanField(default=True, db_index=True)
+    name = models.CharField(max_length=255)
+    demography_name = models.CharField(max_length=255, db_index=True)
+    schema_version = models.IntegerField(null=True, db_index=True)
+
+    def __unicode__(self):
+        return self.name
+
+    @classmethod
+    def from_scenario(cls, scenario):
+        """
+        Extract the summary of a scenario.  Missing values get the same defaults as in the list of scenarios.
+
+        :param Scenario scenario: The scenario
+        :rtype: ScenarioSummary
+        """
+        summary = cls(scenario=scenario)
+        try:
+            root = etree.fromstring(str(scenario.xml))
+        except (XMLSyntaxError, ValueError):
+            summary.valid = False
+            summary.name = "Invalid xml document"
+            summary.demography_name = "no_name"
+            return summary
+
+        summary.name = root.get("name", "Unnamed scenario")[:255]
+        demography = root.find("demography")
+        summary.demography_name = ("no_name" if demography is None else demography.get("name", "no_name"))[:255]
+        try:
+            summary.schema_version = int(root.get("schemaVersion"))
+        except (TypeError, ValueError):
+            summary.schema_version = None
+        return summary
+
 
 class AnophelesSnippet(models.Model):
     # Vector description in /om:scenario/entomology/vector/anopheles section of xml
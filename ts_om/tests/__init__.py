@@ -1,3 +1,5 @@
 from .execution_util_tests import *
 from .sim_services_tests import *
 from .upload_tests import *
+from .scenario_list_tests import *
+from .validation_tests import *
@@ -0,0 +1,65 @@
+from django.contrib.auth.models import User
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+from django.test.client import Client
+
+from ts_om.models import Scenario, ScenarioSummary
+
+SCENARIO = '<om:scenario xmlns:om="http://openmalaria.org/schema/scenario_32" name="Test scenario" ' \
+           'schemaVersion="32"><demography name="Rachuonyo" popSize="1000" maximumAgeYrs="90"/></om:scenario>'
+
+
+class ScenarioSummaryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test-user', password='test')
+
+    def test_summary_saved_with_scenario(self):
+        scenario = Scenario.objects.create(xml=SCENARIO, user=self.user)
+
+        summary = ScenarioSummary.objects.get(scenario=scenario)
+        self.assertTrue(summary.valid)
+        self.assertEqual(summary.name, "Test scenario")
+        self.assertEqual(summary.demography_name, "Rachuonyo")
+        self.assertEqual(summary.schema_version, 32)
+
+        scenario.name = "Renamed"
+        scenario.save()
+        self.assertEqual(ScenarioSummary.objects.get(scenario=scenario).name, "Renamed")
+
+    def test_invalid_xml(self):
+        scenario = Scenario.objects.create(xml="<om:scenario", user=self.user)
+
+        summary = ScenarioSummary.objects.get(scenario=scenario)
+        self.assertFalse(summary.valid)
+        self.assertEqual(summary.demography_name, "no_name")
+        self.assertIsNone(summary.schema_version)
+
+
+class ScenarioListViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test-user', password='test')
+        for ndx in range(15):
+            Scenario.objects.create(xml=SCENARIO, user=self.user)
+        Scenario.objects.create(xml="<om:scenario", user=self.user)
+        self.client = Client()
+        self.client.login(username='test-user', password='test')
+
+    def test_list(self):
+        response = self.client.get(reverse('ts_om.list'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['paginator'].count, 15)
+        self.assertEqual(len(response.context['object_list']), 10)
+        scenario, status, demography_name, version, status_desc = response.context['object_list'][0]
+        self.assertEqual((status, demography_name, version), ("", "Rachuonyo", 32))
+
+    def test_scenarios_without_summary(self):
+        """
+        Scenarios saved before the summaries were introduced get one when the list is first shown
+        """
+        ScenarioSummary.objects.all().delete()
+
+        response = self.client.get(reverse('ts_om.list'))
+
+        self.assertEqual(response.context['paginator'].count, 15)
+        self.assertEqual(ScenarioSummary.objects.count(), 16)
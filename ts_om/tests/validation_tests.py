@@ -0,0 +1,175 @@
+"""
+Tests for the validation of OpenMalaria scenarios by om_validate, and for the client of its batch endpoint.
+"""
+
+import json
+import mock
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth.models import AnonymousUser
+from django.test import TestCase
+from django.test.client import RequestFactory
+from django.test.utils import override_settings
+
+from om_validate import validator, views
+from ts_om.views.ScenarioValidationView import rest_validate_many
+
+#: Schema of the test scenarios, scenario_32 requires a name and scenario_31 doesn't
+SCHEMA = """<?xml version="1.0" encoding="UTF-8"?>
+<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">
+  <xs:element name="scenario">
+    <xs:complexType>
+      <xs:attribute name="schemaVersion" type="xs:integer"/>
+      <xs:attribute name="name" type="xs:string" use="%s"/>
+    </xs:complexType>
+  </xs:element>
+</xs:schema>
+"""
+
+
+class ValidatorTests(TestCase):
+    """
+    Tests for the schema cache and the validation functions of om_validate.validator.  OpenMalaria itself is not
+    run, run_openmalaria is mocked.
+    """
+
+    def setUp(self):
+        self.om_dir = tempfile.mkdtemp()
+        for version, use in (('31', 'optional'), ('32', 'required')):
+            with open(os.path.join(self.om_dir, 'scenario_%s.xsd' % version), 'w') as xsd:
+                xsd.write(SCHEMA % use)
+        self.settings_override = override_settings(OPENMALARIA_EXEC_DIR=self.om_dir)
+        self.settings_override.enable()
+        validator._schemas.clear()
+
+    def tearDown(self):
+        validator._schemas.clear()
+        self.settings_override.disable()
+        shutil.rmtree(self.om_dir)
+
+    def test_get_schema(self):
+        """
+        Schemas are compiled once, and the latest one is used for unknown or missing schemaVersions
+        """
+        schema, lock = validator.get_schema('32')
+        self.assertIs(validator.get_schema('32')[0], schema)
+        self.assertEqual(len(validator._schemas), 1)
+
+        self.assertIsNot(validator.get_schema('31')[0], schema)
+        self.assertIs(validator.get_schema('99')[0], schema)
+        self.assertIs(validator.get_schema(None)[0], schema)
+        self.assertEqual(len(validator._schemas), 2)
+
+    def test_get_schema_invalid_version(self):
+        """
+        A schemaVersion that is not an integer is rejected, it could point outside the bin directory
+        """
+        for schema_version in ('../32', '32 ', '32\n', '', 'latest'):
+            self.assertRaises(ValueError, validator.get_schema, schema_version)
+        self.assertEqual(len(validator._schemas), 0)
+
+        return_code, out = validator.validate('<scenario schemaVersion="../../32" name="a"/>')
+        self.assertEqual(return_code, -1)
+        self.assertIn('Invalid schemaVersion', out)
+
+    def test_get_schema_no_schema(self):
+        """
+        There is no schema to fall back to if the bin directory has none
+        """
+        for filename in os.listdir(self.om_dir):
+            os.unlink(os.path.join(self.om_dir, filename))
+        self.assertRaises(ValueError, validator.get_schema, '32')
+
+    @mock.patch('om_validate.validator.run_openmalaria', return_value=(0, 'OK'))
+    def test_validate(self, run_openmalaria):
+        """
+        OpenMalaria is only run for scenarios that are valid against their schema
+        """
+        self.assertEqual(validator.validate('<scenario schemaVersion="32" name="a"/>'), (0, 'OK'))
+        self.assertEqual(run_openmalaria.call_count, 1)
+
+        self.assertEqual(validator.validate('<scenario schemaVersion="31"/>'), (0, 'OK'))
+
+        return_code, out = validator.validate('<scenario schemaVersion="32"/>')
+        self.assertEqual(return_code, -1)
+        self.assertIn('name', out)
+
+        return_code, out = validator.validate('<scenario schemaVersion="32"')
+        self.assertEqual(return_code, -1)
+        self.assertEqual(run_openmalaria.call_count, 2)
+
+    @mock.patch('om_validate.validator.run_openmalaria', side_effect=lambda xml: (0, xml))
+    def test_validate_many(self, run_openmalaria):
+        """
+        The results are in the order of the scenarios, and an invalid scenario doesn't affect the others
+        """
+        xmls = ['<scenario schemaVersion="32" name="%s"/>' % i for i in range(8)]
+        xmls[3] = '<scenario schemaVersion="32"/>'
+        xmls[5] = 'not a scenario'
+
+        results = validator.validate_many(xmls)
+
+        self.assertEqual(len(results), 8)
+        for i, (return_code, out) in enumerate(results):
+            if i in (3, 5):
+                self.assertEqual(return_code, -1)
+            else:
+                self.assertEqual((return_code, out), (0, xmls[i]))
+        self.assertEqual(validator.validate_many([]), [])
+        self.assertEqual(validator.validate_many(iter(xmls[:1])), [(0, xmls[0])])
+
+
+class ValidateBatchViewTests(TestCase):
+    """
+    Tests for the batch endpoint of om_validate and its client, rest_validate_many
+    """
+
+    def post(self, body):
+        request = RequestFactory().post('/om_validate/validate/batch/', data=body, content_type='application/json')
+        request.user = AnonymousUser()
+        return views.validate_batch(request)
+
+    @mock.patch('om_validate.views.validate_many', return_value=[(0, 'line 1\nline 2'), (-1, 'error\n')])
+    def test_validate_batch(self, validate_many):
+        """
+        The response is the list of the validation results, each with its return code and output lines
+        """
+        response = self.post(json.dumps([u'<scenario name="\xe9"/>', '<scenario/>']))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(response.content), [
+            {'result': 0, 'om_output': ['line 1', 'line 2']},
+            {'result': -1, 'om_output': ['error', '']}
+        ])
+        #  The scenarios are validated as utf-8 encoded strings
+        self.assertEqual(validate_many.call_args[0][0], ['<scenario name="\xc3\xa9"/>', '<scenario/>'])
+
+    @mock.patch('om_validate.views.validate_many')
+    def test_validate_batch_bad_request(self, validate_many):
+        """
+        Anything but a JSON list of strings is rejected without validating anything
+        """
+        for body in ('not json', json.dumps('<scenario/>'), json.dumps([1, 2]), json.dumps({'xml': '<scenario/>'})):
+            response = self.post(body)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('error', json.loads(response.content))
+        self.assertFalse(validate_many.called)
+
+    @override_settings(TS_OM_VALIDATE_URL='http://localhost/om_validate/validate/')
+    @mock.patch('ts_om.views.ScenarioValidationView.requests.post')
+    def test_rest_validate_many(self, post):
+        """
+        The scenarios are posted in one request to the batch endpoint
+        """
+        results = [{'result': 0, 'om_output': ['']}, {'result': -1, 'om_output': ['error', '']}]
+        post.return_value.json.return_value = results
+
+        self.assertEqual(rest_validate_many(iter(['<scenario/>', '<scenario/>'])), results)
+        post.assert_called_once_with('http://localhost/om_validate/validate/batch/',
+                                     data=json.dumps(['<scenario/>', '<scenario/>']))
+
+        #------ One result per scenario is expected
+        self.assertRaises(ValueError, rest_validate_many, ['<scenario/>'])
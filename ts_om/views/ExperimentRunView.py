@@ -1,6 +1,6 @@
 import json
 
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.views.generic import TemplateView
 
 from data_services.models import Simulation
@@ -58,10 +58,7 @@ def download_experiment_zip(request, experiment_id, run_type):
 
     sim_group = experiment.test_sim_group if run_type == "test" else experiment.sim_group
 
-    zip_contents, zip_len = sim_group.create_om_zip_file("experiment")
-
-    resp = HttpResponse(zip_contents, content_type="application/x-zip-compressed")
+    resp = StreamingHttpResponse(sim_group.om_zip_file_stream(), content_type="application/x-zip-compressed")
     resp['Content-Disposition'] = 'attachment; filename=%s' % 'experiment.zip'
-    resp['Content-Length'] = zip_len
 
     return resp
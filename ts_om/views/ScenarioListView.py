@@ -8,10 +8,9 @@
 #   Alexander Vyushkov <Alexander.Vyushkov@nd.edu>
 ########################################################################################################################
 from django.views.generic import ListView
-from vecnet.openmalaria.scenario import Scenario
 from vecnet.simulation import sim_status
 
-from ts_om.models import Scenario as ScenarioModel
+from ts_om.models import Scenario as ScenarioModel, ScenarioSummary
 
 
 class ScenarioListView(ListView):
@@ -20,33 +19,32 @@ class ScenarioListView(ListView):
     model = ScenarioModel
 
     def get_queryset(self):
-        scenarios = ScenarioModel.objects.filter(user=self.request.user, deleted=False).order_by('-last_modified')
+        scenarios = ScenarioModel.objects.filter(user=self.request.user, deleted=False)
 
-        scenario_sim_list = []
+        # Scenarios saved before the summaries were introduced
+        for scenario in scenarios.filter(summary__isnull=True):
+            ScenarioSummary.from_scenario(scenario).save()
 
-        for s in scenarios:
-            try:
-                scenario = Scenario(s.xml)
-            except:
-                continue
+        return scenarios.filter(summary__valid=True).select_related('summary', 'simulation')\
+            .order_by('-last_modified')
 
-            demography_name = getattr(scenario.demography, "name", "no_name")
-            version = getattr(scenario, "schemaVersion", None)
+    def get_context_data(self, **kwargs):
+        context = super(ScenarioListView, self).get_context_data(**kwargs)
 
+        # Only the scenarios of the current page are fetched
+        scenario_sim_list = []
+        for s in context["object_list"]:
             if s.simulation and s.simulation.status == sim_status.SCRIPT_DONE:
-                scenario_sim_list.append(
-                    (s, "finished", demography_name, version, sim_status.get_description(s.status)))
+                status = "finished"
             elif s.simulation and (s.simulation.status == sim_status.OUTPUT_ERROR or
-                                           s.simulation.status == sim_status.SCRIPT_ERROR):
-                scenario_sim_list.append((s, "error", demography_name, version, sim_status.get_description(s.status)))
+                                   s.simulation.status == sim_status.SCRIPT_ERROR):
+                status = "error"
             elif s.simulation:
-                scenario_sim_list.append((s, "running", demography_name, version, sim_status.get_description(s.status)))
+                status = "running"
             else:
-                scenario_sim_list.append((s, "", demography_name, version, sim_status.get_description(s.status)))
-
-        return scenario_sim_list
-
-    def get_context_data(self, **kwargs):
-        context = super(ScenarioListView, self).get_context_data(**kwargs)
+                status = ""
+            scenario_sim_list.append((s, status, s.summary.demography_name, s.summary.schema_version,
+                                      sim_status.get_description(s.status)))
+        context["object_list"] = scenario_sim_list
 
         return context
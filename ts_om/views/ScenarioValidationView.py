@@ -1,3 +1,5 @@
+import json
+
 import requests
 
 from django.conf import settings
@@ -17,6 +19,29 @@ def rest_validate(f):
     return response.text
 
 
+def rest_validate_many(xmls):
+    """
+    Validate several scenarios with a single request to the batch endpoint of the validation service, which
+    validates them in parallel.
+
+    :param xmls: The scenarios
+    :returns: List of validation results (dictionaries with "result" and "om_output"), in the same order as xmls
+    :raises requests.HTTPError: if the validation service returned an error
+    :raises ValueError: if the validation service didn't return one result per scenario
+    """
+    validate_url = check_url(getattr(settings, "TS_OM_VALIDATE_URL", None), "validate")
+    xmls = list(xmls)
+
+    response = requests.post(validate_url + "batch/", data=json.dumps(xmls))
+    response.raise_for_status()
+
+    results = response.json()
+    if not isinstance(results, list) or len(results) != len(xmls):
+        raise ValueError("The validation service returned %s results for %s scenarios"
+                         % (len(results) if isinstance(results, list) else "no", len(xmls)))
+    return results
+
+
 class ScenarioValidationView(View):
     def post(self, request):
         json_str = rest_validate(request.read())
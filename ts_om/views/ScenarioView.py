@@ -8,10 +8,11 @@ from django.http import HttpResponseRedirect, HttpResponse
 from django.views.generic import View
 from lxml import etree
 from lxml.etree import XMLSyntaxError
+import requests
 
 from ts_om.models import Scenario, ExperimentFile
 from ts_om.submit import submit
-from ts_om.views.ScenarioValidationView import rest_validate
+from ts_om.views.ScenarioValidationView import rest_validate, rest_validate_many
 
 __author__ = 'nreed'
 
@@ -128,6 +129,7 @@ def submit_scenarios(request):
     if scenario_ids is None or len(scenario_ids) <= 0:
         return HttpResponse(json.dumps(scenarios_data), content_type="application/json")
 
+    scenarios = list()
     for scenario_id in scenario_ids:
         scenarios_data["scenarios"].append({"id": scenario_id, "ok": False})
 
@@ -136,9 +138,16 @@ def submit_scenarios(request):
         if not scenario or scenario.simulation is not None:
             continue
 
-        json_str = rest_validate(scenario.xml)
-        validation_result = json.loads(json_str)
+        scenarios.append((scenario, scenarios_data["scenarios"][-1]))
 
+    # Validate all the scenarios of the batch at once, the validation service runs them in parallel
+    try:
+        validation_results = rest_validate_many([scenario.xml for scenario, scenario_data in scenarios]) \
+            if scenarios else []
+    except (requests.RequestException, ValueError):
+        return HttpResponse(json.dumps(scenarios_data), content_type="application/json")
+
+    for (scenario, scenario_data), validation_result in zip(scenarios, validation_results):
         valid = True if (validation_result['result'] == 0) else False
 
         if not valid:
@@ -149,7 +158,7 @@ def submit_scenarios(request):
         if simulation:
             scenario.simulation = simulation
             scenario.save()
-            scenarios_data["scenarios"][-1]["ok"] = True
+            scenario_data["ok"] = True
 
     scenarios_data["ok"] = True
 
@@ -7,9 +7,57 @@ Replace this with more appropriate tests for your application.
 
 from django.test import TestCase
 
+from lib.lru_cache import LRUCache
+from ts_om_viz.utils import ParsedOutput
+
+
 class SimpleTest(TestCase):
     def test_basic_addition(self):
         """
         Tests that 1 + 1 always equals 2.
         """
         self.assertEqual(1 + 1, 2)
+
+
+class ParsedOutputCacheTest(TestCase):
+    class OutputParser(object):
+        survey_output_data = {(0, 1): [[0, 1000.0], [73, 990.0]], (31, "gambiae"): [[0, 1.5]]}
+        cts_output_data = {"simulated EIR": [0.5, 0.25, 0.125]}
+
+        def get_survey_measure_name(self, measure_id, third_dimension):
+            return "measure %s (%s)" % (measure_id, third_dimension)
+
+    def test_parsed_output(self):
+        parsed = ParsedOutput(self.OutputParser())
+
+        self.assertEqual(sorted(parsed.get_survey_measures()), [(0, 1), (31, "gambiae")])
+        self.assertEqual(parsed.get_survey_measure_name(measure_id=0, third_dimension=1), "measure 0 (1)")
+        self.assertEqual(parsed.get_survey_data(0, 1), [[0, 1000.0], [73, 990.0]])
+        self.assertEqual(parsed.get_cts_measures(), ["simulated EIR"])
+        self.assertEqual(parsed.get_cts_data("simulated EIR"), [0.5, 0.25, 0.125])
+        self.assertRaises(KeyError, parsed.get_cts_data, "hosts")
+
+    def test_lru_eviction(self):
+        cache = LRUCache(10, sizeof=len)
+        cache.put("a", "aaaa")
+        cache.put("b", "bbbb")
+        cache.get("a")
+        cache.put("c", "cccc")
+
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertEqual(cache.size, 8)
+
+        cache.put("d", "d" * 11)
+        self.assertNotIn("d", cache)
+        self.assertEqual(cache.get_or_put("e", lambda: "ee"), "ee")
+        self.assertEqual(cache.get_or_put("e", lambda: "ff"), "ee")
+
+    def test_lru_expiry(self):
+        cache = LRUCache(10, sizeof=len, max_age=0)
+        cache.put("a", "aaaa")
+
+        self.assertNotIn("a", cache)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.size, 0)
+        self.assertEqual(cache.get_or_put("a", lambda: "bb"), "bb")
@@ -1,45 +1,131 @@
-from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned
+from array import array
+from collections import OrderedDict
+
+from django.conf import settings
 from data_services.models import SimulationInputFile, SimulationOutputFile
+from lib.lru_cache import LRUCache
 from vecnet.openmalaria.output_parser import OutputParser
 
+#: Maximum size (in bytes) of the parsed outputs kept in memory by each process
+TS_OM_VIZ_CACHE_SIZE = getattr(settings, "TS_OM_VIZ_CACHE_SIZE", 64 * 1024 * 1024)
 
-def om_output_parser_from_simulation(simulation):
+
+class ParsedOutput(object):
+    """
+    The survey and continuous measures of an OpenMalaria simulation, stored as arrays of numbers.
+    """
+
+    def __init__(self, output_parser):
+        """
+        :param output_parser: vecnet.openmalaria.output_parser.OutputParser of the simulation
+        """
+        self.survey_measure_names = dict()
+        self.survey_output_data = dict()
+        for key, values in getattr(output_parser, "survey_output_data", {}).iteritems():
+            self.survey_measure_names[key] = output_parser.get_survey_measure_name(measure_id=key[0],
+                                                                                   third_dimension=key[1])
+            self.survey_output_data[key] = (array('l', [value[0] for value in values]),
+                                            array('d', [value[1] for value in values]))
+
+        self.cts_output_data = OrderedDict()
+        for measure, values in getattr(output_parser, "cts_output_data", {}).iteritems():
+            self.cts_output_data[measure] = array('d', values)
+
+    def get_survey_measures(self):
+        return list(self.survey_output_data.keys())
+
+    def get_survey_measure_name(self, measure_id, third_dimension):
+        return self.survey_measure_names[(measure_id, third_dimension)]
+
+    def get_survey_data(self, measure_id, third_dimension):
+        """
+        :returns: List of [timestep, value] pairs, as in OutputParser.survey_output_data
+        :raises KeyError: if the simulation has no such measure
+        """
+        (timesteps, values) = self.survey_output_data[(measure_id, third_dimension)]
+        return [[timestep, value] for timestep, value in zip(timesteps, values)]
+
+    def get_cts_measures(self):
+        return list(self.cts_output_data.keys())
+
+    def get_cts_data(self, measure_name):
+        """
+        :returns: List of values, one per timestep
+        :raises KeyError: if the simulation has no such measure
+        """
+        return self.cts_output_data[measure_name].tolist()
+
+    def sizeof(self):
+        """
+        Approximate memory used by the data, in bytes.
+        """
+        size = 0
+        for timesteps, values in self.survey_output_data.itervalues():
+            size += 200 + (len(timesteps) * timesteps.itemsize) + (len(values) * values.itemsize)
+        for values in self.cts_output_data.itervalues():
+            size += 100 + len(values) * values.itemsize
+        return size
+
+
+_parsed_outputs = LRUCache(TS_OM_VIZ_CACHE_SIZE, sizeof=ParsedOutput.sizeof)
+
+
+def get_simulation_files(simulation):
     """
+    Get the scenario.xml, output.txt and ctsout.txt files of a simulation.
 
     :param simulation: data_services.models.Simulation object
-    :return: vecnet.openmalaria.output_parser.OutputParser generated from simulation
+    :return: Tuple of (scenario.xml, output.txt, ctsout.txt) SimulationFile objects.  The output files are None if
+             they are missing.
     """
     sim_id = simulation.id
 
-    # Get contents of xml input file and filename (if available)
-    try:
-        scenario_file = SimulationInputFile.objects.filter(simulations=simulation, name="scenario.xml")
-        scenario = str(scenario_file[0].get_contents())
-    except ObjectDoesNotExist:
+    scenario_files = list(SimulationInputFile.objects.filter(simulations=simulation, name="scenario.xml")[:2])
+    if not scenario_files:
         raise TypeError("No scenario.xml file in the simulation %s" % sim_id)
-    except MultipleObjectsReturned:
-        return TypeError("Multiple scenario.xml files are found in the simulation %s" % sim_id)
-
-    # Get contents of survey output file
-    try:
-        output = SimulationOutputFile.objects.get(simulation=simulation, name="output.txt")
-        output = output.get_contents()
-    except ObjectDoesNotExist:
-        output = None
-    except MultipleObjectsReturned:
-        raise TypeError("Multiple output.txt files in Simulation %s" % sim_id)
-
-    # Get contents of continuous output file
-    try:
-        ctsout = SimulationOutputFile.objects.get(simulation=simulation, name="ctsout.txt")
-        ctsout = ctsout.get_contents()
-    except ObjectDoesNotExist:
-        ctsout = None
-    except MultipleObjectsReturned:
-        raise TypeError("Multiple cstout.txt files in Simulation %s" % sim_id)
-
-    if output is None and ctsout is None:
+    if len(scenario_files) > 1:
+        raise TypeError("Multiple scenario.xml files are found in the simulation %s" % sim_id)
+
+    output_files = dict()
+    for output_file in SimulationOutputFile.objects.filter(simulation=simulation, name__in=["output.txt",
+                                                                                            "ctsout.txt"]):
+        if output_file.name in output_files:
+            raise TypeError("Multiple %s files in Simulation %s" % (output_file.name, sim_id))
+        output_files[output_file.name] = output_file
+
+    if not output_files:
         raise TypeError("Error! Both output.txt and ctsout.txt are missing")
 
-    oms = OutputParser(scenario, survey_output_file=output, cts_output_file=ctsout)
-    return oms
\ No newline at end of file
+    return scenario_files[0], output_files.get("output.txt"), output_files.get("ctsout.txt")
+
+
+def om_output_parser_from_simulation(simulation):
+    """
+
+    :param simulation: data_services.models.Simulation object
+    :return: vecnet.openmalaria.output_parser.OutputParser generated from simulation
+    """
+    scenario_file, output_file, ctsout_file = get_simulation_files(simulation)
+    return _output_parser(scenario_file, output_file, ctsout_file)
+
+
+def _output_parser(scenario_file, output_file, ctsout_file):
+    return OutputParser(str(scenario_file.get_contents()),
+                        survey_output_file=output_file.get_contents() if output_file is not None else None,
+                        cts_output_file=ctsout_file.get_contents() if ctsout_file is not None else None)
+
+
+def parsed_output_from_simulation(simulation):
+    """
+    Get the parsed outputs of a simulation.  They are cached, keyed by the checksums of the simulation's files, so
+    the files are only read and parsed again when one of them changes.
+
+    :param simulation: data_services.models.Simulation object
+    :rtype: ParsedOutput
+    """
+    files = get_simulation_files(simulation)
+    key = tuple(simulation_file.checksum if simulation_file is not None else None for simulation_file in files)
+    if any(simulation_file is not None and checksum is None for simulation_file, checksum in zip(files, key)):
+        # Files stored without their checksum can't be cached
+        return ParsedOutput(_output_parser(*files))
+    return _parsed_outputs.get_or_put(key, lambda: ParsedOutput(_output_parser(*files)))
@@ -8,7 +8,7 @@ from vecnet.openmalaria.cts import continuousMeasuresDescription
 from vecnet.openmalaria.output_parser import surveyFileMap
 from data_services.models import Simulation, SimulationInputFile, SimulationOutputFile
 from lib.templatetags.base_extras import set_notification
-from ts_om_viz.utils import om_output_parser_from_simulation
+from ts_om_viz.utils import parsed_output_from_simulation
 
 class SimulationView(TemplateView):
     template_name = 'ts_om_viz/simulation.html'
@@ -65,7 +65,7 @@ class SimulationView(TemplateView):
             pass
 
         try:
-            output_parser = om_output_parser_from_simulation(simulation)
+            output_parser = parsed_output_from_simulation(simulation)
         except (TypeError, ValueError) as e:
             error_type = "%s" % type(e)
             error_type = error_type.replace("<", "").replace(">", "")
@@ -103,9 +103,9 @@ def get_survey_data(request, sim_id, measure_id, bin_number):
         # Treat bin_number as species name
         pass
     simulation = get_object_or_404(Simulation, id=sim_id)
-    output_parser = om_output_parser_from_simulation(simulation)
+    output_parser = parsed_output_from_simulation(simulation)
     try:
-        data = output_parser.survey_output_data[(measure_id, bin_number,)]
+        data = output_parser.get_survey_data(measure_id, bin_number)
     except KeyError:
         raise Http404("There is not measure (%s,%s) in simulation %s" % (measure_id, bin_number, sim_id))
 
@@ -121,9 +121,9 @@ def get_survey_data(request, sim_id, measure_id, bin_number):
 def get_cts_data(request, sim_id, measure_name):
     sim_id = int(sim_id)
     simulation = get_object_or_404(Simulation, id=int(sim_id))
-    output_parser = om_output_parser_from_simulation(simulation)
+    output_parser = parsed_output_from_simulation(simulation)
     try:
-        data = output_parser.cts_output_data[measure_name]
+        data = output_parser.get_cts_data(measure_name)
     except KeyError:
         raise Http404("There is not measure %s in simulation %s" % (measure_name, sim_id))
     result = {
@@ -0,0 +1,201 @@
+"""
+Conversion between EMOD climate files (.json metadata + .bin float32 values) and the csv files of the weather tool.
+
+The values are kept in a (nodes x days) numpy array of float32, laid out like the .bin file.  An EMOD .bin file is
+memory-mapped instead of being read, csv files are generated a block of rows at a time and EMOD files are written
+straight from the array.
+"""
+
+from array import array
+import calendar
+import datetime
+import getpass
+import json
+import time
+
+import numpy
+
+#: Number of csv rows (days) generated at a time
+CSV_BLOCK_SIZE = 1000
+
+MONTHS = ['', 'January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October',
+          'November', 'December']
+
+
+class DateException(Exception):
+    pass
+
+
+class ClimateData(object):
+    """
+    Climate data of one EMOD weather file: its metadata, node ids and values.
+    """
+
+    def __init__(self, metaData, nodeIDs, values, startDate):
+        """
+        :param metaData: EMOD metadata (IdReference, UpdateResolution, DataProvenance, ...)
+        :param nodeIDs: List of node ids (ints)
+        :param values: (nodes x days) numpy array, in the order of nodeIDs
+        :param startDate: datetime.date of the first day
+        """
+        if values.shape[0] != len(nodeIDs):
+            raise ValueError("There are %s node ids for %s nodes" % (len(nodeIDs), values.shape[0]))
+        self.metaData = metaData
+        self.nodeIDs = nodeIDs
+        self.values = values
+        self.startDate = startDate
+
+    @property
+    def dataValueCount(self):
+        return self.values.shape[1]
+
+    @classmethod
+    def loadEmod(cls, jsonFileName, binFileName):
+        """
+        Load an EMOD climate file.  The .bin file is memory-mapped, only the values used are read from the disk.
+        """
+        with open(jsonFileName) as jsonFile:
+            jsonData = json.load(jsonFile)
+        metaData = jsonData['Metadata']
+        nodeCount = int(metaData['NodeCount'])
+        dataValueCount = int(metaData['DatavalueCount'])
+        nodeOffsets = jsonData['NodeOffsets']
+        if len(nodeOffsets) < nodeCount * 16:
+            raise IndexError("There are more nodes than node offsets in the json.")
+        nodeIDs = [int(nodeOffsets[node * 16:node * 16 + 8], 16) for node in range(nodeCount)]
+        offsets = numpy.array([int(nodeOffsets[node * 16 + 8:node * 16 + 16], 16) for node in range(nodeCount)]) // 4
+
+        data = numpy.memmap(binFileName, dtype='<f4', mode='r')
+        if nodeCount and (offsets.max() + dataValueCount > len(data)):
+            raise ValueError("Either the json file has too many nodes/values, or bin file has too little data")
+        if numpy.array_equal(offsets, numpy.arange(nodeCount) * dataValueCount):
+            values = data[:nodeCount * dataValueCount].reshape(nodeCount, dataValueCount)
+        else:
+            values = data[offsets[:, numpy.newaxis] + numpy.arange(dataValueCount)]
+
+        startDayOfYear = metaData['StartDayOfYear'].split(" ")
+        if startDayOfYear[0] not in MONTHS[1:]:
+            raise ValueError("Month name in StartDayOfYear must be in it's full name (ie January, not Jan or Jan.) "
+                             "StartDayOfYear was " + startDayOfYear[0])
+        startYear = str(metaData['OriginalDataYears']).split("-")[0]  # ie 1950 if it is 1950-2000
+        startDate = datetime.date(int(startYear), MONTHS.index(startDayOfYear[0]), int(startDayOfYear[1]))
+
+        return cls(metaData, nodeIDs, values, startDate)
+
+    @classmethod
+    def loadCsv(cls, csvFile):
+        """
+        Load a csv file of the weather tool.  The first row is "idReference,updateResolution,dataProvenance", the
+        second one "Date,<node id>,<node id>,..." and the next ones "<mm/dd/yyyy>,<value>,<value>,...".  Missing
+        values are 0.
+
+        :raises DateException: if a date is missing or invalid
+        """
+        lines = iter(csvFile)
+        headerRow1 = lines.next().rstrip('\r\n').split(',')
+        headerRow2 = lines.next().rstrip('\r\n').split(',')
+        nodeIDs = [int(nodeID) for nodeID in headerRow2[1:]]
+        nodeCount = len(nodeIDs)
+
+        startDate = None
+        dataValueCount = 0
+        data = array('f')
+        padding = array('f', [0.0]) * nodeCount
+        for line in lines:
+            row = line.rstrip('\r\n').split(',')
+            if row[0] == '':
+                raise DateException("Blank date given.")
+            try:
+                day = datetime.datetime.strptime(row[0], '%m/%d/%Y').date()
+            except ValueError:
+                raise DateException("Bad date of " + row[0])
+            if startDate is None:
+                startDate = day
+            elif day != startDate + datetime.timedelta(dataValueCount):
+                raise DateException("Date " + row[0] + " does not follow the previous one")
+            data.extend(float(value) if value else 0.0 for value in row[1:nodeCount + 1])
+            data.extend(padding[:max(0, nodeCount + 1 - len(row))])
+            dataValueCount += 1
+        if startDate is None:
+            raise DateException("No dates given.")
+
+        metaData = {
+            'DateCreated': time.strftime("%m/%d/%Y"),
+            'Tool': 'Csv to Emod Converter',
+            'Author': getpass.getuser(),
+            'IdReference': headerRow1[0],
+            'UpdateResolution': headerRow1[1],
+            'DataProvenance': headerRow1[2],
+        }
+        values = numpy.frombuffer(data, dtype=numpy.float32).reshape(dataValueCount, nodeCount).T
+        return cls(metaData, nodeIDs, numpy.ascontiguousarray(values), startDate)
+
+    def getDates(self, start=0, end=None):
+        """
+        :returns: List of the dates (as datetime.date) of the days start to end
+        """
+        if end is None:
+            end = self.dataValueCount
+        return [self.startDate + datetime.timedelta(day) for day in range(start, end)]
+
+    def getNodeValues(self, nodeID):
+        """
+        :returns: Array of the values of a node, one per day
+        :raises ValueError: if there is no such node
+        """
+        return self.values[self.nodeIDs.index(int(nodeID))]
+
+    def getTimeSeries(self, nodeID):
+        """
+        :returns: List of [timestamp (in milliseconds, UTC), value] pairs of a node, as used by Highcharts.  Each day
+                  is at midnight UTC, which Highcharts (with useUTC) shows as midnight of that day.  The timestamps were
+                  previously at midnight in the server's TIME_ZONE (time.mktime), i.e. shifted by its UTC offset.
+        :raises ValueError: if there is no such node
+        """
+        values = self.getNodeValues(nodeID)
+        start = calendar.timegm(self.startDate.timetuple()) * 1000.0
+        timeStamps = start + numpy.arange(len(values)) * 86400000.0
+        return numpy.column_stack((timeStamps, values)).tolist()
+
+    def iterCsv(self, blockSize=CSV_BLOCK_SIZE):
+        """
+        Generate the csv file, blockSize rows at a time.  The values are written with 9 significant digits, so they
+        are read back as the same float32 values.
+        """
+        yield "%s,%s,%s\n" % (self.metaData['IdReference'], self.metaData['UpdateResolution'],
+                              self.metaData['DataProvenance'])
+        yield ",".join(["Date"] + [str(nodeID) for nodeID in self.nodeIDs]) + "\n"
+
+        rowFormat = "%s" + ",%.9g" * len(self.nodeIDs) + "\n"
+        for start in range(0, self.dataValueCount, blockSize):
+            end = min(start + blockSize, self.dataValueCount)
+            rows = self.values[:, start:end].T.tolist()
+            dates = self.getDates(start, end)
+            yield "".join(rowFormat % tuple([day.strftime('%m/%d/%Y')] + row) for day, row in zip(dates, rows))
+
+    def getEmodJson(self):
+        """
+        :returns: The content of the EMOD .json file
+        """
+        dataValueCount = self.dataValueCount
+        endDate = self.startDate + datetime.timedelta(dataValueCount - 1)
+        originalDataYears = str(self.startDate.year)
+        if endDate.year != self.startDate.year:
+            originalDataYears += "-" + str(endDate.year)
+
+        metaData = dict(self.metaData)
+        metaData['NodeCount'] = len(self.nodeIDs)
+        metaData['DatavalueCount'] = dataValueCount
+        metaData['StartDayOfYear'] = MONTHS[self.startDate.month] + " " + str(self.startDate.day)
+        metaData['OriginalDataYears'] = originalDataYears
+        nodeOffsets = "".join("%08x%08x" % (nodeID, node * dataValueCount * 4)
+                              for node, nodeID in enumerate(self.nodeIDs))
+        return json.dumps({'Metadata': metaData, 'NodeOffsets': nodeOffsets}, sort_keys=True, indent=4)
+
+    def saveEmod(self, jsonFileName, binFileName):
+        """
+        Save as an EMOD climate file.
+        """
+        with open(jsonFileName, 'w') as jsonFile:
+            jsonFile.write(self.getEmodJson())
+        numpy.ascontiguousarray(self.values, dtype='<f4').tofile(binFileName)
@@ -1,3 +1,56 @@
+import os
+import shutil
+import tempfile
+from StringIO import StringIO
+
 from django.test import TestCase
 
-# Create your tests here.
+from .climate import ClimateData, DateException
+
+CSV_FILE = "ref,daily,prov\n" \
+           "Date,100,200\n" \
+           "12/30/1999,1.5,\n" \
+           "12/31/1999,2.25,4\n" \
+           "01/01/2000,0.5,5\n"
+
+
+class ClimateDataTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.jsonFileName = os.path.join(self.directory, "climate.json")
+        self.binFileName = os.path.join(self.directory, "climate.bin")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_load_csv(self):
+        climateData = ClimateData.loadCsv(StringIO(CSV_FILE))
+        self.assertEqual(climateData.nodeIDs, [100, 200])
+        self.assertEqual(climateData.values.tolist(), [[1.5, 2.25, 0.5], [0.0, 4.0, 5.0]])
+        self.assertEqual(climateData.metaData["IdReference"], "ref")
+
+    def test_load_csv_bad_date(self):
+        self.assertRaises(DateException, ClimateData.loadCsv, StringIO("ref,daily,prov\nDate,100\n13/01/2000,1\n"))
+        self.assertRaises(DateException, ClimateData.loadCsv, StringIO("ref,daily,prov\nDate,100\n,1\n"))
+
+    def test_emod_round_trip(self):
+        ClimateData.loadCsv(StringIO(CSV_FILE)).saveEmod(self.jsonFileName, self.binFileName)
+        self.assertEqual(os.path.getsize(self.binFileName), 2 * 3 * 4)
+
+        climateData = ClimateData.loadEmod(self.jsonFileName, self.binFileName)
+        self.assertEqual(climateData.metaData["StartDayOfYear"], "December 30")
+        self.assertEqual(climateData.metaData["OriginalDataYears"], "1999-2000")
+        self.assertEqual(climateData.nodeIDs, [100, 200])
+        self.assertEqual(climateData.getNodeValues(200).tolist(), [0.0, 4.0, 5.0])
+        self.assertEqual(climateData.getTimeSeries(100)[0], [946512000000.0, 1.5])
+
+    def test_csv(self):
+        ClimateData.loadCsv(StringIO(CSV_FILE)).saveEmod(self.jsonFileName, self.binFileName)
+        climateData = ClimateData.loadEmod(self.jsonFileName, self.binFileName)
+        self.assertEqual("".join(climateData.iterCsv(blockSize=2)), CSV_FILE.replace("1.5,\n", "1.5,0\n"))
+
+    def test_csv_precision(self):
+        csvFile = "ref,daily,prov\nDate,100\n01/01/2000,0.1\n01/02/2000,123456.789\n"
+        climateData = ClimateData.loadCsv(StringIO(csvFile))
+        roundTrip = ClimateData.loadCsv(StringIO("".join(climateData.iterCsv())))
+        self.assertEqual(roundTrip.values.tolist(), climateData.values.tolist())
@@ -1,8 +1,13 @@
 """
 This contains the merging tools needed for the emod_manifest split_execution function.
+
+The merges never modify their arguments.  Instead of deep copying the template, only the dictionaries and lists on
+the path of a change are copied (shallowly), and everything else is shared between the template, the changes and the
+result.  The cost of a merge is therefore proportional to the size of the change, not of the template, but the
+results must be treated as read-only.
 """
 
-from copy import deepcopy
+from copy import copy
 
 
 def merger(dict1, dict2):
@@ -12,7 +17,7 @@ def merger(dict1, dict2):
     Anytime the dictionary contains a dictionary this method will be called on that dictionary to merge
     """
     merge_dict = dict()
-    cpy_dict = deepcopy(dict1)
+    cpy_dict = copy(dict1)
     for key, value in dict2.iteritems():
         if value == {}:
             cpy_dict[key] = {}
@@ -39,6 +44,7 @@ def merger(dict1, dict2):
             if value == []:
                 cpy_dict[key] = []
             elif key in cpy_dict:
+                cpy_dict[key] = copy(cpy_dict[key])
                 cpy_dict[key].extend(value)
             else:
                 cpy_dict[key] = value
@@ -85,7 +91,7 @@ def merge_list(dict1, changeObj, mode=None):
     TODO: Add change documentation here
     Each merge is done recursively.
     """
-    cpy_dict = deepcopy(dict1)
+    cpy_dict = dict1
     changeList = changeObj['Changes']
     for change in changeList:
         if isinstance(change, dict):
@@ -0,0 +1,73 @@
+"""
+Here we test the merge tools used to split executions out of a manifest file.
+"""
+
+from copy import deepcopy
+import unittest
+
+from vcimanifest.json_merging.merge_tools import merge_list
+
+
+class TestMergeList(unittest.TestCase):
+    """
+    Here we test merge_list, making sure the template is never modified and that the parts of the template that are
+    not changed are shared with the result.
+    """
+
+    def setUp(self):
+        self.template = {
+            'config.json': {
+                'parameters': {
+                    'Base_Infectivity': 1,
+                    'Vector_Species_Names': ['arabiensis'],
+                    'Vector_Species_Params': {'arabiensis': {'Anthropophily': 0.5}}
+                }
+            },
+            'campaign.json': {
+                'Events': [{'Start_Day': 1, 'class': 'CampaignEvent'}, {'Start_Day': 2}]
+            }
+        }
+        self.original = deepcopy(self.template)
+
+    def testMerge(self):
+        changes = {
+            'Changes': [
+                {'config.json/parameters/Base_Infectivity': 2},
+                {'config.json/parameters/Vector_Species_Names': ['funestus']},
+                {'campaign.json/Events/0/Start_Day': 5},
+            ]
+        }
+        merged = merge_list(self.template, changes)
+
+        self.assertEqual(merged['config.json']['parameters']['Base_Infectivity'], 2)
+        self.assertEqual(merged['config.json']['parameters']['Vector_Species_Names'], ['arabiensis', 'funestus'])
+        self.assertEqual(merged['campaign.json']['Events'][0], {'Start_Day': 5, 'class': 'CampaignEvent'})
+        self.assertEqual(self.template, self.original, msg="merge_list modified the template")
+
+        self.assertIs(
+            merged['config.json']['parameters']['Vector_Species_Params'],
+            self.template['config.json']['parameters']['Vector_Species_Params'],
+            msg="Unchanged parts of the template were copied"
+        )
+        self.assertIs(merged['campaign.json']['Events'][1], self.template['campaign.json']['Events'][1])
+
+    def testNodeModes(self):
+        changes = {
+            'Changes': ['-species'],
+            'species': {'Changes': [{'config.json/parameters/Vector_Species_Names': ['funestus']}]}
+        }
+        merged = merge_list(self.template, changes)
+
+        self.assertEqual(merged['config.json']['parameters']['Vector_Species_Names'], ['funestus'])
+        self.assertEqual(self.template, self.original, msg="merge_list modified the template")
+
+    def testSuccessiveMerges(self):
+        """
+        Merging into the result of a previous merge must not modify that result either.
+        """
+        first = merge_list(self.template, {'Changes': [{'config.json/parameters/Vector_Species_Names': ['a']}]})
+        first_copy = deepcopy(first)
+        second = merge_list(first, {'Changes': [{'config.json/parameters/Vector_Species_Names': ['b']}]})
+
+        self.assertEqual(first, first_copy)
+        self.assertEqual(second['config.json']['parameters']['Vector_Species_Names'], ['arabiensis', 'a', 'b'])